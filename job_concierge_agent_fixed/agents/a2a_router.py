@@ -1,18 +1,72 @@
 """Simple A2A (agent-to-agent) router.
 Agents can register and send messages to other agents via the router.
 Messages are simple dicts with 'from', 'to', 'type', 'payload'.
+
+`send()` delivers synchronously (the original behaviour). `post()` puts the
+message on the target agent's bounded queue instead; a worker thread per
+agent delivers it, optionally in batches, and redelivers on handler
+failure (at-least-once) up to `max_retries` before moving it to
+`dead_letters`. A failed message waits out its backoff in a delay heap and
+is requeued when due, so the worker keeps delivering everything else.
+When a queue is full the agent's drop policy applies:
+  - "block":       wait up to `block_timeout`, then reject
+  - "drop_newest": reject the new message
+  - "drop_oldest": discard the oldest queued message to make room
+`metrics()` reports per-route queue depth, delivery counts and latency.
 """
+import heapq
+import itertools
 import logging
-from typing import Dict, Callable
+import queue
+import threading
+import time
+from collections import deque
+from typing import Dict, Callable, List, Optional
 
 logger = logging.getLogger(__name__)
 
+DROP_POLICIES = ("block", "drop_newest", "drop_oldest")
+
+
+class _Route:
+    def __init__(self, name, handler, queue_size, batch_size, batch_timeout, drop_policy,
+                 block_timeout, max_retries, retry_backoff):
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy {drop_policy!r}; expected one of {DROP_POLICIES}")
+        self.name = name
+        self.handler = handler
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+        self.drop_policy = drop_policy
+        self.block_timeout = block_timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.worker = None
+        self.lock = threading.Lock()
+        self.delayed = []                 # heap of (not_before, seq, item) awaiting redelivery
+        self.seq = itertools.count()
+        self.delivered = 0
+        self.failed = 0
+        self.retried = 0
+        self.dropped = 0
+        self.latencies = deque(maxlen=1024)
+
+
 class A2ARouter:
     def __init__(self):
         self._agents = {}
+        self._routes: Dict[str, _Route] = {}
+        self._closed = threading.Event()
+        self.dead_letters: List[Dict] = []
 
-    def register(self, agent_name: str, handler: Callable[[Dict], None]):
+    def register(self, agent_name: str, handler: Callable, queue_size: int = 1000, batch_size: int = 1,
+                 batch_timeout: float = 0.05, drop_policy: str = "block", block_timeout: float = 1.0,
+                 max_retries: int = 3, retry_backoff: float = 0.1):
+        """Register `handler`. With ``batch_size > 1`` queued delivery passes a list of messages."""
         self._agents[agent_name] = handler
+        self._routes[agent_name] = _Route(agent_name, handler, queue_size, batch_size, batch_timeout,
+                                          drop_policy, block_timeout, max_retries, retry_backoff)
         logger.info(f"Registered agent {agent_name} in A2A router")
 
     def send(self, to: str, msg: Dict):
@@ -20,9 +74,152 @@ class A2ARouter:
         if not handler:
             logger.warning(f"No agent registered under name {to}")
             return False
+        route = self._routes[to]
         try:
-            handler(msg)
+            handler([msg] if route.batch_size > 1 else msg)
             return True
         except Exception as e:
             logger.exception('Error delivering A2A message: %s', e)
             return False
+
+    # ---- queued delivery ----
+    def post(self, to: str, msg: Dict) -> bool:
+        """Enqueue `msg` for asynchronous delivery; False if rejected by backpressure."""
+        route = self._routes.get(to)
+        if route is None:
+            logger.warning(f"No agent registered under name {to}")
+            return False
+        self._ensure_worker(route)
+        item = (time.perf_counter(), msg, 0)
+        try:
+            if route.drop_policy == "block":
+                route.queue.put(item, timeout=route.block_timeout)
+            elif route.drop_policy == "drop_newest":
+                route.queue.put_nowait(item)
+            else:
+                while True:
+                    try:
+                        route.queue.put_nowait(item)
+                        break
+                    except queue.Full:
+                        try:
+                            route.queue.get_nowait()
+                            route.queue.task_done()
+                            with route.lock:
+                                route.dropped += 1
+                        except queue.Empty:
+                            pass
+            return True
+        except queue.Full:
+            with route.lock:
+                route.dropped += 1
+            logger.warning(f"A2A queue for {to} is full; message dropped")
+            return False
+
+    def _ensure_worker(self, route: _Route):
+        with route.lock:
+            if route.worker is None or not route.worker.is_alive():
+                route.worker = threading.Thread(target=self._worker_loop, args=(route,),
+                                                name=f"a2a-{route.name}", daemon=True)
+                route.worker.start()
+
+    def _promote_due(self, route: _Route) -> float:
+        """Requeue delayed messages whose backoff has passed; returns how long
+        the worker may block before the next one is due."""
+        now = time.perf_counter()
+        with route.lock:   # held across the requeue; see _pending
+            while route.delayed and route.delayed[0][0] <= now:
+                self._requeue(route, heapq.heappop(route.delayed)[2])
+            wait = min(0.5, route.delayed[0][0] - now) if route.delayed else 0.5
+        return max(wait, 0.001)
+
+    def _next_batch(self, route: _Route) -> list:
+        wait = self._promote_due(route)
+        try:
+            batch = [route.queue.get(timeout=wait)]
+        except queue.Empty:
+            return []
+        deadline = time.perf_counter() + route.batch_timeout
+        while len(batch) < route.batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(route.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker_loop(self, route: _Route):
+        while not self._closed.is_set():
+            batch = self._next_batch(route)
+            if not batch:
+                continue
+            msgs = [m for _, m, _ in batch]
+            try:
+                route.handler(msgs if route.batch_size > 1 else msgs[0])
+                done = time.perf_counter()
+                with route.lock:
+                    route.delivered += len(batch)
+                    route.latencies.extend(done - enq for enq, _, _ in batch)
+            except Exception as e:
+                logger.exception('Error delivering A2A message to %s: %s', route.name, e)
+                with route.lock:
+                    route.failed += len(batch)
+                for enq, msg, attempts in batch:
+                    if attempts < route.max_retries:
+                        # redeliver after the backoff without holding up the rest of the queue
+                        not_before = time.perf_counter() + route.retry_backoff * (2 ** attempts)
+                        with route.lock:
+                            route.retried += 1
+                            heapq.heappush(route.delayed, (not_before, next(route.seq), (enq, msg, attempts + 1)))
+                    else:
+                        self.dead_letters.append(msg)
+            finally:
+                for _ in batch:
+                    route.queue.task_done()
+
+    def _requeue(self, route: _Route, item):
+        try:
+            route.queue.put_nowait(item)
+        except queue.Full:
+            # never block the worker on its own queue
+            self.dead_letters.append(item[1])
+
+    @staticmethod
+    def _pending(route: _Route) -> bool:
+        # both read under the lock _promote_due holds while moving a message
+        # from the delay heap to the queue, so it is always seen in one of them
+        with route.lock:
+            return bool(route.queue.unfinished_tasks or route.delayed)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued message has been handled (or dead-lettered)."""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        for route in self._routes.values():
+            while self._pending(route):
+                if deadline is not None and time.perf_counter() > deadline:
+                    return False
+                time.sleep(0.01)
+        return True
+
+    def metrics(self) -> Dict[str, Dict]:
+        out = {}
+        for name, route in self._routes.items():
+            with route.lock:
+                lat = sorted(route.latencies)
+                out[name] = {
+                    "queue_depth": route.queue.qsize(),
+                    "delayed": len(route.delayed),
+                    "delivered": route.delivered,
+                    "failed": route.failed,
+                    "retried": route.retried,
+                    "dropped": route.dropped,
+                    "latency_avg": (sum(lat) / len(lat)) if lat else 0.0,
+                    "latency_p95": lat[min(len(lat) - 1, int(0.95 * len(lat)))] if lat else 0.0,
+                    "latency_max": lat[-1] if lat else 0.0,
+                }
+        return out
+
+    def close(self):
+        self._closed.set()
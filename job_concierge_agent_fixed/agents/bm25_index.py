@@ -0,0 +1,262 @@
+"""Incremental BM25 inverted index over job titles and descriptions.
+
+Used as a lexical prefilter: `search()` shortlists a few hundred postings by
+BM25, and `hybrid_rerank()` re-scores only that shortlist with the
+embedding model, fusing both scores. Query cost grows with the postings of
+the query terms rather than with the corpus. It is reached through
+``VectorSearch(lexical=True)`` and ``search(..., hybrid=True)``, i.e. for
+searches over a large stored corpus; the per-query paths (JDMatcher.score,
+recommend_once, the batch runner) only score the few dozen postings one
+scrape returns and do not use it.
+
+Layout: a compacted base segment in CSR form (term -> sorted doc numbers
+and term frequencies) plus a small in-memory delta segment that takes new
+and updated postings. Replaced or deleted postings are tombstoned; the delta
+is merged into the base (dropping tombstones) once it grows past
+`merge_ratio` of the base, and on `save()`. Title terms count
+`title_weight` times. Document frequencies include tombstoned postings
+until the next merge.
+"""
+import logging
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r"[a-z0-9+#]+")
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or our that the this to we will with you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    def __init__(self, k1: float = 1.2, b: float = 0.75, title_weight: float = 2.0,
+                 merge_ratio: float = 0.1, min_merge: int = 50_000):
+        self.k1 = k1
+        self.b = b
+        self.title_weight = title_weight
+        self.merge_ratio = merge_ratio
+        self.min_merge = min_merge
+        self._vocab: Dict[str, int] = {}
+        # base segment
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._docs = np.zeros(0, dtype=np.int32)
+        self._tfs = np.zeros(0, dtype=np.float32)
+        # delta segment: term id -> ([doc numbers], [term frequencies])
+        self._delta: Dict[int, Tuple[List[int], List[float]]] = {}
+        self._delta_postings = 0
+        # per document number
+        self._doc_ids: List[str] = []
+        self._doc_len = np.zeros(1024, dtype=np.float32)
+        self._live = np.zeros(1024, dtype=bool)
+        self._by_id: Dict[str, int] = {}
+        self._total_len = 0.0
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __contains__(self, job_id: str):
+        return job_id in self._by_id
+
+    # ---- updates ----
+    def _grow(self, size: int):
+        if size > len(self._live):
+            cap = max(size, 2 * len(self._live))
+            self._doc_len = np.resize(self._doc_len, cap)
+            live = np.zeros(cap, dtype=bool)
+            live[:len(self._live)] = self._live
+            self._live = live
+
+    def _kill(self, job_id: str):
+        doc = self._by_id.pop(job_id, None)
+        if doc is not None:
+            self._live[doc] = False
+            self._total_len -= float(self._doc_len[doc])
+
+    def _term_freqs(self, job: Dict) -> Counter:
+        tf = Counter(tokenize(job.get("description") or ""))
+        for term in tokenize(job.get("title") or ""):
+            tf[term] += self.title_weight
+        return tf
+
+    def upsert(self, jobs: List[Dict]) -> int:
+        """Index new jobs and re-index changed ones (keyed by ``job["id"]``)."""
+        self._grow(len(self._doc_ids) + len(jobs))
+        for job in jobs:
+            self._kill(job["id"])
+            doc = len(self._doc_ids)
+            tf = self._term_freqs(job)
+            for term, freq in tf.items():
+                tid = self._vocab.setdefault(term, len(self._vocab))
+                docs, freqs = self._delta.setdefault(tid, ([], []))
+                docs.append(doc)
+                freqs.append(freq)
+            self._delta_postings += len(tf)
+            length = float(sum(tf.values()))
+            self._doc_ids.append(job["id"])
+            self._doc_len[doc] = length
+            self._live[doc] = True
+            self._by_id[job["id"]] = doc
+            self._total_len += length
+        if self._delta_postings > max(self.min_merge, self.merge_ratio * len(self._docs)):
+            self.merge()
+        return len(jobs)
+
+    def add_jobs(self, jobs: List[Dict]) -> int:
+        return self.upsert(jobs)
+
+    def delete(self, job_ids: List[str]) -> int:
+        before = len(self._by_id)
+        for job_id in job_ids:
+            self._kill(job_id)
+        return before - len(self._by_id)
+
+    def merge(self):
+        """Fold the delta into the base segment and drop tombstoned documents."""
+        n_terms = len(self._vocab)
+        base_terms = np.repeat(np.arange(len(self._indptr) - 1), np.diff(self._indptr))
+        if self._delta:
+            delta_terms = np.concatenate([np.full(len(d), t) for t, (d, _) in self._delta.items()])
+            delta_docs = np.concatenate([np.asarray(d) for d, _ in self._delta.values()])
+            delta_tfs = np.concatenate([np.asarray(f, dtype=np.float32) for _, f in self._delta.values()])
+        else:
+            delta_terms = delta_docs = np.zeros(0, dtype=np.int64)
+            delta_tfs = np.zeros(0, dtype=np.float32)
+        terms = np.concatenate([base_terms, delta_terms]).astype(np.int64)
+        docs = np.concatenate([self._docs, delta_docs]).astype(np.int64)
+        tfs = np.concatenate([self._tfs, delta_tfs])
+
+        n_docs = len(self._doc_ids)
+        live = self._live[:n_docs]
+        keep = live[docs]
+        terms, docs, tfs = terms[keep], docs[keep], tfs[keep]
+        renumber = np.cumsum(live) - 1
+        docs = renumber[docs]
+        order = np.lexsort((docs, terms))
+        self._docs = docs[order].astype(np.int32)
+        self._tfs = tfs[order]
+        self._indptr = np.concatenate([[0], np.cumsum(np.bincount(terms, minlength=n_terms))]).astype(np.int64)
+        self._delta = {}
+        self._delta_postings = 0
+
+        kept = np.flatnonzero(live)
+        self._doc_ids = [self._doc_ids[i] for i in kept.tolist()]
+        doc_len = self._doc_len[kept]
+        self._doc_len = np.zeros(max(len(kept), 1024), dtype=np.float32)
+        self._doc_len[:len(kept)] = doc_len
+        self._live = np.zeros(len(self._doc_len), dtype=bool)
+        self._live[:len(kept)] = True
+        self._by_id = {job_id: i for i, job_id in enumerate(self._doc_ids)}
+        self._total_len = float(doc_len.sum())
+        logger.info(f"BM25Index merged: {len(self._doc_ids)} docs, {len(self._docs)} postings")
+
+    # ---- query ----
+    def _postings(self, tid: int) -> Tuple[np.ndarray, np.ndarray]:
+        if tid + 1 < len(self._indptr):
+            lo, hi = self._indptr[tid], self._indptr[tid + 1]
+            docs, tfs = self._docs[lo:hi], self._tfs[lo:hi]
+        else:
+            docs, tfs = self._docs[:0], self._tfs[:0]
+        delta = self._delta.get(tid)
+        if delta:
+            docs = np.concatenate([docs, np.asarray(delta[0], dtype=np.int32)])
+            tfs = np.concatenate([tfs, np.asarray(delta[1], dtype=np.float32)])
+        return docs, tfs
+
+    def search(self, text: str, top_k: int = 300) -> Tuple[List[str], np.ndarray]:
+        """Top-k job ids by BM25 and their scores (descending); postings sharing
+        no term with `text` are never touched."""
+        n = len(self._by_id)
+        if not n:
+            return [], np.zeros(0, dtype=np.float32)
+        avgdl = self._total_len / n
+        doc_parts, score_parts = [], []
+        for term in set(tokenize(text)):
+            tid = self._vocab.get(term)
+            if tid is None:
+                continue
+            docs, tfs = self._postings(tid)
+            if not len(docs):
+                continue
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self._doc_len[docs] / avgdl)
+            doc_parts.append(docs)
+            score_parts.append(idf * tfs * (self.k1 + 1) / (tfs + norm))
+        if not doc_parts:
+            return [], np.zeros(0, dtype=np.float32)
+        docs = np.concatenate(doc_parts)
+        scores = np.concatenate(score_parts)
+        live = self._live[docs]
+        docs, scores = docs[live], scores[live]
+        uniq, inverse = np.unique(docs, return_inverse=True)
+        totals = np.bincount(inverse, weights=scores).astype(np.float32)
+        if len(totals) > top_k:
+            part = np.argpartition(-totals, top_k - 1)[:top_k]
+            uniq, totals = uniq[part], totals[part]
+        order = np.argsort(-totals, kind="stable")
+        return [self._doc_ids[i] for i in uniq[order].tolist()], totals[order]
+
+    # ---- persistence ----
+    def save(self, path: str):
+        """Merge, then write one compressed .npz file."""
+        self.merge()
+        terms = sorted(self._vocab, key=self._vocab.get)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez_compressed(
+                f, terms=np.array(terms, dtype=str), indptr=self._indptr, docs=self._docs, tfs=self._tfs,
+                doc_ids=np.array(self._doc_ids, dtype=str), doc_len=self._doc_len[:len(self._doc_ids)],
+                params=np.array([self.k1, self.b, self.title_weight], dtype=np.float64))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "BM25Index":
+        with np.load(path) as data:
+            k1, b, title_weight = data["params"].tolist()
+            index = cls(k1=k1, b=b, title_weight=title_weight, **kwargs)
+            index._vocab = {t: i for i, t in enumerate(data["terms"].tolist())}
+            index._indptr = data["indptr"]
+            index._docs = data["docs"]
+            index._tfs = data["tfs"]
+            index._doc_ids = data["doc_ids"].tolist()
+            doc_len = data["doc_len"]
+        index._grow(len(index._doc_ids))
+        index._doc_len[:len(doc_len)] = doc_len
+        index._live[:len(doc_len)] = True
+        index._by_id = {job_id: i for i, job_id in enumerate(index._doc_ids)}
+        index._total_len = float(doc_len.sum())
+        return index
+
+
+def fuse_scores(lexical: np.ndarray, semantic: np.ndarray, alpha: float = 0.7) -> np.ndarray:
+    """``alpha * cosine + (1 - alpha) * bm25 / max(bm25)``; alpha=1 is a pure embedding rerank."""
+    lexical = np.asarray(lexical, dtype=np.float32)
+    top = float(lexical.max()) if len(lexical) else 0.0
+    lex_norm = lexical / top if top > 0 else lexical
+    return alpha * np.asarray(semantic, dtype=np.float32) + (1 - alpha) * lex_norm
+
+
+def hybrid_rerank(matcher, query_text: str, candidates: List[Dict], lexical_scores: np.ndarray,
+                  alpha: float = 0.7, top_k: Optional[int] = None) -> List[Dict]:
+    """Re-score a BM25 shortlist with `matcher` (a JDMatcher) and fuse the scores.
+
+    Returns copies of the candidates, best first, with ``score`` (fused),
+    ``lexical_score`` and ``semantic_score``.
+    """
+    if not candidates:
+        return []
+    embs = matcher.embed([query_text] + [c["description"] for c in candidates])
+    semantic = embs[1:] @ embs[0]
+    fused = fuse_scores(lexical_scores, semantic, alpha)
+    order = np.argsort(-fused, kind="stable")[:top_k]
+    return [dict(candidates[i], score=float(fused[i]), lexical_score=float(lexical_scores[i]),
+                 semantic_score=float(semantic[i])) for i in order.tolist()]
@@ -0,0 +1,12 @@
+"""Shared on-disk location for the agents' caches.
+Override the root with the JOB_CONCIERGE_CACHE environment variable.
+"""
+import os
+
+
+def cache_dir(*parts: str) -> str:
+    """Return (and create) a directory under the cache root."""
+    root = os.environ.get("JOB_CONCIERGE_CACHE") or os.path.join(os.path.expanduser("~"), ".cache", "job_concierge")
+    path = os.path.join(root, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
@@ -0,0 +1,150 @@
+"""Length-aware chunked encoding for long resumes and job descriptions.
+
+Sentence-transformer models truncate their input (all-MiniLM-L6-v2 after
+256 word pieces), so most of a multi-page resume would never be seen. Texts
+are split into overlapping word windows, the chunks of every document in a
+call are encoded together in length-sorted batches (similar lengths pad
+less), and chunk vectors are pooled back per document:
+  - "mean" / "max": one pooled, L2-normalized vector per document
+  - "best": documents are compared chunk against chunk and score as their
+    best-matching pair (see `best_chunk_scores`)
+Chunk vectors go through the shared EmbeddingCache under the plain model
+name. A text that fits in one chunk is its own chunk, so it shares cache
+entries with unchunked encoding.
+
+JOB_ENCODE_BATCH sets the default batch size. The torch CPU thread count is
+process-wide: encoder backends apply JOB_ENCODE_THREADS when the model
+loads, and entry points may call `set_threads` once at startup; nothing
+here changes it per encoder.
+"""
+import logging
+import os
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from agents.embedding_cache import EmbeddingCache, get_embedding_cache, l2_normalize
+from agents.model_registry import DEFAULT_MODEL, get_model
+
+logger = logging.getLogger(__name__)
+
+POOLINGS = ("mean", "max", "best")
+
+
+def chunk_text(text: str, max_words: int = 180, overlap: int = 40) -> List[str]:
+    """Overlapping windows of at most `max_words` words; always at least one chunk."""
+    words = text.split()
+    if len(words) <= max_words:
+        return [text]
+    step = max(1, max_words - overlap)
+    chunks = []
+    for start in range(0, len(words), step):
+        chunks.append(" ".join(words[start:start + max_words]))
+        if start + max_words >= len(words):
+            break
+    return chunks
+
+
+def set_threads(threads: Optional[int]):
+    """Cap torch's intra-op CPU threads for the whole process; call once at
+    startup. No-op without torch."""
+    if not threads:
+        return
+    try:
+        import torch
+        torch.set_num_threads(int(threads))
+    except ImportError:
+        pass
+
+
+def pool_chunks(vecs: np.ndarray, owners: np.ndarray, n_docs: int, mode: str = "mean") -> np.ndarray:
+    """Pool chunk vectors into one normalized vector per document."""
+    if mode == "mean":
+        out = np.zeros((n_docs, vecs.shape[1]), dtype=np.float32)
+        np.add.at(out, owners, vecs)
+    elif mode == "max":
+        out = np.full((n_docs, vecs.shape[1]), -np.inf, dtype=np.float32)
+        np.maximum.at(out, owners, vecs)
+    else:
+        raise ValueError(f"Cannot pool with {mode!r}; expected 'mean' or 'max'")
+    return l2_normalize(out)
+
+
+def best_chunk_scores(q_vecs: np.ndarray, q_owners: np.ndarray, n_q: int,
+                      d_vecs: np.ndarray, d_owners: np.ndarray, n_d: int,
+                      doc_block: int = 4096) -> np.ndarray:
+    """(n_q, n_d) matrix of the best cosine between any chunk of query i and any
+    chunk of document j. Owners must be non-decreasing (chunks of a document
+    are contiguous), as produced by `ChunkedEncoder.encode_chunks`."""
+    out = np.empty((n_q, n_d), dtype=np.float32)
+    if n_q == 0 or n_d == 0:
+        return out
+    q_starts = np.searchsorted(q_owners, np.arange(n_q))
+    d_starts = np.searchsorted(d_owners, np.arange(n_d + 1))
+    for a in range(0, n_d, doc_block):
+        b = min(a + doc_block, n_d)
+        lo, hi = d_starts[a], d_starts[b]
+        tile = q_vecs @ d_vecs[lo:hi].T
+        tile = np.maximum.reduceat(tile, q_starts, axis=0)
+        out[:, a:b] = np.maximum.reduceat(tile, d_starts[a:b] - lo, axis=1)
+    return out
+
+
+class ChunkedEncoder:
+    def __init__(self, model_name: str = DEFAULT_MODEL, cache: Optional[EmbeddingCache] = None,
+                 max_words: int = 180, overlap: int = 40, batch_size: Optional[int] = None):
+        if overlap >= max_words:
+            raise ValueError("overlap must be smaller than max_words")
+        self.model_name = model_name
+        self.cache = cache if cache is not None else get_embedding_cache()
+        self.max_words = max_words
+        self.overlap = overlap
+        self.batch_size = batch_size or int(os.environ.get("JOB_ENCODE_BATCH", 32))
+
+    @property
+    def model(self):
+        return get_model(self.model_name)
+
+    def encode_chunks(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Normalized vectors for every chunk of every text, and the index of the
+        text each chunk came from (non-decreasing)."""
+        chunks, owners = [], []
+        for i, text in enumerate(texts):
+            parts = chunk_text(text, self.max_words, self.overlap)
+            chunks.extend(parts)
+            owners.extend([i] * len(parts))
+        if not chunks:
+            return np.zeros((0, 0), dtype=np.float32), np.zeros(0, dtype=np.int64)
+        return l2_normalize(self._encode(chunks)), np.asarray(owners, dtype=np.int64)
+
+    def _encode(self, chunks: List[str]) -> np.ndarray:
+        cached = self.cache.lookup(self.model_name, chunks)
+        missing = list(OrderedDict.fromkeys(c for c, v in zip(chunks, cached) if v is None))
+        if missing:
+            # length-sorted batches: each batch pads to a similar length
+            missing.sort(key=len)
+            model = self.model
+            batches = [missing[s:s + self.batch_size] for s in range(0, len(missing), self.batch_size)]
+            fresh = np.vstack([np.asarray(model.encode(batch, batch_size=self.batch_size, convert_to_numpy=True,
+                                                       show_progress_bar=False), dtype=np.float32)
+                               for batch in batches])
+            self.cache.store(self.model_name, missing, fresh)
+            by_text = dict(zip(missing, fresh))
+            cached = [v if v is not None else by_text[c] for c, v in zip(chunks, cached)]
+            logger.info(f"Encoded {len(missing)} new chunks in {len(batches)} batches")
+        return np.stack(cached).astype(np.float32, copy=False)
+
+    def encode(self, texts: List[str], pooling: str = "mean") -> np.ndarray:
+        """One normalized vector per text, pooled over its chunks."""
+        vecs, owners = self.encode_chunks(texts)
+        if not len(vecs):
+            return vecs
+        return pool_chunks(vecs, owners, len(texts), pooling)
+
+    def best_scores(self, queries: List[str], docs: List[str]) -> np.ndarray:
+        """Best chunk-pair cosine for every (query, doc); both sides are encoded in one pass."""
+        vecs, owners = self.encode_chunks(list(queries) + list(docs))
+        split = int(np.searchsorted(owners, len(queries)))
+        return best_chunk_scores(vecs[:split], owners[:split], len(queries),
+                                 vecs[split:], owners[split:] - len(queries), len(docs))
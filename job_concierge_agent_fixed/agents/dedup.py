@@ -0,0 +1,151 @@
+"""Near-duplicate job posting detection.
+
+The same role is often listed on several sites with slightly different
+titles ("Sr. ML Engineer" / "Senior ML Engineer"). Each posting gets MinHash
+signatures over title+company character shingles and description word
+shingles. LSH banding on the title+company signature yields candidate pairs
+without comparing every pair; candidates are confirmed on estimated
+similarity and merged with union-find. Descriptions are only compared for
+postings from the same site, since each site shows a different snippet.
+"""
+import hashlib
+import logging
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_PRIME = np.uint64((1 << 61) - 1)
+_WORD = re.compile(r"[a-z0-9+#]+")
+_ABBREVIATIONS = {"sr": "senior", "jr": "junior", "mgr": "manager", "engg": "engineer", "eng": "engineer"}
+
+
+def _tokens(text: str) -> List[str]:
+    return [_ABBREVIATIONS.get(t, t) for t in _WORD.findall(text.lower())]
+
+
+def _hash64(items) -> np.ndarray:
+    return np.array([int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+                     for s in items], dtype=np.uint64)
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = 64, seed: int = 7):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, int(_PRIME), size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, int(_PRIME), size=num_perm, dtype=np.uint64)
+
+    def signature(self, shingles) -> np.ndarray:
+        if not shingles:
+            return np.full(self.num_perm, np.iinfo(np.uint64).max, dtype=np.uint64)
+        h = _hash64(shingles) % _PRIME
+        # (a*h + b) mod p for every permutation at once; uint64 overflow is fine for hashing
+        return ((np.outer(h, self.a) + self.b) % _PRIME).min(axis=0)
+
+
+def similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    return float(np.mean(sig_a == sig_b))
+
+
+def _title_shingles(job: Dict, n: int = 3) -> set:
+    text = " ".join(_tokens(f"{job.get('title', '')} {job.get('company', '')}"))
+    return {text[i:i + n] for i in range(max(1, len(text) - n + 1))} if text else set()
+
+
+def _desc_shingles(text: str, n: int = 3) -> set:
+    words = _tokens(text)[:300]
+    return {" ".join(words[i:i + n]) for i in range(max(1, len(words) - n + 1))} if words else set()
+
+
+def _source(job: Dict) -> str:
+    return job.get("source") or str(job.get("id", "")).split("_", 1)[0]
+
+
+def dedup_jobs(jobs: List[Dict], title_threshold: float = 0.8, desc_threshold: float = 0.5,
+               bands: int = 16, rows: int = 4) -> Tuple[List[Dict], Dict]:
+    """Collapse near-duplicate postings.
+
+    Returns ``(canonical_jobs, stats)``. Each canonical job carries a
+    ``sources`` list linking every merged posting (source, id, url);
+    ``stats`` reports how many postings (and description characters) were
+    kept out of the encoder.
+    """
+    n = len(jobs)
+    if n < 2:
+        return [dict(j, sources=[{"source": _source(j), "id": j.get("id"), "url": j.get("url")}]) for j in jobs], \
+            {"input": n, "unique": n, "removed": 0, "saved_chars": 0}
+
+    hasher = MinHasher(num_perm=bands * rows)
+    # descriptions shared by postings with different titles are site boilerplate, not content
+    titles_per_desc = defaultdict(set)
+    for j in jobs:
+        titles_per_desc[j.get("description", "")].add(j.get("title", ""))
+    boilerplate = {d for d, t in titles_per_desc.items() if len(t) > 1}
+
+    title_sigs = np.stack([hasher.signature(_title_shingles(j)) for j in jobs])
+    desc_sigs = [None if (not j.get("description") or j["description"] in boilerplate)
+                 else hasher.signature(_desc_shingles(j["description"])) for j in jobs]
+
+    parent = list(range(n))
+    members_of = {i: [i] for i in range(n)}
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def conflicts(i, j):
+        # two postings on the same site with clearly different descriptions are different openings
+        return (_source(jobs[i]) == _source(jobs[j]) and desc_sigs[i] is not None
+                and desc_sigs[j] is not None and similarity(desc_sigs[i], desc_sigs[j]) < desc_threshold)
+
+    rejected = set()
+    for band in range(bands):
+        buckets = defaultdict(list)
+        chunk = title_sigs[:, band * rows:(band + 1) * rows]
+        for i in range(n):
+            buckets[chunk[i].tobytes()].append(i)
+        for bucket in buckets.values():
+            if len(bucket) < 2:
+                continue
+            sigs = title_sigs[bucket]
+            for x in range(len(bucket) - 1):
+                # similarity of this member to the rest of the bucket in one vectorized step
+                sims = (sigs[x + 1:] == sigs[x]).mean(axis=1)
+                for y in np.nonzero(sims >= title_threshold)[0]:
+                    i, j = bucket[x], bucket[x + 1 + int(y)]
+                    ri, rj = find(i), find(j)
+                    if ri == rj or (ri, rj) in rejected:
+                        continue
+                    # check the whole merged cluster so conflicts are not bridged transitively
+                    if any(conflicts(a, b) for a in members_of[ri] for b in members_of[rj]):
+                        rejected.add((ri, rj))
+                        continue
+                    parent[ri] = rj
+                    members_of[rj].extend(members_of.pop(ri))
+
+    clusters = defaultdict(list)
+    for i in range(n):
+        clusters[find(i)].append(i)
+
+    canonical = []
+    saved_chars = 0
+    for members in sorted(clusters.values(), key=lambda m: m[0]):
+        # keep the most informative posting, in original scrape order otherwise
+        best = max(members, key=lambda i: (desc_sigs[i] is not None, len(jobs[i].get("description", "")), -i))
+        record = dict(jobs[best])
+        record["sources"] = [{"source": _source(jobs[i]), "id": jobs[i].get("id"), "url": jobs[i].get("url")}
+                             for i in members]
+        canonical.append(record)
+        saved_chars += sum(len(jobs[i].get("description", "")) for i in members if i != best)
+
+    stats = {"input": n, "unique": len(canonical), "removed": n - len(canonical), "saved_chars": saved_chars,
+             "sources": dict(Counter(_source(j) for j in jobs))}
+    logger.info("Dedup: %d postings -> %d unique (%d encoder inputs saved)", n, len(canonical), stats["removed"])
+    return canonical, stats
@@ -0,0 +1,301 @@
+"""Persistent, content-addressed embedding cache.
+
+Vectors are keyed by (model name, sha1 of the text). Each model gets its own
+directory of append-only segments: a ``seg-*.npy`` matrix (float16 by
+default, loaded with mmap) and a ``seg-*.json`` listing the key of every row.
+A save writes only the vectors added since the last one as a new segment, so
+existing files are never rewritten and processes sharing the directory never
+overwrite each other; segments other processes wrote are picked up on the
+next save. Once a shard has `max_segments` segments, or more stale rows
+(replaced or evicted) than live ones, it is compacted into one segment.
+Vectors are saved every `save_every` new entries, at the first store after
+`save_interval` seconds, and at interpreter exit.
+
+`encode()` looks up a whole batch at once and only sends the misses to the
+encoder; the least recently used rows are dropped once the cache grows past
+`max_entries`.
+"""
+import atexit
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from agents.cache_paths import cache_dir
+
+logger = logging.getLogger(__name__)
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def l2_normalize(vecs: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vecs, axis=-1, keepdims=True)
+    return vecs / np.maximum(norms, 1e-12)
+
+
+class _ModelShard:
+    """Rows for one model: mmap'd segments plus vectors added since the last save."""
+
+    def __init__(self, directory: str, dtype: str, max_segments: int = 16):
+        self.directory = directory
+        self.dtype = dtype
+        self.max_segments = max_segments
+        self.segments = []               # [(json path, npy path, np.memmap)], oldest first
+        self.rows = OrderedDict()        # key -> (segment, row), in LRU order
+        self.new = OrderedDict()         # key -> vector not yet on disk
+        self.stale = 0                   # rows on disk that are no longer referenced
+        self.dirty = False
+        self._scan()
+
+    def _segment_files(self) -> List[tuple]:
+        try:
+            names = sorted(f[:-len(".json")] for f in os.listdir(self.directory)
+                           if f.startswith("seg-") and f.endswith(".json"))
+        except FileNotFoundError:
+            return []
+        files = [(os.path.join(self.directory, n + ".json"), os.path.join(self.directory, n + ".npy"))
+                 for n in names]
+        legacy = (os.path.join(self.directory, "index.json"), os.path.join(self.directory, "vectors.npy"))
+        if os.path.exists(legacy[0]):
+            files.insert(0, legacy)   # single-file layout from before segments
+        return files
+
+    def _scan(self):
+        """Load segments not seen yet (ours from a previous run, or another process's)."""
+        known = {seg[0] for seg in self.segments}
+        for index_path, vec_path in self._segment_files():
+            if index_path in known:
+                continue
+            try:
+                with open(index_path, encoding="utf-8") as f:
+                    keys = json.load(f)["keys"]
+                data = np.load(vec_path, mmap_mode="r")
+                if len(keys) != data.shape[0]:
+                    raise ValueError("index/vector row count mismatch")
+            except FileNotFoundError:
+                continue   # compacted away by another process meanwhile
+            except Exception as e:
+                logger.warning("Ignoring corrupt embedding cache segment %s: %s", index_path, e)
+                continue
+            seg = len(self.segments)
+            self.segments.append((index_path, vec_path, data))
+            for row, key in enumerate(keys):
+                if key in self.new:
+                    self.stale += 1
+                    continue
+                if key in self.rows:
+                    self.stale += 1
+                self.rows[key] = (seg, row)
+
+    def __len__(self):
+        return len(self.rows) + len(self.new)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        vec = self.new.get(key)
+        if vec is not None:
+            self.new.move_to_end(key)
+            return vec
+        loc = self.rows.get(key)
+        if loc is None:
+            return None
+        # recency lives in memory only; it never forces a write
+        self.rows.move_to_end(key)
+        return np.asarray(self.segments[loc[0]][2][loc[1]], dtype=np.float32)
+
+    def put(self, key: str, vec: np.ndarray):
+        self.new[key] = np.asarray(vec, dtype=np.float32)
+        self.new.move_to_end(key)
+        if self.rows.pop(key, None) is not None:
+            self.stale += 1
+        self.dirty = True
+
+    def evict(self, max_entries: int) -> int:
+        dropped = 0
+        while len(self) > max_entries:
+            # drop least recently used saved rows before this session's additions
+            if self.rows:
+                self.rows.popitem(last=False)
+                self.stale += 1
+            else:
+                self.new.popitem(last=False)
+            dropped += 1
+        return dropped
+
+    def _write_segment(self, keys: List[str], matrix: np.ndarray):
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"seg-{time.time_ns():020d}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        index_path = os.path.join(self.directory, name + ".json")
+        vec_path = os.path.join(self.directory, name + ".npy")
+        with open(vec_path + ".tmp", "wb") as f:
+            np.save(f, matrix)
+        os.replace(vec_path + ".tmp", vec_path)
+        # the index appears last: a segment without one is never read
+        with open(index_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"dim": int(matrix.shape[1]), "dtype": self.dtype, "keys": keys}, f)
+        os.replace(index_path + ".tmp", index_path)
+        return index_path, vec_path, np.load(vec_path, mmap_mode="r")
+
+    def save(self):
+        if self.new:
+            keys = list(self.new)
+            seg = len(self.segments)
+            self.segments.append(self._write_segment(keys, np.stack(list(self.new.values())).astype(self.dtype)))
+            for row, key in enumerate(keys):
+                self.rows[key] = (seg, row)
+            self.new = OrderedDict()
+        self.dirty = False
+        self._scan()
+        if len(self.segments) > self.max_segments or self.stale > max(len(self.rows), 1024):
+            self.compact()
+
+    def compact(self):
+        """Rewrite the live rows as one segment and delete the segments they came from."""
+        old = self.segments
+        keys = list(self.rows)
+        if keys:
+            matrix = np.empty((len(keys), old[0][2].shape[1]), dtype=self.dtype)
+            by_segment: Dict[int, tuple] = {}
+            for i, (seg, row) in enumerate(self.rows.values()):
+                dst, src = by_segment.setdefault(seg, ([], []))
+                dst.append(i)
+                src.append(row)
+            for seg, (dst, src) in by_segment.items():
+                matrix[dst] = old[seg][2][src]
+            self.segments = [self._write_segment(keys, matrix)]
+        else:
+            self.segments = []
+        self.rows = OrderedDict((k, (0, i)) for i, k in enumerate(keys))
+        self.stale = 0
+        for index_path, vec_path, _ in old:
+            for path in (index_path, vec_path):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        logger.info("Compacted embedding cache %s: %d segments -> 1 (%d rows)", self.directory, len(old), len(keys))
+
+
+_open_caches = weakref.WeakSet()
+
+
+@atexit.register
+def _save_open_caches():
+    for cache in list(_open_caches):
+        try:
+            cache.save()
+        except Exception as e:
+            logger.warning("Could not save embedding cache %s at exit: %s", cache.directory, e)
+
+
+class EmbeddingCache:
+    def __init__(self, directory: Optional[str] = None, max_entries: int = 200_000,
+                 dtype: str = "float16", save_every: int = 256, save_interval: float = 60.0,
+                 max_segments: int = 16):
+        if dtype not in ("float16", "float32"):
+            raise ValueError("dtype must be 'float16' or 'float32'")
+        self.directory = directory or cache_dir("embeddings")
+        self.max_entries = max_entries
+        self.dtype = dtype
+        self.save_every = save_every
+        self.save_interval = save_interval
+        self.max_segments = max_segments
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._shards: Dict[str, _ModelShard] = {}
+        self._lock = threading.RLock()
+        self._unsaved = 0
+        self._last_save = time.monotonic()
+        _open_caches.add(self)
+
+    def _shard(self, model_name: str) -> _ModelShard:
+        shard = self._shards.get(model_name)
+        if shard is None:
+            safe = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+            shard = _ModelShard(os.path.join(self.directory, safe), self.dtype, self.max_segments)
+            self._shards[model_name] = shard
+        return shard
+
+    def lookup(self, model_name: str, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Cached vectors for `texts` (None for misses); updates hit/miss counters."""
+        with self._lock:
+            shard = self._shard(model_name)
+            out = [shard.get(text_key(t)) for t in texts]
+        found = sum(v is not None for v in out)
+        self.hits += found
+        self.misses += len(out) - found
+        return out
+
+    def store(self, model_name: str, texts: List[str], vectors: np.ndarray):
+        with self._lock:
+            shard = self._shard(model_name)
+            for t, v in zip(texts, vectors):
+                shard.put(text_key(t), v)
+            self.evictions += shard.evict(self.max_entries)
+            self._unsaved += len(texts)
+            due = self._unsaved >= self.save_every or time.monotonic() - self._last_save >= self.save_interval
+        if due:
+            self.save()
+
+    def encode(self, model, model_name: str, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """Embed `texts`, calling ``model.encode`` only for texts not cached yet.
+        `model` may also be a zero-argument callable returning the model; it is
+        only called when something is missing, so all-hit calls never load it."""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        cached = self.lookup(model_name, texts)
+        # encode each distinct missing text once
+        missing = list(OrderedDict.fromkeys(t for t, v in zip(texts, cached) if v is None))
+        if missing:
+            if not hasattr(model, "encode"):
+                model = model()
+            fresh = np.asarray(model.encode(missing, batch_size=batch_size, convert_to_numpy=True,
+                                            show_progress_bar=False), dtype=np.float32)
+            self.store(model_name, missing, fresh)
+            by_text = dict(zip(missing, fresh))
+            cached = [v if v is not None else by_text[t] for t, v in zip(texts, cached)]
+        return np.stack(cached).astype(np.float32, copy=False)
+
+    def save(self):
+        """Append what changed since the last save as new segments."""
+        with self._lock:
+            for shard in self._shards.values():
+                if shard.dirty:
+                    shard.save()
+            self._unsaved = 0
+            self._last_save = time.monotonic()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            entries = {name: len(s) for name, s in self._shards.items()}
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "hit_rate": (self.hits / total) if total else 0.0, "entries": entries, "unsaved": self._unsaved}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Process-wide cache; JOB_EMBED_CACHE_MAX and JOB_EMBED_CACHE_DTYPE tune it."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmbeddingCache(
+                    max_entries=int(os.environ.get("JOB_EMBED_CACHE_MAX", 200_000)),
+                    dtype=os.environ.get("JOB_EMBED_CACHE_DTYPE", "float16"),
+                )
+    return _cache
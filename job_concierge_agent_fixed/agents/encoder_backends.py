@@ -0,0 +1,332 @@
+"""Pluggable CPU inference backends for the sentence encoder.
+
+A model name may carry a backend suffix, e.g. ``"all-MiniLM-L6-v2@onnx-int8"``.
+The registry loads such a model through that backend. Because the suffix is
+part of the model name, embedding caches also stay separate per backend
+(quantized vectors drift slightly from the reference).
+  - "torch":      eager SentenceTransformer (the reference)
+  - "torch-int8": the same, with Linear layers dynamically quantized to int8
+  - "onnx":       the transformer exported once to ONNX, run by ONNX Runtime
+  - "onnx-int8":  that graph with dynamically int8-quantized weights
+Exports live under the cache root (``onnx/<model>``) and are reused. The
+ONNX backends need onnxruntime, plus onnx for the one-time export.
+
+Every backend keeps SentenceTransformer's ``encode`` signature, takes an
+intra-op thread count (JOB_ENCODE_THREADS) and batches by padded tokens:
+texts are length-sorted, and a batch holds `batch_size` typical texts'
+worth of tokens. Many short texts share one batch; long ones get small
+batches. `parity_check` reports the cosine drift and speedup of a backend
+against "torch".
+"""
+import json
+import logging
+import os
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from agents.cache_paths import cache_dir
+from agents.embedding_cache import l2_normalize
+from agents.model_registry import DEFAULT_MODEL
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+TOKENS_PER_TEXT = 128   # padded tokens budgeted per text of the nominal batch size
+MAX_BATCH_GROWTH = 8    # short texts pack at most this many times the nominal batch size
+
+SAMPLE_TEXTS = [
+    "Senior Python developer with 6 years of Django, PostgreSQL and AWS experience.",
+    "Data scientist: pandas, scikit-learn, A/B testing, SQL; built churn models for a telecom.",
+    "We are hiring a backend engineer to design REST APIs in Go and run services on Kubernetes.",
+    "Frontend engineer (React, TypeScript) for our design system team; remote within the EU.",
+    "Machine learning engineer to productionize NLP models; PyTorch, ONNX, Docker required.",
+    "Registered nurse, ICU, night shifts, BLS and ACLS certified.",
+    "Account executive selling B2B SaaS; 3+ years closing mid-market deals, Salesforce CRM.",
+    "DevOps engineer: Terraform, CI/CD pipelines, monitoring with Prometheus and Grafana. " * 6,
+]
+
+
+def split_name(name: str) -> Tuple[str, str]:
+    """``"model@backend"`` -> (model, backend); no suffix means "torch"."""
+    base, _, backend = name.partition("@")
+    backend = backend or "torch"
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown encoder backend {backend!r}; expected one of {BACKENDS}")
+    return base, backend
+
+
+def with_backend(name: str, backend: Optional[str]) -> str:
+    base, _ = split_name(name)
+    return base if backend in (None, "", "torch") else f"{base}@{backend}"
+
+
+def token_batches(lengths: np.ndarray, max_tokens: int, max_batch: int) -> List[np.ndarray]:
+    """Split text indices (sorted by token length) into batches whose padded
+    size, ``len(batch) * longest``, stays within `max_tokens`."""
+    order = np.argsort(lengths, kind="stable")
+    batches, start = [], 0
+    for end in range(1, len(order) + 1):
+        if end == len(order):
+            batches.append(order[start:end])
+            break
+        count = end + 1 - start
+        if count > max_batch or count * int(lengths[order[end]]) > max_tokens:
+            batches.append(order[start:end])
+            start = end
+    return batches
+
+
+def _resolve_threads(threads: Optional[int]) -> Optional[int]:
+    threads = threads or os.environ.get("JOB_ENCODE_THREADS")
+    return int(threads) if threads else None
+
+
+class EncoderBackend:
+    """Common batching and output handling; subclasses encode one batch."""
+
+    backend = "base"
+
+    def __init__(self, model_name: str, threads: Optional[int] = None, max_seq_length: int = 256):
+        self.model_name = model_name
+        self.threads = _resolve_threads(threads)
+        self.max_seq_length = max_seq_length
+        self.batches = 0
+
+    def _lengths(self, texts: List[str]) -> np.ndarray:
+        """Approximate token counts (about 1.3 word pieces per word)."""
+        return np.minimum([int(len(t.split()) * 1.3) + 2 for t in texts], self.max_seq_length)
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        raise NotImplementedError
+
+    def _encode_all(self, texts: List[str], batch_size: int) -> np.ndarray:
+        return self._run(len(texts), self._lengths(texts), lambda idx: self._encode_batch([texts[i] for i in idx]),
+                         batch_size)
+
+    def _run(self, n: int, lengths: np.ndarray, encode_batch, batch_size: int) -> np.ndarray:
+        out = None
+        for idx in token_batches(np.asarray(lengths), batch_size * TOKENS_PER_TEXT, batch_size * MAX_BATCH_GROWTH):
+            vecs = np.asarray(encode_batch(idx), dtype=np.float32)
+            if out is None:
+                out = np.empty((n, vecs.shape[1]), dtype=np.float32)
+            out[idx] = vecs
+            self.batches += 1
+        return out
+
+    def encode(self, sentences, batch_size: int = 32, convert_to_numpy: bool = True,
+               show_progress_bar: bool = False, normalize_embeddings: bool = False, **kwargs) -> np.ndarray:
+        """SentenceTransformer-compatible: one vector per sentence, as numpy."""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        vecs = self._encode_all(texts, max(1, int(batch_size)))
+        if normalize_embeddings:
+            vecs = l2_normalize(vecs)
+        return vecs[0] if single else vecs
+
+    def param_bytes(self) -> int:
+        return 0
+
+
+class TorchBackend(EncoderBackend):
+    """Eager PyTorch SentenceTransformer, optionally with dynamic int8 Linear layers."""
+
+    def __init__(self, model_name: str, threads: Optional[int] = None, quantize: bool = False):
+        import torch
+        from sentence_transformers import SentenceTransformer
+        self.backend = "torch-int8" if quantize else "torch"
+        threads = _resolve_threads(threads)
+        if threads:
+            torch.set_num_threads(threads)
+        model = SentenceTransformer(model_name, device="cpu")
+        model.eval()
+        if quantize:
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+        super().__init__(model_name, threads, max_seq_length=model.max_seq_length)
+        self.model = model
+        self.tokenizer = model.tokenizer
+        self._torch = torch
+
+    def _lengths(self, texts: List[str]) -> np.ndarray:
+        ids = self.tokenizer(texts, truncation=True, max_length=self.max_seq_length)["input_ids"]
+        return np.array([len(x) for x in ids])
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        with self._torch.inference_mode():
+            return self.model.encode(texts, batch_size=len(texts), convert_to_numpy=True, show_progress_bar=False)
+
+    def parameters(self):
+        return self.model.parameters()
+
+    def param_bytes(self) -> int:
+        # quantized Linear weights are packed and no longer show up as parameters
+        state = self.model.state_dict()
+        return int(sum(v.numel() * v.element_size() for v in state.values() if hasattr(v, "element_size")))
+
+
+def _export_dir(model_name: str) -> str:
+    return cache_dir("onnx", re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name))
+
+
+def export_onnx(model_name: str, quantize: bool = False, directory: Optional[str] = None) -> str:
+    """Export the model's transformer to ONNX (once) and return the graph path.
+
+    The tokenizer and the pooling setup are saved next to the graph, so
+    inference needs neither torch nor sentence-transformers.
+    """
+    directory = directory or _export_dir(model_name)
+    fp32 = os.path.join(directory, "model.onnx")
+    if not os.path.exists(fp32):
+        import torch
+        from sentence_transformers import SentenceTransformer
+        from sentence_transformers.models import Normalize, Pooling
+
+        st = SentenceTransformer(model_name, device="cpu")
+        st.eval()
+        pooling = next((m for m in st if isinstance(m, Pooling)), None)
+        meta = {
+            "model_name": model_name,
+            "pooling": pooling.get_pooling_mode_str() if pooling is not None else "mean",
+            "normalize": any(isinstance(m, Normalize) for m in st),
+            "max_seq_length": st.max_seq_length,
+        }
+        st.tokenizer.save_pretrained(directory)
+        dummy = st.tokenizer(["export the encoder"], return_tensors="pt")
+        names = [k for k in ("input_ids", "attention_mask", "token_type_ids") if k in dummy]
+        meta["inputs"] = names
+        tmp = fp32 + ".tmp"
+        with torch.inference_mode():
+            torch.onnx.export(
+                st[0].auto_model, tuple(dummy[k] for k in names), tmp, input_names=names,
+                output_names=["token_embeddings"], opset_version=14, do_constant_folding=True,
+                dynamic_axes={**{k: {0: "batch", 1: "seq"} for k in names},
+                              "token_embeddings": {0: "batch", 1: "seq"}})
+        os.replace(tmp, fp32)
+        with open(os.path.join(directory, "encoder.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        logger.info(f"Exported {model_name} to ONNX at {fp32}")
+    if not quantize:
+        return fp32
+
+    int8 = os.path.join(directory, "model.int8.onnx")
+    if not os.path.exists(int8):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        tmp = int8 + ".tmp"
+        quantize_dynamic(fp32, tmp, weight_type=QuantType.QInt8)
+        os.replace(tmp, int8)
+        logger.info(f"Quantized ONNX graph for {model_name} to int8")
+    return int8
+
+
+class OnnxBackend(EncoderBackend):
+    """ONNX Runtime on CPU, pooling in numpy; tokenization happens once per call."""
+
+    def __init__(self, model_name: str, threads: Optional[int] = None, quantize: bool = False,
+                 directory: Optional[str] = None):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+        self.backend = "onnx-int8" if quantize else "onnx"
+        directory = directory or _export_dir(model_name)
+        self.path = export_onnx(model_name, quantize=quantize, directory=directory)
+        with open(os.path.join(directory, "encoder.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        super().__init__(model_name, threads, max_seq_length=self.meta["max_seq_length"])
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.inter_op_num_threads = 1
+        if self.threads:
+            options.intra_op_num_threads = self.threads
+        self.session = ort.InferenceSession(self.path, options, providers=["CPUExecutionProvider"])
+        self.inputs = [i.name for i in self.session.get_inputs()]
+        self.tokenizer = AutoTokenizer.from_pretrained(directory)
+
+    def _encode_all(self, texts: List[str], batch_size: int) -> np.ndarray:
+        enc = self.tokenizer(texts, truncation=True, max_length=self.max_seq_length)
+        features = {k: enc[k] for k in self.inputs}
+        lengths = np.array([len(x) for x in features["input_ids"]])
+
+        def encode_batch(idx):
+            width = int(lengths[idx].max())
+            feeds = {}
+            for k, rows in features.items():
+                arr = np.zeros((len(idx), width), dtype=np.int64)
+                for r, i in enumerate(idx.tolist()):
+                    arr[r, :lengths[i]] = rows[i]
+                feeds[k] = arr
+            tokens = self.session.run(["token_embeddings"], feeds)[0]
+            return self._pool(tokens, feeds["attention_mask"])
+
+        return self._run(len(texts), lengths, encode_batch, batch_size)
+
+    def _pool(self, tokens: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        mode = self.meta["pooling"]
+        if mode == "cls":
+            vecs = tokens[:, 0]
+        elif mode == "max":
+            vecs = np.where(mask[:, :, None] > 0, tokens, -np.inf).max(axis=1)
+        else:
+            weights = mask[:, :, None].astype(np.float32)
+            vecs = (tokens * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+        vecs = vecs.astype(np.float32, copy=False)
+        return l2_normalize(vecs) if self.meta["normalize"] else vecs
+
+    def param_bytes(self) -> int:
+        return os.path.getsize(self.path)
+
+
+def load_encoder(name: str, threads: Optional[int] = None) -> EncoderBackend:
+    """Build the encoder for a (possibly suffixed) model name."""
+    base, backend = split_name(name)
+    if backend.startswith("onnx"):
+        return OnnxBackend(base, threads=threads, quantize=backend == "onnx-int8")
+    return TorchBackend(base, threads=threads, quantize=backend == "torch-int8")
+
+
+def _throughput(encoder, texts: List[str], batch_size: int, repeats: int) -> Tuple[np.ndarray, float]:
+    encoder.encode(texts[:batch_size], batch_size=batch_size)  # warm-up
+    best = float("inf")
+    for _ in range(max(1, repeats)):
+        start = time.perf_counter()
+        vecs = encoder.encode(texts, batch_size=batch_size)
+        best = min(best, time.perf_counter() - start)
+    return np.asarray(vecs, dtype=np.float32), len(texts) / best
+
+
+def parity_check(name: str = DEFAULT_MODEL, backend: str = "onnx-int8", texts: Optional[List[str]] = None,
+                 reference: Optional[EncoderBackend] = None, threads: Optional[int] = None,
+                 batch_size: int = 32, repeats: int = 3) -> Dict:
+    """Cosine drift and throughput of `backend` against the eager torch encoder.
+
+    Returns the mean / min cosine between the two encodings of every text
+    (``max_drift`` is ``1 - min_cosine``) and texts per second for both.
+    """
+    base, _ = split_name(name)
+    texts = list(texts or SAMPLE_TEXTS * 8)
+    reference = reference or load_encoder(base, threads=threads)
+    candidate = load_encoder(with_backend(base, backend), threads=threads)
+    ref_vecs, ref_rate = _throughput(reference, texts, batch_size, repeats)
+    vecs, rate = _throughput(candidate, texts, batch_size, repeats)
+    cos = (l2_normalize(ref_vecs) * l2_normalize(vecs)).sum(axis=1)
+    report = {
+        "model": base,
+        "backend": backend,
+        "texts": len(texts),
+        "threads": candidate.threads,
+        "mean_cosine": round(float(cos.mean()), 6),
+        "min_cosine": round(float(cos.min()), 6),
+        "max_drift": round(float(1 - cos.min()), 6),
+        "reference_texts_per_s": round(ref_rate, 1),
+        "texts_per_s": round(rate, 1),
+        "speedup": round(rate / ref_rate, 2),
+        "param_bytes": candidate.param_bytes(),
+        "reference_param_bytes": reference.param_bytes(),
+    }
+    logger.info(f"Encoder parity {base}@{backend}: mean cos {report['mean_cosine']}, "
+                f"speedup {report['speedup']}x")
+    return report
@@ -0,0 +1,145 @@
+"""Declarative job-card extraction for the scrapers.
+
+Each site is described once in `SITE_SPECS`: the search URL template, the
+job-card selector, and per field a (selector, attribute) pair with a default.
+One engine runs every spec:
+  - only elements matching the card's tag and class are built into a tree
+    (a SoupStrainer), using lxml when it is installed
+  - each distinct selector is evaluated once per card, so "title" and "url"
+    can share "a.title" without a second lookup
+  - relative links are resolved against the site's base URL
+`extract_pages` parses many saved pages at once on a process pool, which is
+where parsing actually runs in parallel.
+"""
+import logging
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+logger = logging.getLogger(__name__)
+
+try:
+    import lxml  # noqa: F401
+    PARSER = "lxml"
+except ImportError:
+    PARSER = "html.parser"
+
+# field -> (selector, attribute); attribute None means the element's stripped text,
+# selector None means the card itself
+SITE_SPECS: Dict[str, Dict] = {
+    "indeed": {
+        "label": "Indeed",
+        "search_url": "https://in.indeed.com/jobs?q={query}&l={location}",
+        "query_sep": "+",
+        "base_url": "https://in.indeed.com",
+        "card": "div.job_seen_beacon",
+        "fields": {
+            "title": ("h2.jobTitle", None),
+            "company": ("span.companyName", None),
+            "description": ("div.job-snippet", None),
+            "url": ("a", "href"),
+        },
+    },
+    "naukri": {
+        "label": "Naukri",
+        "search_url": "https://www.naukri.com/{query}-jobs",
+        "query_sep": "-",
+        "card": "article.jobTuple.bgWhite",
+        "fields": {
+            "title": ("a.title", None),
+            "company": ("a.subTitle", None),
+            "description": ("div.job-description", None),
+            "url": ("a.title", "href"),
+        },
+    },
+    "linkedin": {
+        "label": "LinkedIn",
+        "search_url": "https://www.linkedin.com/jobs/search/?keywords={query}&location={location}",
+        "query_sep": "%20",
+        "card": "div.base-card",
+        "fields": {
+            "title": ("h3.base-search-card__title", None),
+            "company": ("h4.base-search-card__subtitle", None),
+            "url": ("a.base-card__full-link", "href"),
+        },
+        "defaults": {"description": "LinkedIn does not expose full job description in HTML search results."},
+    },
+}
+
+FIELD_DEFAULTS = {"title": "No Title", "company": "Unknown", "description": ""}
+
+_SIMPLE_SELECTOR = re.compile(r"^([a-zA-Z][\w-]*)?((?:\.[\w-]+)*)$")
+
+
+def search_url(site: str, query: str, location: str = "India") -> str:
+    spec = SITE_SPECS[site]
+    sep = spec["query_sep"]
+    return spec["search_url"].format(query=query.replace(" ", sep), location=location.replace(" ", sep))
+
+
+def card_strainer(selector: str) -> Optional[SoupStrainer]:
+    """SoupStrainer for ``tag.class...`` selectors (tag and first class); None
+    when the selector is more complex and the whole page must be parsed."""
+    m = _SIMPLE_SELECTOR.match(selector.strip())
+    if not m or not (m.group(1) or m.group(2)):
+        return None
+    classes = [c for c in m.group(2).split(".") if c]
+    # the class attribute is still one unsplit string when the strainer runs
+    kwargs = {"class_": re.compile(rf"(?:^|\s){re.escape(classes[0])}(?:\s|$)")} if classes else {}
+    return SoupStrainer(m.group(1) or True, **kwargs)
+
+
+def _field_value(el, attr: Optional[str]) -> Optional[str]:
+    if el is None:
+        return None
+    if attr is None:
+        return el.get_text().strip()
+    return el.get(attr)
+
+
+def extract_cards(site: str, html: str, page_url: str, limit: Optional[int] = None) -> List[Dict]:
+    """Field dicts (title, company, description, url, ...) for the job cards on one page."""
+    spec = SITE_SPECS[site]
+    soup = BeautifulSoup(html, PARSER, parse_only=card_strainer(spec["card"]))
+    defaults = dict(FIELD_DEFAULTS, **spec.get("defaults", {}))
+    base = spec.get("base_url")
+    out = []
+    for card in soup.select(spec["card"], limit=limit):
+        found = {}
+        record = dict(defaults)
+        for field, (selector, attr) in spec["fields"].items():
+            if selector not in found:
+                found[selector] = card if selector is None else card.select_one(selector)
+            value = _field_value(found[selector], attr)
+            if value is not None:
+                record[field] = value
+        link = record.get("url")
+        record["url"] = (urljoin(base, link) if base else link) if link else page_url
+        out.append(record)
+    return out
+
+
+def timed_extract(site: str, html: str, page_url: str, limit: Optional[int] = None) -> Tuple[List[Dict], float]:
+    """`extract_cards` plus the CPU seconds this thread spent on it."""
+    start = time.thread_time()
+    cards = extract_cards(site, html, page_url, limit)
+    return cards, time.thread_time() - start
+
+
+def _extract_one(args):
+    return timed_extract(*args)
+
+
+def extract_pages(pages: List[Tuple[str, str, str]], limit: Optional[int] = None,
+                  max_workers: Optional[int] = None) -> List[Tuple[List[Dict], float]]:
+    """Extract many ``(site, html, page_url)`` pages; with more than one worker
+    they are parsed on a process pool. Returns (cards, cpu seconds) per page, in order."""
+    tasks = [(site, html, url, limit) for site, html, url in pages]
+    if max_workers == 1 or len(tasks) < 2:
+        return [_extract_one(t) for t in tasks]
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(_extract_one, tasks, chunksize=max(1, len(tasks) // 32)))
@@ -0,0 +1,256 @@
+"""On-disk HTTP response cache for the job scrapers.
+
+Entries are keyed by normalized URL and stored as raw body + JSON metadata.
+Modes:
+  - "normal": serve fresh entries (TTL), revalidate stale ones with ETag /
+    Last-Modified, fetch and store on miss.
+  - "record": always hit the network and pin the raw HTML for later replay.
+  - "replay": never touch the network; serve stored HTML regardless of age.
+  - "off":    pass-through.
+Defaults can be set with JOB_HTTP_CACHE_MODE / _TTL / _MAX_MB / _DIR.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import requests
+
+from agents.cache_paths import cache_dir
+
+logger = logging.getLogger(__name__)
+
+MODES = ("normal", "record", "replay", "off")
+
+
+class CacheMiss(Exception):
+    """Raised in replay mode when a URL was never recorded."""
+
+
+class CachedResponse:
+    """Minimal response object exposing what the scrapers use."""
+
+    def __init__(self, text: str, status_code: int, from_cache: bool, url: str = ""):
+        self.text = text
+        self.status_code = status_code
+        self.from_cache = from_cache
+        self.url = url
+
+    def raise_for_status(self):
+        # same contract as requests.Response, so callers need not care where the body came from
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error (cached) for url: {self.url}")
+
+
+def normalize_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    port = parts.port
+    if port and not ((scheme == "http" and port == 80) or (scheme == "https" and port == 443)):
+        host = f"{host}:{port}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+
+class HTTPCache:
+    def __init__(self, directory: Optional[str] = None, ttl: float = 900.0,
+                 max_bytes: int = 50 * 1024 * 1024, mode: str = "normal"):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cache mode {mode!r}; expected one of {MODES}")
+        self.directory = directory or cache_dir("http")
+        os.makedirs(self.directory, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._index = None  # key -> meta, loaded lazily
+        self.stats = {"hits": 0, "misses": 0, "revalidated": 0, "evictions": 0}
+
+    # ---- storage ----
+    def _key(self, url: str) -> str:
+        return hashlib.sha1(normalize_url(url).encode("utf-8")).hexdigest()
+
+    def _paths(self, key: str):
+        return os.path.join(self.directory, key + ".body"), os.path.join(self.directory, key + ".json")
+
+    def _load_index(self) -> Dict[str, Dict]:
+        if self._index is None:
+            index = {}
+            for name in os.listdir(self.directory):
+                if not name.endswith(".json"):
+                    continue
+                try:
+                    with open(os.path.join(self.directory, name), encoding="utf-8") as f:
+                        index[name[:-5]] = json.load(f)
+                except Exception:
+                    logger.warning(f"Skipping unreadable cache entry {name}")
+            self._index = index
+        return self._index
+
+    def _read(self, key: str) -> Optional[Dict]:
+        meta = self._load_index().get(key)
+        if meta is None:
+            return None
+        body_path, _ = self._paths(key)
+        try:
+            with open(body_path, "rb") as f:
+                meta = dict(meta, body=f.read())
+        except OSError:
+            self._load_index().pop(key, None)
+            return None
+        return meta
+
+    def _write_meta(self, key: str, meta: Dict):
+        _, meta_path = self._paths(key)
+        tmp = meta_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, meta_path)
+        self._load_index()[key] = meta
+
+    def _store(self, key: str, url: str, resp, pinned: bool):
+        body_path, _ = self._paths(key)
+        tmp = body_path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(resp.content)
+        os.replace(tmp, body_path)
+        self._write_meta(key, {
+            "url": normalize_url(url),
+            "status": resp.status_code,
+            "encoding": resp.encoding or "utf-8",
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+            "stored_at": time.time(),
+            "size": len(resp.content),
+            "pinned": pinned,
+        })
+        self._evict()
+
+    def _evict(self):
+        index = self._load_index()
+        total = sum(m.get("size", 0) for m in index.values())
+        if total <= self.max_bytes:
+            return
+        # oldest unpinned entries go first; recorded fixtures are kept for replay
+        for key, meta in sorted(index.items(), key=lambda kv: kv[1].get("stored_at", 0)):
+            if total <= self.max_bytes:
+                break
+            if meta.get("pinned"):
+                continue
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            index.pop(key, None)
+            total -= meta.get("size", 0)
+            self.stats["evictions"] += 1
+
+    @staticmethod
+    def _response(entry: Dict) -> CachedResponse:
+        text = entry["body"].decode(entry.get("encoding") or "utf-8", errors="replace")
+        return CachedResponse(text, entry.get("status", 200), from_cache=True, url=entry.get("url", ""))
+
+    # ---- public API ----
+    def get(self, session, url: str, timeout: float = 10.0, headers: Optional[Dict] = None):
+        if self.mode == "off":
+            return session.get(url, headers=headers, timeout=timeout)
+
+        key = self._key(url)
+        with self._lock:
+            entry = self._read(key)
+
+        if self.mode == "replay":
+            if entry is None:
+                self.stats["misses"] += 1
+                raise CacheMiss(f"No recorded response for {normalize_url(url)}")
+            self.stats["hits"] += 1
+            return self._response(entry)
+
+        if self.mode == "normal" and entry is not None:
+            if time.time() - entry["stored_at"] < self.ttl:
+                self.stats["hits"] += 1
+                return self._response(entry)
+            # stale: try a conditional request
+            cond = dict(headers or {})
+            if entry.get("etag"):
+                cond["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                cond["If-Modified-Since"] = entry["last_modified"]
+            if len(cond) > len(headers or {}):
+                resp = session.get(url, headers=cond, timeout=timeout)
+                if resp.status_code == 304:
+                    self.stats["revalidated"] += 1
+                    with self._lock:
+                        meta = {k: v for k, v in entry.items() if k != "body"}
+                        meta["stored_at"] = time.time()
+                        self._write_meta(key, meta)
+                    return self._response(entry)
+                self.stats["misses"] += 1
+                if resp.status_code == 200:
+                    with self._lock:
+                        self._store(key, url, resp, pinned=False)
+                return resp
+
+        self.stats["misses"] += 1
+        resp = session.get(url, headers=headers, timeout=timeout)
+        if resp.status_code == 200:
+            with self._lock:
+                self._store(key, url, resp, pinned=self.mode == "record")
+        return resp
+
+    def put(self, url: str, body: bytes, status: int = 200, encoding: str = "utf-8", pinned: bool = True):
+        """Store a response directly, e.g. a fixture to be served in replay mode."""
+        key = self._key(url)
+        body_path, _ = self._paths(key)
+        with self._lock:
+            tmp = body_path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(body)
+            os.replace(tmp, body_path)
+            self._write_meta(key, {"url": normalize_url(url), "status": status, "encoding": encoding,
+                                   "etag": None, "last_modified": None, "stored_at": time.time(),
+                                   "size": len(body), "pinned": pinned})
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._load_index()):
+                for path in self._paths(key):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+            self._index = {}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_http_cache() -> HTTPCache:
+    """Process-wide cache configured from JOB_HTTP_CACHE_* environment variables."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = HTTPCache(
+                    directory=os.environ.get("JOB_HTTP_CACHE_DIR"),
+                    ttl=float(os.environ.get("JOB_HTTP_CACHE_TTL", 900)),
+                    max_bytes=int(float(os.environ.get("JOB_HTTP_CACHE_MAX_MB", 50)) * 1024 * 1024),
+                    mode=os.environ.get("JOB_HTTP_CACHE_MODE", "normal"),
+                )
+    return _cache
+
+
+def configure_http_cache(**kwargs) -> HTTPCache:
+    """Replace the process-wide cache, e.g. ``configure_http_cache(mode="replay", directory=...)``."""
+    global _cache
+    with _cache_lock:
+        _cache = HTTPCache(**kwargs)
+    return _cache
@@ -1,41 +1,195 @@
-"""Job Description Matcher Agent (Embedding-based)."""
+"""Job Description Matcher Agent (Embedding-based).
 
-from typing import List, Dict
+With ``pooling`` set, texts longer than the model's input window are encoded
+in overlapping chunks (see agents.chunked_encoder) instead of being
+truncated. Resumes are chunked on their own through ``resume_pooling``,
+which defaults to JOB_RESUME_POOLING ("mean"; "none" turns it off). Job
+descriptions are short enough to be encoded whole. A resume that fits in
+one chunk gets the same vector either way.
+"""
+
+from typing import List, Dict, Optional, Tuple
 import logging
-from sentence_transformers import SentenceTransformer, util
+import os
+import numpy as np
+from agents.chunked_encoder import ChunkedEncoder, POOLINGS
+from agents.model_registry import get_model, DEFAULT_MODEL
+from agents.embedding_cache import EmbeddingCache, get_embedding_cache, l2_normalize
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_RESUME_POOLING = os.environ.get("JOB_RESUME_POOLING", "mean")
+
+
+def topk_similarity(queries: np.ndarray, docs: np.ndarray, k: Optional[int] = None,
+                    threshold: Optional[float] = None, query_chunk: int = 256,
+                    doc_chunk: int = 65536) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-query top-k over ``queries @ docs.T`` without materializing the full matrix.
+
+    Works on (query_chunk x doc_chunk) tiles and keeps a running top-k per query
+    with argpartition. Returns ``(indices, scores)`` of shape (n_queries, k), sorted
+    by descending score; slots below `threshold` (or beyond the corpus) hold
+    index -1 and score -inf.
+    """
+    n, m = len(queries), len(docs)
+    k = m if k is None else min(k, m)
+    idx_out = np.full((n, k), -1, dtype=np.int64)
+    score_out = np.full((n, k), -np.inf, dtype=np.float32)
+    if n == 0 or k == 0:
+        return idx_out, score_out
+
+    for q0 in range(0, n, query_chunk):
+        q = queries[q0:q0 + query_chunk]
+        best_idx = np.empty((len(q), 0), dtype=np.int64)
+        best_score = np.empty((len(q), 0), dtype=np.float32)
+        for d0 in range(0, m, doc_chunk):
+            tile = (q @ docs[d0:d0 + doc_chunk].T).astype(np.float32, copy=False)
+            tile_idx = np.broadcast_to(np.arange(d0, d0 + tile.shape[1]), tile.shape)
+            cand_score = np.concatenate([best_score, tile], axis=1)
+            cand_idx = np.concatenate([best_idx, tile_idx], axis=1)
+            if cand_score.shape[1] > k:
+                part = np.argpartition(-cand_score, k - 1, axis=1)[:, :k]
+                cand_score = np.take_along_axis(cand_score, part, axis=1)
+                cand_idx = np.take_along_axis(cand_idx, part, axis=1)
+            best_score, best_idx = cand_score, cand_idx
+        order = np.argsort(-best_score, axis=1, kind="stable")
+        best_score = np.take_along_axis(best_score, order, axis=1)
+        best_idx = np.take_along_axis(best_idx, order, axis=1)
+        if threshold is not None:
+            keep = best_score >= threshold
+            best_idx = np.where(keep, best_idx, -1)
+            best_score = np.where(keep, best_score, -np.inf)
+        idx_out[q0:q0 + len(q)] = best_idx
+        score_out[q0:q0 + len(q)] = best_score
+    return idx_out, score_out
+
+
+def topk_from_scores(scores: np.ndarray, k: Optional[int] = None,
+                     threshold: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """`topk_similarity` output for an already computed (queries x docs) score matrix."""
+    n, m = scores.shape
+    k = m if k is None else min(k, m)
+    if k < m:
+        idx = np.argpartition(-scores, k - 1, axis=1)[:, :k] if k else np.zeros((n, 0), dtype=np.int64)
+    else:
+        idx = np.broadcast_to(np.arange(m), (n, m))
+    top = np.take_along_axis(scores, idx, axis=1).astype(np.float32)
+    order = np.argsort(-top, axis=1, kind="stable")
+    idx = np.take_along_axis(idx, order, axis=1).astype(np.int64)
+    top = np.take_along_axis(top, order, axis=1)
+    if threshold is not None:
+        keep = top >= threshold
+        idx = np.where(keep, idx, -1)
+        top = np.where(keep, top, -np.inf).astype(np.float32)
+    return idx, top
+
+
 class JDMatcher:
-    def __init__(self):
-        # Much more accurate than TF-IDF
-        self.model = SentenceTransformer("all-MiniLM-L6-v2")
-        logger.info("Loaded embedding model: all-MiniLM-L6-v2")
+    def __init__(self, model_name: str = DEFAULT_MODEL, cache: Optional[EmbeddingCache] = None,
+                 pooling: Optional[str] = None, max_words: int = 180, overlap: int = 40,
+                 batch_size: Optional[int] = None, resume_pooling: Optional[str] = DEFAULT_RESUME_POOLING):
+        """`pooling` None encodes whole texts (truncated by the model); "mean" or
+        "max" pool chunk vectors per text; "best" scores by best chunk pair.
+        `resume_pooling` ("mean", "max" or None) chunks only the resume side
+        when `pooling` is None."""
+        if pooling is not None and pooling not in POOLINGS:
+            raise ValueError(f"Unknown pooling {pooling!r}; expected one of {POOLINGS}")
+        resume_pooling = None if resume_pooling in (None, "", "none") else resume_pooling
+        if resume_pooling not in (None, "mean", "max"):
+            raise ValueError(f"Unknown resume pooling {resume_pooling!r}; expected 'mean', 'max' or None")
+        # Much more accurate than TF-IDF; shared process-wide via the registry
+        self.model_name = model_name
+        # unchanged resumes/postings are never re-encoded
+        self.cache = cache if cache is not None else get_embedding_cache()
+        self.batch_size = batch_size or int(os.environ.get("JOB_ENCODE_BATCH", 32))
+        self.pooling = pooling
+        self.resume_pooling = resume_pooling if pooling is None else None
+        self.chunker = None
+        if pooling is not None or self.resume_pooling is not None:
+            self.chunker = ChunkedEncoder(model_name, self.cache, max_words=max_words, overlap=overlap,
+                                          batch_size=self.batch_size)
+
+    @property
+    def model(self):
+        # resolved lazily so constructing a matcher never blocks on a model load
+        return get_model(self.model_name)
 
-    def score(self, resume_text: str, job_descriptions: List[Dict]) -> List[Dict]:
+    @property
+    def resume_model(self) -> str:
+        """Tag for stored resume vectors: the model plus how long resumes were pooled."""
+        mode = self.pooling or self.resume_pooling
+        return f"{self.model_name}#{mode}" if mode else self.model_name
 
-        # Prepare job description list
-        docs = [jd["description"] for jd in job_descriptions]
+    def embed_resumes(self, texts: List[str]) -> np.ndarray:
+        """`embed` for resumes: long ones are chunked and pooled per `resume_pooling`."""
+        if self.resume_pooling is not None:
+            return self.chunker.encode(texts, self.resume_pooling)
+        return self.embed(texts)
 
-        # Embed all text
-        resume_emb = self.model.encode(resume_text, convert_to_tensor=True)
-        job_embs = self.model.encode(docs, convert_to_tensor=True)
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """L2-normalized embeddings for `texts`, served from the cache where possible."""
+        if self.pooling is not None:
+            # "best" still needs one vector per text for indexes; mean-pool for it
+            return self.chunker.encode(texts, "max" if self.pooling == "max" else "mean")
+        # the model is only resolved when something is missing from the cache
+        vecs = self.cache.encode(lambda: self.model, self.model_name, texts, batch_size=self.batch_size)
+        return l2_normalize(vecs)
 
-        # Compute cosine similarity (vectorized)
-        similarities = util.cos_sim(resume_emb, job_embs).cpu().numpy()[0]
+    def score_batch(self, resume_texts: List[str], job_descriptions: List[Dict], top_k: Optional[int] = None,
+                    threshold: Optional[float] = None, query_chunk: int = 256,
+                    doc_chunk: int = 65536) -> Tuple[np.ndarray, np.ndarray]:
+        """Score N resumes against M jobs.
 
+        Returns compact ``(indices, scores)`` arrays of shape (N, top_k) indexing
+        into `job_descriptions`; see `topk_similarity`. Use `build_results` to
+        turn one row into result dicts.
+        """
+        if not resume_texts or not job_descriptions:
+            k = 0 if top_k is None else top_k
+            return np.full((len(resume_texts), k), -1, dtype=np.int64), np.full((len(resume_texts), k), -np.inf, dtype=np.float32)
+        if self.pooling == "best":
+            scores = self.chunker.best_scores(resume_texts, [jd["description"] for jd in job_descriptions])
+            return topk_from_scores(scores, top_k, threshold)
+        if self.resume_pooling is not None:
+            resume_embs = self.embed_resumes(list(resume_texts))
+            job_embs = self.embed([jd["description"] for jd in job_descriptions])
+        else:
+            # one cache lookup / encoder pass for both sides
+            embs = self.embed(list(resume_texts) + [jd["description"] for jd in job_descriptions])
+            resume_embs, job_embs = embs[:len(resume_texts)], embs[len(resume_texts):]
+        return topk_similarity(resume_embs, job_embs, k=top_k, threshold=threshold,
+                               query_chunk=query_chunk, doc_chunk=doc_chunk)
+
+    @staticmethod
+    def build_results(job_descriptions: List[Dict], indices: np.ndarray, scores: np.ndarray) -> List[Dict]:
+        """Result dicts for one row of `score_batch` output (padding slots are skipped)."""
         results = []
-        for jd, score in zip(job_descriptions, similarities):
-            results.append({
+        for i, score in zip(indices.tolist(), scores.tolist()):
+            if i < 0:
+                continue
+            jd = job_descriptions[i]
+            result = {
                 "job_id": jd["id"],
                 "title": jd["title"],
                 "company": jd["company"],
                 "url": jd["url"],
                 "score": float(score),
                 "description": jd["description"]
-            })
+            }
+            if "sources" in jd:
+                # links to every site the (deduplicated) posting was found on
+                result["sources"] = jd["sources"]
+            results.append(result)
+        return results
+
+    def score(self, resume_text: str, job_descriptions: List[Dict], top_k: Optional[int] = None,
+              threshold: Optional[float] = None) -> List[Dict]:
+        if not job_descriptions:
+            return []
 
-        results.sort(key=lambda x: x["score"], reverse=True)
+        indices, scores = self.score_batch([resume_text], job_descriptions, top_k=top_k, threshold=threshold)
+        results = self.build_results(job_descriptions, indices[0], scores[0])
 
-        logger.info(f"Scored {len(results)} jobs; top score={results[0]['score']:.4f}")
+        if results:
+            logger.info(f"Scored {len(job_descriptions)} jobs; top score={results[0]['score']:.4f}")
         return results
@@ -1,135 +1,225 @@
 """
 Real Job Scraper — Indeed, Naukri, LinkedIn (Safe HTML Scraping)
+
+All sources share one pooled keep-alive HTTP session and are fetched
+concurrently by `fetch_from_sources_parallel`. New sources can be plugged in
+with `register_source`. Responses go through `agents.http_cache`, which can
+also record and replay raw HTML for offline runs. Card extraction is driven
+by the per-site specs in `agents.html_extract`.
 """
 
+import hashlib
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
 import logging
-from typing import List, Dict
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import List, Dict, Callable, Optional
 
-logger = logging.getLogger(__name__)
+from agents.html_extract import SITE_SPECS, search_url, timed_extract
+from agents.http_cache import get_http_cache, normalize_url
+from observability.metrics import observe, incr
 
+logger = logging.getLogger(__name__)
 
-# -------------------------
-# 1. INDEED SCRAPER
-# -------------------------
-def scrape_indeed(query: str, location: str = "India", limit=5) -> List[Dict]:
+DEFAULT_HEADERS = {"User-Agent": "Mozilla/5.0"}
+SOURCE_TIMEOUT = 10.0     # per-source deadline (seconds)
+OVERALL_TIMEOUT = 12.0    # deadline for the whole fan-out (seconds)
+
+_session = None
+_session_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="job-scraper")
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide pooled keep-alive session used by all scrapers."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16)
+                s.mount("http://", adapter)
+                s.mount("https://", adapter)
+                s.headers.update(DEFAULT_HEADERS)
+                _session = s
+    return _session
+
+
+def stable_job_id(source: str, link: str, search_url: str, title: str, company: str) -> str:
+    """Id that survives re-scrapes: hash of the posting URL, or of title+company
+    when the card only links back to the search page."""
+    if link and link != search_url:
+        key = normalize_url(link.split("?")[0] if source == "linkedin" else link)
+    else:
+        key = f"{title.strip().lower()}|{company.strip().lower()}"
+    return f"{source}_{hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]}"
+
+
+def _get(url: str, timeout: float = SOURCE_TIMEOUT):
+    # goes through the on-disk response cache (TTL / revalidation / replay)
+    return get_http_cache().get(get_session(), url, timeout=timeout)
+
+
+def scrape_site(site: str, query: str, limit=5, timeout: float = SOURCE_TIMEOUT,
+                location: str = "India") -> List[Dict]:
+    """Fetch one search page of `site` and extract its job cards (see agents.html_extract).
+    Network errors and error statuses propagate, so callers can tell a failed
+    source from one that had no matching jobs."""
     jobs = []
-    q = query.replace(" ", "+")
-    loc = location.replace(" ", "+")
-
-    url = f"https://in.indeed.com/jobs?q={q}&l={loc}"
-
-    try:
-        res = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=10)
-        soup = BeautifulSoup(res.text, "html.parser")
-
-        cards = soup.select("div.job_seen_beacon")[:limit]
-
-        for i, card in enumerate(cards):
-            title = card.select_one("h2.jobTitle").text.strip() if card.select_one("h2.jobTitle") else "No Title"
-            company = card.select_one("span.companyName").text.strip() if card.select_one("span.companyName") else "Unknown"
-            desc = card.select_one("div.job-snippet").text.strip() if card.select_one("div.job-snippet") else ""
-            jobs.append({
-                "id": f"indeed_{i}",
-                "title": title,
-                "company": company,
-                "url": f"https://in.indeed.com{card.a['href']}" if card.a else url,
-                "description": desc
-            })
-
-        logger.info(f"Indeed scraped {len(jobs)} jobs")
-
-    except Exception as e:
-        logger.error("Indeed scraping error: %s", e)
-
+    spec = SITE_SPECS[site]
+    url = search_url(site, query, location)
+
+    res = _get(url, timeout=timeout)
+    res.raise_for_status()
+    cards, cpu = timed_extract(site, res.text, url, limit=limit)
+    observe("scrape_parse_cpu_seconds", cpu, source=site)
+
+    for card in cards:
+        jobs.append({
+            "id": stable_job_id(site, card["url"], url, card["title"], card["company"]),
+            "title": card["title"],
+            "company": card["company"],
+            "url": card["url"],
+            "description": card["description"],
+            "source": site,
+        })
+
+    logger.info(f"{spec['label']} scraped {len(jobs)} jobs")
     return jobs
 
 
-# -------------------------
-# 2. NAUKRI SCRAPER
-# -------------------------
-def scrape_naukri(query: str, limit=5) -> List[Dict]:
-    jobs = []
-    q = query.replace(" ", "-")
-    url = f"https://www.naukri.com/{q}-jobs"
-
-    try:
-        res = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=10)
-        soup = BeautifulSoup(res.text, "html.parser")
+def scrape_indeed(query: str, location: str = "India", limit=5, timeout: float = SOURCE_TIMEOUT) -> List[Dict]:
+    return scrape_site("indeed", query, limit=limit, timeout=timeout, location=location)
 
-        cards = soup.select("article.jobTuple.bgWhite")[:limit]
 
-        for i, card in enumerate(cards):
-            title = card.select_one("a.title").text.strip() if card.select_one("a.title") else "No Title"
-            company = card.select_one("a.subTitle").text.strip() if card.select_one("a.subTitle") else "Unknown"
-            desc = card.select_one("div.job-description").text.strip() if card.select_one("div.job-description") else ""
+def scrape_naukri(query: str, limit=5, timeout: float = SOURCE_TIMEOUT) -> List[Dict]:
+    return scrape_site("naukri", query, limit=limit, timeout=timeout)
 
-            jobs.append({
-                "id": f"naukri_{i}",
-                "title": title,
-                "company": company,
-                "url": card.select_one("a.title")["href"] if card.select_one("a.title") else url,
-                "description": desc
-            })
 
-        logger.info(f"Naukri scraped {len(jobs)} jobs")
-
-    except Exception as e:
-        logger.error("Naukri scraping error: %s", e)
-
-    return jobs
+# LinkedIn: public search page only
+def scrape_linkedin(query: str, limit=5, timeout: float = SOURCE_TIMEOUT) -> List[Dict]:
+    return scrape_site("linkedin", query, limit=limit, timeout=timeout)
 
 
 # -------------------------
-# 3. LINKEDIN (SAFE PUBLIC SEARCH)
+# SOURCE REGISTRY
 # -------------------------
-def scrape_linkedin(query: str, limit=5) -> List[Dict]:
-    jobs = []
-    q = query.replace(" ", "%20")
-
-    url = f"https://www.linkedin.com/jobs/search/?keywords={q}&location=India"
-
-    try:
-        res = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=10)
-        soup = BeautifulSoup(res.text, "html.parser")
-
-        cards = soup.select("div.base-card")[:limit]
-
-        for i, card in enumerate(cards):
-            title = card.select_one("h3.base-search-card__title").text.strip() if card.select_one("h3.base-search-card__title") else "No Title"
-            company = card.select_one("h4.base-search-card__subtitle").text.strip() if card.select_one("h4.base-search-card__subtitle") else "Unknown"
-            desc = "LinkedIn does not expose full job description in HTML search results."
-
-            url_el = card.select_one("a.base-card__full-link")
-            link = url_el["href"] if url_el else url
-
-            jobs.append({
-                "id": f"linkedin_{i}",
-                "title": title,
-                "company": company,
-                "url": link,
-                "description": desc,
-            })
-
-        logger.info(f"LinkedIn scraped {len(jobs)} jobs")
-
-    except Exception as e:
-        logger.error("LinkedIn scraping error: %s", e)
-
-    return jobs
+# name -> callable(query, limit=..., timeout=...) -> List[Dict]
+SOURCES: Dict[str, Callable[..., List[Dict]]] = {
+    "indeed": scrape_indeed,
+    "naukri": scrape_naukri,
+    "linkedin": scrape_linkedin,
+}
+
+
+def register_source(name: str, func: Callable[..., List[Dict]]):
+    """Plug in an extra job source. `func(query, limit=, timeout=)` must return job dicts."""
+    SOURCES[name] = func
+    logger.info(f"Registered job source {name}")
+
+
+def unregister_source(name: str):
+    SOURCES.pop(name, None)
+
+
+def _timed(func, query, limit, timeout, started, name):
+    start = started[name] = time.perf_counter()
+    jobs = func(query, limit=limit, timeout=timeout)
+    return jobs, time.perf_counter() - start
+
+
+def fetch_from_sources_parallel(query: str, limit: int = 5, sources: Optional[List[str]] = None,
+                                source_timeout: float = SOURCE_TIMEOUT,
+                                overall_timeout: float = OVERALL_TIMEOUT) -> Dict:
+    """Fetch all sources concurrently.
+
+    Each source must finish within `source_timeout` of starting (its HTTP
+    request gets the same timeout); a slow source is reported as timed out
+    without holding up the rest. The whole fan-out returns after
+    `overall_timeout` at the latest, with whatever arrived in time. A source
+    that raises is reported as ``error``. The result is
+    ``{"jobs": [...], "sources": {name: {"status", "count", "seconds"}}, "seconds": total}``
+    where status is one of ``ok``, ``error`` or ``timeout``.
+    """
+    names = list(sources) if sources else list(SOURCES)
+    start = time.perf_counter()
+    overall_deadline = start + overall_timeout
+    started: Dict[str, float] = {}   # source -> when a worker picked it up
+    futures = {}
+    for name in names:
+        func = SOURCES.get(name)
+        if func is None:
+            logger.warning(f"Unknown job source {name}")
+            continue
+        futures[_executor.submit(_timed, func, query, limit, source_timeout, started, name)] = name
+
+    done, pending, late = set(), set(futures), {}
+    while pending:
+        now = time.perf_counter()
+        for fut in list(pending):
+            began = started.get(futures[fut])
+            if now >= overall_deadline:
+                late[fut] = overall_timeout
+            elif began is not None and now - began >= source_timeout:
+                late[fut] = source_timeout
+            else:
+                continue
+            pending.discard(fut)
+        if not pending:
+            break
+        deadlines = [started[futures[f]] + source_timeout for f in pending if futures[f] in started]
+        # sources still queued for a worker have no deadline yet; look again shortly
+        if len(deadlines) < len(pending):
+            deadlines.append(now + 0.1)
+        timeout = max(0.0, min([overall_deadline] + deadlines) - now)
+        finished, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        done |= finished
+
+    jobs: List[Dict] = []
+    report: Dict[str, Dict] = {}
+    # keep registry order so results are deterministic
+    for fut, name in futures.items():
+        if fut not in done:
+            fut.cancel()
+            report[name] = {"status": "timeout", "count": 0, "seconds": round(time.perf_counter() - start, 4)}
+            incr("scrape_source_failures_total", source=name, reason="timeout")
+            logger.warning(f"Job source {name} missed the {late.get(fut, overall_timeout)}s deadline")
+            continue
+        try:
+            source_jobs, seconds = fut.result()
+        except Exception as e:
+            logger.error("Job source %s failed: %s", name, e)
+            report[name] = {"status": "error", "count": 0, "seconds": round(time.perf_counter() - start, 4)}
+            incr("scrape_source_failures_total", source=name, reason="error")
+            continue
+        jobs.extend(source_jobs)
+        report[name] = {"status": "ok", "count": len(source_jobs), "seconds": round(seconds, 4)}
+        observe("scrape_source_seconds", seconds, source=name)
+        incr("jobs_scraped_total", len(source_jobs), source=name)
+
+    total = time.perf_counter() - start
+    logger.info("Fetched %d jobs in %.2fs; per-source: %s", len(jobs), total,
+                {n: r["seconds"] for n, r in report.items()})
+    return {"jobs": jobs, "sources": report, "seconds": round(total, 4)}
 
 
 # -------------------------
 # MERGE ALL SOURCES
 # -------------------------
-def fetch_real_jobs(query: str, top_k: int = 10) -> List[Dict]:
-    indeed = scrape_indeed(query, limit=5)
-    naukri = scrape_naukri(query, limit=5)
-    linkedin = scrape_linkedin(query, limit=5)
-
-    jobs = indeed + naukri + linkedin
-    jobs = jobs[:top_k]
+def fetch_real_jobs(query: str, top_k: int = 10, store=None) -> List[Dict]:
+    """Scrape all sources. With a `memory.job_store.JobStore`, the postings are
+    recorded and each job gets a ``status`` of new / changed / unchanged."""
+    result = fetch_from_sources_parallel(query, limit=5)
+
+    jobs = result["jobs"][:top_k]
+
+    if store is not None:
+        delta = store.sync(jobs)
+        for status, batch in delta.items():
+            for job in batch:
+                job["status"] = status
 
     logger.info(f"Total scraped jobs: {len(jobs)}")
 
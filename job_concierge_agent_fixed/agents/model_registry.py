@@ -0,0 +1,104 @@
+"""Process-wide registry of sentence-embedding models.
+
+Each encoder is loaded once per process and shared by every agent (and every
+Streamlit session). `warm_up()` can load models in a background thread at
+startup so the first request does not pay the load cost. Names may carry an
+inference backend suffix (``"all-MiniLM-L6-v2@onnx"``, see
+agents.encoder_backends); JOB_ENCODER_BACKEND picks it for DEFAULT_MODEL.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+BASE_MODEL = "all-MiniLM-L6-v2"
+_backend = os.environ.get("JOB_ENCODER_BACKEND", "torch")
+DEFAULT_MODEL = BASE_MODEL if _backend in ("", "torch") else f"{BASE_MODEL}@{_backend}"
+
+_models: Dict[str, object] = {}
+_stats: Dict[str, Dict] = {}
+_locks: Dict[str, threading.Lock] = {}
+_registry_lock = threading.Lock()
+
+
+def _lock_for(name: str) -> threading.Lock:
+    with _registry_lock:
+        return _locks.setdefault(name, threading.Lock())
+
+
+def _param_bytes(model) -> int:
+    if hasattr(model, "param_bytes"):
+        return int(model.param_bytes())
+    try:
+        return int(sum(p.numel() * p.element_size() for p in model.parameters()))
+    except Exception:
+        return 0
+
+
+def _load(name: str):
+    from agents.encoder_backends import load_encoder
+    return load_encoder(name)
+
+
+def get_model(name: str = DEFAULT_MODEL):
+    """Return the shared encoder for `name`, loading it on first use."""
+    model = _models.get(name)
+    if model is not None:
+        return model
+    with _lock_for(name):
+        model = _models.get(name)
+        if model is None:
+            start = time.perf_counter()
+            model = _load(name)
+            seconds = time.perf_counter() - start
+            _models[name] = model
+            _stats[name] = {"load_seconds": round(seconds, 3), "param_bytes": _param_bytes(model),
+                            "loaded_at": time.time()}
+            logger.info(f"Loaded embedding model: {name} in {seconds:.2f}s")
+    return model
+
+
+def register_model(name: str, model):
+    """Install an already-built encoder (any object with an ``encode`` method)."""
+    with _lock_for(name):
+        _models[name] = model
+        _stats[name] = {"load_seconds": 0.0, "param_bytes": _param_bytes(model), "loaded_at": time.time()}
+
+
+def unload_model(name: str):
+    with _lock_for(name):
+        _models.pop(name, None)
+        _stats.pop(name, None)
+
+
+def is_loaded(name: str = DEFAULT_MODEL) -> bool:
+    return name in _models
+
+
+def warm_up(names: Optional[List[str]] = None, background: bool = True) -> Optional[threading.Thread]:
+    """Load `names` (default: the standard encoder) ahead of the first request."""
+    names = [n for n in (names or [DEFAULT_MODEL]) if n not in _models]
+    if not names:
+        return None
+
+    def _run():
+        for n in names:
+            try:
+                get_model(n)
+            except Exception:
+                logger.exception(f"Warm-up failed for model {n}")
+
+    if not background:
+        _run()
+        return None
+    t = threading.Thread(target=_run, name="model-warmup", daemon=True)
+    t.start()
+    return t
+
+
+def model_stats() -> Dict[str, Dict]:
+    """Load time and parameter memory for each loaded model."""
+    return {name: dict(s) for name, s in _stats.items()}
@@ -0,0 +1,315 @@
+"""Compact embedding storage and scoring on the compressed form.
+
+Codecs for L2-normalized embeddings:
+  - "float16": half precision, 2 bytes per dimension
+  - "int8":    symmetric scalar quantization with a per-dimension scale,
+               1 byte per dimension; the scale is folded into the query so
+               scoring is one matrix product over the int8 codes
+  - "pq":      product quantization, `m` bytes per vector; queries are
+               scored by asymmetric distance (per-subspace lookup tables)
+
+`QuantizedIndex` keeps only the codes and scores corpus chunks directly
+from them. Given the float32 originals (e.g. an np.memmap kept on disk),
+`search(..., rerank=n)` re-scores the best n candidates exactly.
+`recall_report` measures each codec's top-k recall against exact float32
+search on held-out queries. `save` writes the codec state next to a plain
+``.codes.npy`` file, so ``load(..., mmap=True)`` can memory-map the codes.
+
+The codecs are standalone: VectorSearch (faiss) and JDMatcher still store
+and score float32 vectors, and nothing in the recommendation path uses a
+QuantizedIndex yet. Use them directly, or through
+``perf_benchmarks --quantization`` to size a switch.
+"""
+import logging
+import os
+import time
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from agents.embedding_cache import l2_normalize
+
+logger = logging.getLogger(__name__)
+
+
+class Float16Codec:
+    name = "float16"
+
+    def fit(self, vecs: np.ndarray) -> "Float16Codec":
+        return self
+
+    def encode(self, vecs: np.ndarray) -> np.ndarray:
+        return np.asarray(vecs, dtype=np.float16)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32)
+
+    def scores(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        return queries @ codes.astype(np.float32).T
+
+    def bytes_per_vector(self, dim: int) -> int:
+        return 2 * dim
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {}
+
+    def load_state(self, state: Dict[str, np.ndarray]):
+        pass
+
+
+class Int8Codec:
+    name = "int8"
+
+    def __init__(self):
+        self.scale = None
+
+    def fit(self, vecs: np.ndarray) -> "Int8Codec":
+        self.scale = (np.maximum(np.abs(vecs).max(axis=0), 1e-12) / 127.0).astype(np.float32)
+        return self
+
+    def encode(self, vecs: np.ndarray) -> np.ndarray:
+        return np.clip(np.rint(vecs / self.scale), -127, 127).astype(np.int8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32) * self.scale
+
+    def scores(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        # (q * scale) . code == q . decode(code)
+        return (queries * self.scale) @ codes.astype(np.float32).T
+
+    def bytes_per_vector(self, dim: int) -> int:
+        return dim
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"scale": self.scale}
+
+    def load_state(self, state: Dict[str, np.ndarray]):
+        self.scale = state["scale"]
+
+
+def _kmeans(x: np.ndarray, k: int, iters: int, rng: np.random.Generator) -> np.ndarray:
+    centroids = x[rng.choice(len(x), k, replace=len(x) < k)].copy()
+    x_sq = (x ** 2).sum(axis=1)[:, None]
+    for _ in range(iters):
+        dist = x_sq - 2 * x @ centroids.T + (centroids ** 2).sum(axis=1)[None, :]
+        assign = dist.argmin(axis=1)
+        counts = np.bincount(assign, minlength=k)
+        sums = np.stack([np.bincount(assign, weights=x[:, d], minlength=k) for d in range(x.shape[1])], axis=1)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        empty = np.flatnonzero(~filled)
+        if len(empty):
+            centroids[empty] = x[rng.choice(len(x), len(empty))]
+    return centroids
+
+
+class PQCodec:
+    name = "pq"
+
+    def __init__(self, m: int = 48, ksub: int = 256, iters: int = 10, sample: int = 20_000, seed: int = 0):
+        if ksub > 256:
+            raise ValueError("ksub must be <= 256 (codes are uint8)")
+        self.m = m
+        self.ksub = ksub
+        self.iters = iters
+        self.sample = sample
+        self.seed = seed
+        self.centroids = None   # (m, ksub, dsub)
+
+    def fit(self, vecs: np.ndarray) -> "PQCodec":
+        n, dim = vecs.shape
+        if dim % self.m:
+            raise ValueError(f"dimension {dim} is not divisible by m={self.m}")
+        rng = np.random.default_rng(self.seed)
+        train = vecs[rng.choice(n, self.sample, replace=False)] if n > self.sample else vecs
+        sub = train.reshape(len(train), self.m, dim // self.m).astype(np.float32)
+        self.centroids = np.stack([_kmeans(sub[:, j], self.ksub, self.iters, rng) for j in range(self.m)])
+        return self
+
+    def encode(self, vecs: np.ndarray, chunk: int = 65536) -> np.ndarray:
+        m, _, dsub = self.centroids.shape
+        codes = np.empty((len(vecs), m), dtype=np.uint8)
+        c_sq = (self.centroids ** 2).sum(axis=2)          # (m, ksub)
+        for start in range(0, len(vecs), chunk):
+            sub = vecs[start:start + chunk].reshape(-1, m, dsub).astype(np.float32)
+            for j in range(m):
+                dist = c_sq[j][None, :] - 2 * sub[:, j] @ self.centroids[j].T
+                codes[start:start + len(sub), j] = dist.argmin(axis=1)
+        return codes
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        m = self.centroids.shape[0]
+        return self.centroids[np.arange(m), codes.astype(np.int64)].reshape(len(codes), -1)
+
+    def scores(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        m, ksub, dsub = self.centroids.shape
+        # lookup tables: inner product of each query sub-vector with every centroid
+        luts = np.einsum("qmd,mkd->qmk", queries.reshape(len(queries), m, dsub), self.centroids)
+        flat = codes.astype(np.int64) + np.arange(m) * ksub    # index into the flattened (m * ksub) table
+        luts = luts.reshape(len(queries), m * ksub)
+        return np.stack([lut[flat].sum(axis=1) for lut in luts])
+
+    def bytes_per_vector(self, dim: int) -> int:
+        return self.m
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"centroids": self.centroids}
+
+    def load_state(self, state: Dict[str, np.ndarray]):
+        self.centroids = state["centroids"]
+        self.m, self.ksub = self.centroids.shape[:2]
+
+
+CODECS = {"float16": Float16Codec, "int8": Int8Codec, "pq": PQCodec}
+
+
+def make_codec(name: str, **kwargs):
+    if name not in CODECS:
+        raise ValueError(f"Unknown codec {name!r}; expected one of {tuple(CODECS)}")
+    return CODECS[name](**kwargs)
+
+
+def _merge_topk(best_idx, best_score, idx, score, k):
+    cand_idx = np.concatenate([best_idx, idx], axis=1)
+    cand_score = np.concatenate([best_score, score], axis=1)
+    if cand_score.shape[1] > k:
+        part = np.argpartition(-cand_score, k - 1, axis=1)[:, :k]
+        cand_idx = np.take_along_axis(cand_idx, part, axis=1)
+        cand_score = np.take_along_axis(cand_score, part, axis=1)
+    return cand_idx, cand_score
+
+
+class QuantizedIndex:
+    """Compressed embedding matrix with top-k search over the codes."""
+
+    def __init__(self, codec="int8", **codec_kwargs):
+        self.codec = make_codec(codec, **codec_kwargs) if isinstance(codec, str) else codec
+        self.codes = None
+        self.dim = None
+        self._trained = False
+
+    def __len__(self):
+        return 0 if self.codes is None else len(self.codes)
+
+    def fit(self, vecs: np.ndarray) -> "QuantizedIndex":
+        self.codec.fit(np.asarray(vecs, dtype=np.float32))
+        self._trained = True
+        return self
+
+    def add(self, vecs: np.ndarray):
+        """Append vectors (fits the codec on the first batch if needed)."""
+        vecs = np.asarray(vecs, dtype=np.float32)
+        if not self._trained:
+            self.fit(vecs)
+        self.dim = vecs.shape[1]
+        codes = self.codec.encode(vecs)
+        self.codes = codes if self.codes is None else np.concatenate([self.codes, codes])
+
+    @property
+    def nbytes(self) -> int:
+        return 0 if self.codes is None else int(self.codes.nbytes)
+
+    def search(self, queries: np.ndarray, k: int = 10, rerank: int = 0, exact: Optional[np.ndarray] = None,
+               chunk: int = 65536) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k by approximate inner product; ``(indices, scores)`` like
+        `topk_similarity`. With `exact` (float32 rows aligned with the codes)
+        and ``rerank > k``, the best `rerank` candidates are re-scored exactly."""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        n = len(self)
+        fetch = min(max(k, rerank if exact is not None else k), n)
+        best_idx = np.empty((len(queries), 0), dtype=np.int64)
+        best_score = np.empty((len(queries), 0), dtype=np.float32)
+        for start in range(0, n, chunk):
+            scores = self.codec.scores(queries, self.codes[start:start + chunk]).astype(np.float32)
+            idx = np.broadcast_to(np.arange(start, start + scores.shape[1]), scores.shape)
+            best_idx, best_score = _merge_topk(best_idx, best_score, idx, scores, fetch)
+        if exact is not None and fetch > k:
+            # exact float32 scores for the shortlist only
+            best_score = np.einsum("qd,qcd->qc", queries, np.asarray(exact[np.sort(best_idx, axis=1)], dtype=np.float32))
+            best_idx = np.sort(best_idx, axis=1)
+        order = np.argsort(-best_score, axis=1, kind="stable")[:, :k]
+        return np.take_along_axis(best_idx, order, axis=1), np.take_along_axis(best_score, order, axis=1)
+
+    @staticmethod
+    def codes_path(path: str) -> str:
+        return os.path.splitext(path)[0] + ".codes.npy"
+
+    def save(self, path: str):
+        """Codec name and state go to `path` (an .npz); the codes to `codes_path(path)`."""
+        state = {f"codec_{key}": value for key, value in self.codec.state().items()}
+        codes_path = self.codes_path(path)
+        with open(codes_path + ".tmp", "wb") as f:
+            np.save(f, self.codes)
+        os.replace(codes_path + ".tmp", codes_path)
+        with open(path, "wb") as f:
+            np.savez(f, codec=np.array(self.codec.name), **state)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = False) -> "QuantizedIndex":
+        """With `mmap`, the codes stay on disk and are paged in as searched."""
+        with np.load(path) as data:
+            index = cls(str(data["codec"]))
+            index.codec.load_state({key[6:]: data[key] for key in data.files if key.startswith("codec_")})
+            if "codes" in data.files:
+                # single-file layout from before the codes were split out (never mmap'd)
+                index.codes = np.asarray(data["codes"])
+            else:
+                index.codes = np.load(cls.codes_path(path), mmap_mode="r" if mmap else None)
+        index.dim = None if index.codes is None else index.codec.decode(index.codes[:1]).shape[1]
+        index._trained = True
+        return index
+
+
+def recall_report(vectors: np.ndarray, queries: Optional[np.ndarray] = None, k: int = 10,
+                  holdout: float = 0.05, codecs: Sequence[str] = ("float16", "int8", "pq"),
+                  rerank: int = 100, seed: int = 0, pq_m: Optional[int] = None) -> Dict[str, Dict]:
+    """Recall@k of each codec against exact float32 search.
+
+    Without `queries`, a random `holdout` fraction of `vectors` is removed from
+    the corpus and used as queries. Reports recall with and without exact
+    rerank of the top `rerank`, bytes per vector, compression and query time.
+    """
+    from agents.jd_matcher_agent import topk_similarity
+
+    vectors = l2_normalize(np.asarray(vectors, dtype=np.float32))
+    if queries is None:
+        rng = np.random.default_rng(seed)
+        perm = rng.permutation(len(vectors))
+        n_q = max(1, int(len(vectors) * holdout))
+        queries, vectors = vectors[perm[:n_q]], vectors[perm[n_q:]]
+    else:
+        queries = l2_normalize(np.asarray(queries, dtype=np.float32))
+    k = min(k, len(vectors))
+    dim = vectors.shape[1]
+
+    def recall(found):
+        return float(np.mean([np.isin(f, e).sum() / k for f, e in zip(found, exact_idx)]))
+
+    start = time.perf_counter()
+    exact_idx, _ = topk_similarity(queries, vectors, k=k)
+    report = {"float32": {"bytes_per_vector": 4 * dim, "compression": 1.0, "recall": 1.0,
+                          "query_ms": round((time.perf_counter() - start) / len(queries) * 1000, 3)},
+              "meta": {"corpus": len(vectors), "queries": len(queries), "k": k, "rerank": rerank}}
+    for name in codecs:
+        kwargs = {}
+        if name == "pq":
+            m = pq_m or next(m for m in (48, 32, 24, 16, 12, 8, 4, 2, 1) if dim % m == 0)
+            kwargs = {"m": m, "ksub": min(256, len(vectors)), "seed": seed}
+        start = time.perf_counter()
+        index = QuantizedIndex(name, **kwargs)
+        index.add(vectors)
+        build = time.perf_counter() - start
+        start = time.perf_counter()
+        approx, _ = index.search(queries, k)
+        query_ms = (time.perf_counter() - start) / len(queries) * 1000
+        reranked, _ = index.search(queries, k, rerank=rerank, exact=vectors)
+        report[name] = {
+            "bytes_per_vector": index.codec.bytes_per_vector(dim),
+            "compression": round(4 * dim / index.codec.bytes_per_vector(dim), 2),
+            "recall": round(recall(approx), 4),
+            "recall_reranked": round(recall(reranked), 4),
+            "build_seconds": round(build, 3),
+            "query_ms": round(query_ms, 3),
+        }
+        logger.info("%s: %s", name, report[name])
+    return report
@@ -1,37 +1,121 @@
 """Recommendation Agent with start/stop (pause/resume) support using SchedulerController.
-Also exposes a record() hook for observability/metrics.
+Each recommend_once stage is traced through observability.metrics spans.
 """
 import logging
 from typing import List, Dict
-from agents.jd_matcher_agent import JDMatcher
+from agents.jd_matcher_agent import JDMatcher, topk_similarity
 from agents.job_scraper_agent import fetch_real_jobs
 from agents.scheduler_controller import SchedulerController
+from agents.dedup import dedup_jobs
+from agents.a2a_router import A2ARouter
+from memory.result_cache import normalize_query
+from observability.metrics import span, incr
 
 
 logger = logging.getLogger(__name__)
 
 class RecommendationAgent:
-    def __init__(self):
+    def __init__(self, job_store=None, index=None):
         self.matcher = JDMatcher()
         self.scheduler = SchedulerController()
+        self.job_store = job_store  # optional memory.job_store.JobStore for incremental runs
+        self.index = index          # optional VectorSearch kept in sync by refresh_jobs
+        self.router = A2ARouter()   # listeners are notified off the recommendation path
         self._last_run = None
-        self._listeners = []  # A2A listeners or UI callbacks
+        self._listeners = []  # A2A listeners or UI callbacks (route names)
+
+    def _fetch(self, query: str):
+        with span("scrape") as sp:
+            jobs = fetch_real_jobs(query, top_k=50, store=self.job_store)
+            sp.set(jobs=len(jobs))
+        # the same role is often listed on several sites; embed and show it once
+        with span("dedup") as sp:
+            jobs, dedup_stats = dedup_jobs(jobs)
+            sp.set(removed=dedup_stats['removed'])
+        return jobs, dedup_stats
+
+    def _score(self, resume_text: str, jobs: List[Dict]):
+        if self.matcher.pooling == "best":
+            # chunk-pair matching has no separate per-text embedding step
+            with span("score"):
+                indices, scores = self.matcher.score_batch([resume_text], jobs)
+            return indices[0], scores[0]
+        with span("embed"):
+            # long resumes are chunked and pooled rather than truncated (JDMatcher.resume_pooling)
+            resume_emb = self.matcher.embed_resumes([resume_text])
+            job_embs = self.matcher.embed([j["description"] for j in jobs])
+        with span("score"):
+            indices, scores = topk_similarity(resume_emb, job_embs)
+        return indices[0], scores[0]
 
     def recommend_once(self, resume_text: str, query: str, threshold: float = 0.2) -> List[Dict]:
-        jobs = fetch_real_jobs(query, top_k=50)
-        scored = self.matcher.score(resume_text, jobs)
-        recommended = [s for s in scored if s['score'] >= threshold]
-        logger.info(f"RecommendationAgent found {len(recommended)} recommendations for threshold={threshold}")
-        self._last_run = {'query': query, 'count': len(recommended)}
-        # notify listeners (A2A)
-        for l in self._listeners:
-            try:
-                l.handle_recommendations(recommended)
-            except Exception:
-                logger.exception('A2A listener error')
+        with span("recommend_once", query=query):
+            jobs, dedup_stats = self._fetch(query)
+            indices, scores = self._score(resume_text, jobs)
+            # threshold is applied on the score arrays, so only survivors become dicts
+            with span("filter"):
+                keep = scores >= threshold
+                recommended = self.matcher.build_results(jobs, indices[keep], scores[keep])
+            logger.info(f"RecommendationAgent found {len(recommended)} recommendations for threshold={threshold}")
+            incr("recommendations_total", len(recommended))
+            self._last_run = {'query': query, 'count': len(recommended), 'dedup': dedup_stats}
+            # notify listeners (A2A) through their queues; a slow notifier no longer blocks us
+            with span("notify", listeners=len(self._listeners)):
+                for name in self._listeners:
+                    self.router.post(name, {'from': 'recommendation_agent', 'to': name,
+                                            'type': 'recommendations', 'payload': recommended})
         return recommended
 
-    def start_periodic(self, func, seconds=3600):
+    def rank(self, resume_text: str, query: str) -> List[Dict]:
+        """Every fetched posting scored against the resume, best first, with no
+        threshold and no listener notifications. Meant to be cached (see
+        memory.result_cache) and re-filtered as the threshold changes."""
+        with span("rank", query=query):
+            jobs, _ = self._fetch(query)
+            indices, scores = self._score(resume_text, jobs)
+            return self.matcher.build_results(jobs, indices, scores)
+
+    def refresh_jobs(self, query: str, max_age: float = 7 * 24 * 3600) -> Dict:
+        """Delta update for periodic runs: record the scrape, embed only postings
+        that are new, changed or embedded with an older model, and age out
+        postings not seen for `max_age` seconds."""
+        if self.job_store is None:
+            from memory.job_store import JobStore
+            self.job_store = JobStore()
+        jobs = fetch_real_jobs(query, top_k=50, store=self.job_store)
+        version = self.matcher.model_name
+        pending = self.job_store.pending_embedding(version)
+        if pending:
+            if self.index is not None:
+                self.index.upsert(pending)
+            else:
+                # warms the embedding cache so scoring never encodes these again
+                self.matcher.embed([j["description"] for j in pending])
+            self.job_store.mark_embedded([j["id"] for j in pending], version)
+        expired = self.job_store.expire(max_age)
+        if expired and self.index is not None:
+            self.index.delete(expired)
+        summary = {'query': query, 'scraped': len(jobs), 'embedded': len(pending), 'expired': len(expired)}
+        logger.info(f"RecommendationAgent refresh: {summary}")
+        return summary
+
+    def watch_query(self, query: str, seconds: float = 3600, max_age: float = 7 * 24 * 3600) -> bool:
+        """Run `refresh_jobs(query)` every `seconds` on the scheduler, so the job
+        store and embeddings stay current between searches. Returns False if
+        the (normalized) query is already watched."""
+        name = f"refresh:{normalize_query(query)}"
+        return self.scheduler.add_job(name, lambda: self.refresh_jobs(query, max_age=max_age), seconds=seconds)
+
+    def unwatch_query(self, query: str) -> bool:
+        return self.scheduler.remove_job(f"refresh:{normalize_query(query)}")
+
+    def start_periodic(self, func=None, seconds=3600, query=None):
+        """Call `func()` every `seconds`; with only `query`, the periodic job is
+        that query's `refresh_jobs` delta update."""
+        if func is None:
+            if query is None:
+                raise ValueError("start_periodic needs func or query")
+            func = lambda: self.refresh_jobs(query)
         return self.scheduler.start_periodic(func, seconds=seconds)
 
     def stop_periodic(self):
@@ -40,6 +124,22 @@ class RecommendationAgent:
     def is_running(self):
         return self.scheduler.is_running()
 
-    def add_listener(self, listener):
-        """Add an A2A listener (object with handle_recommendations method)."""
-        self._listeners.append(listener)
+    def add_listener(self, listener, **route_options):
+        """Add an A2A listener (object with handle_recommendations method).
+        `route_options` (queue_size, drop_policy, max_retries, ...) go to A2ARouter.register.
+        With ``batch_size > 1`` the listener is still called once per message."""
+        name = f"listener-{len(self._listeners)}"
+        if route_options.get('batch_size', 1) > 1:
+            def handler(msgs):
+                for msg in msgs:
+                    listener.handle_recommendations(msg['payload'])
+        else:
+            def handler(msg):
+                listener.handle_recommendations(msg['payload'])
+        self.router.register(name, handler, **route_options)
+        self._listeners.append(name)
+        return name
+
+    def flush_listeners(self, timeout=None) -> bool:
+        """Block until every posted notification has been handled."""
+        return self.router.flush(timeout)
@@ -4,14 +4,13 @@ For production, integrate with a robust resume parser or use OCR for PDFs.
 """
 import re, logging
 from typing import Dict
+from agents.skill_engine import get_skill_extractor
 
 logger = logging.getLogger(__name__)
 
-COMMON_SKILLS = ["python","sql","machine learning","nlp","deep learning","aws","docker","kubernetes","pandas","numpy","tensorflow","pytorch","react","node"]
-
 def parse_resume_text(text: str) -> Dict:
     text_low = text.lower()
-    skills = [s for s in COMMON_SKILLS if s in text_low]
+    skills = get_skill_extractor().extract(text)
     # Simple experience extractor (years)
     years = None
     m = re.search(r"(\d+)\+?\s+years", text_low)
@@ -1,61 +1,217 @@
-"""Scheduler controller using APScheduler for pause/resume loop operations.
-Falls back to a simple thread-based loop if APScheduler is not installed.
+"""Scheduler controller for periodic (pause/resume) agent loops.
+
+One controller runs many named jobs (per user or per query) from a single
+dispatcher thread and a bounded worker pool:
+  - `max_workers` caps how many jobs run at once; due jobs wait in a queue.
+  - each start time gets random `jitter` so many users do not hit the job
+    sites in the same second.
+  - a job whose previous run is still going is not started again; the
+    tick is counted as skipped (coalesced).
+  - jobs added with the same `group` (e.g. a normalized search query) are
+    run together: the group's runner is called once per tick with all
+    member names, so one scrape and embedding pass serves all of them.
+`stats()` reports queue depth, running jobs, start lag and skip counts.
 """
+import heapq
+import itertools
 import logging
-import threading, time
-try:
-    from apscheduler.schedulers.background import BackgroundScheduler
-    APSCHEDULER_AVAILABLE = True
-except Exception:
-    APSCHEDULER_AVAILABLE = False
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_JOB = "default"
+
+
+class _Job:
+    def __init__(self, name, func, seconds, jitter, group=None):
+        self.name = name
+        self.func = func
+        self.seconds = seconds
+        self.jitter = jitter
+        self.group = group
+        self.members = []       # group entries only
+        self.running = False
+        self.runs = 0
+        self.skipped = 0
+        self.errors = 0
+        self.nominal = None     # un-jittered slot; jitter is applied afresh to each one
+        self.next_run = None
+        self.last_lag = 0.0
+
+
 class SchedulerController:
-    def __init__(self):
-        self._job = None
-        self._running = False
-        if APSCHEDULER_AVAILABLE:
-            self._scheduler = BackgroundScheduler()
-            self._scheduler.start()
-        else:
-            self._thread = None
+    def __init__(self, max_workers: int = 4, jitter: float = 0.0):
+        self.jitter = jitter
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scheduler")
+        self._jobs: Dict[str, _Job] = {}        # schedule entries: plain jobs and "group:<name>"
+        self._members: Dict[str, str] = {}      # member name -> group entry key
+        self._runners: Dict[str, Callable] = {}
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closed = False
+        self._queued = 0
+        self._running = 0
+        self._lag_max = 0.0
+
+    # ---- job management ----
+    def add_group(self, group: str, runner: Callable[[List[str]], None]):
+        """Register the callable run once per tick for all members of `group`."""
+        with self._cond:
+            self._runners[group] = runner
+
+    def add_job(self, name: str, func: Optional[Callable] = None, seconds: float = 3600,
+                jitter: Optional[float] = None, group: Optional[str] = None) -> bool:
+        """Schedule `func()` every `seconds`, or join `group` (whose runner gets the
+        member names). Returns False if `name` is already scheduled."""
+        jitter = self.jitter if jitter is None else jitter
+        with self._cond:
+            if name in self._jobs or name in self._members:
+                return False
+            if group is None:
+                if func is None:
+                    raise ValueError("func is required for jobs without a group")
+                job = _Job(name, func, seconds, jitter)
+            else:
+                if group not in self._runners:
+                    raise ValueError(f"No runner registered for group {group!r}")
+                key = f"group:{group}"
+                job = self._jobs.get(key)
+                if job is not None:
+                    job.members.append(name)
+                    # the group ticks at the shortest interval any member asked for
+                    job.seconds = min(job.seconds, seconds)
+                    self._members[name] = key
+                    return True
+                job = _Job(key, None, seconds, jitter, group=group)
+                job.members.append(name)
+                self._members[name] = key
+                name = key
+            self._jobs[name] = job
+            self._schedule(job, time.time())
+            self._ensure_thread()
+            self._cond.notify()
+        logger.info(f"Scheduled job {name} every {seconds}s")
+        return True
+
+    def remove_job(self, name: str) -> bool:
+        with self._cond:
+            key = self._members.pop(name, None)
+            if key is not None:
+                job = self._jobs[key]
+                job.members.remove(name)
+                if not job.members:
+                    del self._jobs[key]
+                return True
+            return self._jobs.pop(name, None) is not None
 
+    def jobs(self) -> List[str]:
+        with self._cond:
+            return [n for n in self._jobs if not n.startswith("group:")] + list(self._members)
+
+    # ---- dispatching ----
+    def _schedule(self, job: _Job, base: float):
+        job.nominal = base
+        job.next_run = base + (random.uniform(0, job.jitter) if job.jitter else 0.0)
+        heapq.heappush(self._heap, (job.next_run, next(self._seq), job.name))
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._dispatch_loop, name="scheduler-dispatch", daemon=True)
+            self._thread.start()
+
+    def _dispatch_loop(self):
+        with self._cond:
+            while not self._closed:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                due, _, name = self._heap[0]
+                now = time.time()
+                if due > now:
+                    self._cond.wait(due - now)
+                    continue
+                heapq.heappop(self._heap)
+                job = self._jobs.get(name)
+                if job is None or job.next_run != due:
+                    continue  # removed or rescheduled
+                # next tick is anchored to the un-jittered schedule, not to when this
+                # run finishes or to this tick's jitter, so neither accumulates
+                base = job.nominal + job.seconds
+                while base <= now:
+                    base += job.seconds
+                    job.skipped += 1
+                self._schedule(job, base)
+                if job.running:
+                    job.skipped += 1
+                    logger.info(f"Job {name} still running; skipping this tick")
+                    continue
+                job.running = True
+                self._queued += 1
+                self._pool.submit(self._run, job, due)
+
+    def _run(self, job: _Job, due: float):
+        with self._cond:
+            self._queued -= 1
+            self._running += 1
+            members = list(job.members)
+            func = self._runners.get(job.group) if job.group else job.func
+        lag = time.time() - due
+        try:
+            if job.group:
+                func(members)
+            else:
+                func()
+        except Exception as e:
+            job.errors += 1
+            logger.exception('Error in periodic function: %s', e)
+        finally:
+            with self._cond:
+                job.running = False
+                job.runs += 1
+                job.last_lag = lag
+                self._lag_max = max(self._lag_max, lag)
+                self._running -= 1
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                "jobs": len(self._jobs),
+                "members": len(self._members),
+                "queue_depth": self._queued,
+                "running": self._running,
+                "lag_max": round(self._lag_max, 4),
+                "per_job": {n: {"runs": j.runs, "skipped": j.skipped, "errors": j.errors,
+                                "last_lag": round(j.last_lag, 4), "next_run": j.next_run,
+                                "members": list(j.members) if j.group else None}
+                            for n, j in self._jobs.items()},
+            }
+
+    def shutdown(self, wait: bool = False):
+        with self._cond:
+            self._closed = True
+            self._jobs.clear()
+            self._members.clear()
+            self._cond.notify_all()
+        self._pool.shutdown(wait=wait)
+
+    # ---- single-job API used by RecommendationAgent ----
     def start_periodic(self, func, seconds=3600):
         """Start calling func() every `seconds`. Returns True if scheduled."""
-        if APSCHEDULER_AVAILABLE:
-            if self._job is None:
-                self._job = self._scheduler.add_job(func, 'interval', seconds=seconds)
-                self._running = True
-                logger.info('Started APScheduler periodic job.')
-                return True
-            return False
-        else:
-            if self._thread is None or not self._thread.is_alive():
-                self._running = True
-                def loop():
-                    while self._running:
-                        try:
-                            func()
-                        except Exception as e:
-                            logger.exception('Error in periodic function: %s', e)
-                        time.sleep(seconds)
-                self._thread = threading.Thread(target=loop, daemon=True)
-                self._thread.start()
-                logger.info('Started fallback thread-based periodic job.')
-                return True
-            return False
+        started = self.add_job(DEFAULT_JOB, func, seconds=seconds)
+        if started:
+            logger.info('Started periodic job.')
+        return started
 
     def stop(self):
-        if APSCHEDULER_AVAILABLE:
-            if self._job:
-                self._job.remove()
-                self._job = None
-            self._running = False
-            logger.info('Stopped APScheduler job.')
-        else:
-            self._running = False
-            logger.info('Stopped fallback thread loop.')
+        self.remove_job(DEFAULT_JOB)
+        logger.info('Stopped periodic job.')
 
     def is_running(self):
-        return self._running
+        with self._cond:
+            return DEFAULT_JOB in self._jobs
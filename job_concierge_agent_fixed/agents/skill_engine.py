@@ -0,0 +1,115 @@
+"""Shared skill extraction engine.
+
+The skill taxonomy (canonical name -> aliases, `data/skills_taxonomy.json`
+plus any files listed in JOB_SKILL_TAXONOMY, separated by os.pathsep) is
+compiled into one trie-shaped regular expression, so a document is scanned
+once no matter how many skills there are. Matches respect token boundaries:
+"ml" does not fire inside "html", nor "react" inside "reactive".
+
+Building the pattern for the bundled taxonomy takes about 6 ms and
+``re.compile`` about 11 ms, once per process, so the pattern is not cached
+on disk.
+
+The bundled taxonomy is a starting point: about 475 canonical skills with
+about 220 aliases, mostly software, data and cloud. It does not aim to be
+exhaustive. Deployments that need broader coverage (other industries, more
+aliases) should add their own files through JOB_SKILL_TAXONOMY.
+"""
+import json
+import logging
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TAXONOMY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "skills_taxonomy.json")
+
+# characters that continue a token: letters, digits and the symbols used in c++ / c#
+_BOUNDARY = r"a-z0-9+#"
+_SPACES = re.compile(r"\s+")
+
+
+def _normalize(text: str) -> str:
+    return _SPACES.sub(" ", text.lower())
+
+
+def load_taxonomy(paths: Optional[Iterable[str]] = None) -> Dict[str, List[str]]:
+    """Merge taxonomy files into {canonical skill: [aliases]} (all lowercase)."""
+    if paths is None:
+        extra = os.environ.get("JOB_SKILL_TAXONOMY", "")
+        paths = [DEFAULT_TAXONOMY] + [p for p in extra.split(os.pathsep) if p]
+    taxonomy: Dict[str, List[str]] = {}
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        groups = data.get("groups", {"": data.get("skills", {})})
+        for skills in groups.values():
+            for name, aliases in skills.items():
+                merged = taxonomy.setdefault(_normalize(name).strip(), [])
+                merged.extend(_normalize(a).strip() for a in aliases)
+    return taxonomy
+
+
+def _trie_pattern(terms: Iterable[str]) -> str:
+    """Compile terms into a regex that shares common prefixes, e.g. java|javascript -> java(?:script)?"""
+    trie: Dict = {}
+    for term in terms:
+        node = trie
+        for ch in term:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node: Dict) -> str:
+        end = "" in node
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch != ""]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if end:
+            # longest match first; the regex engine backtracks to the shorter term if needed
+            return "(?:" + body + ")?"
+        return body
+
+    return build(trie)
+
+
+class SkillExtractor:
+    def __init__(self, taxonomy: Optional[Dict[str, List[str]]] = None):
+        taxonomy = taxonomy if taxonomy is not None else load_taxonomy()
+        self.aliases: Dict[str, str] = {}
+        for name, aliases in taxonomy.items():
+            for term in [name] + list(aliases):
+                if term:
+                    self.aliases.setdefault(term, name)
+        self.skills = sorted(taxonomy)
+        source = f"(?<![{_BOUNDARY}])(?:{_trie_pattern(self.aliases)})(?![{_BOUNDARY}])"
+        self.pattern = re.compile(source)
+        logger.info(f"Compiled skill matcher: {len(self.skills)} skills, {len(self.aliases)} terms")
+
+    def extract(self, text: str) -> List[str]:
+        """Canonical skills found in `text`, in order of first mention. Aliases
+        map to their canonical name: "ml" is reported as "machine learning"."""
+        seen = {}
+        for m in self.pattern.finditer(_normalize(text)):
+            seen.setdefault(self.aliases[m.group(0)], None)
+        return list(seen)
+
+    def extract_many(self, texts: Iterable[str]) -> List[List[str]]:
+        """Batch form of `extract` for many resumes / job descriptions."""
+        return [self.extract(t) for t in texts]
+
+
+_extractor = None
+_extractor_lock = threading.Lock()
+
+
+def get_skill_extractor() -> SkillExtractor:
+    """Process-wide extractor built from the default taxonomy."""
+    global _extractor
+    if _extractor is None:
+        with _extractor_lock:
+            if _extractor is None:
+                _extractor = SkillExtractor()
+    return _extractor
@@ -1,16 +1,18 @@
-import re
+"""Skill extraction helpers over the shared engine in `agents.skill_engine`.
+
+Results are canonical taxonomy names in order of first mention. Before the
+shared engine, matches came back exactly as written in a fixed list of 19
+skills, in no particular order. Now aliases are folded: "ml" becomes
+"machine learning", "sklearn" becomes "scikit-learn", "k8s" becomes
+"kubernetes". Callers comparing against literal aliases must compare
+against the canonical names.
+"""
+from agents.skill_engine import get_skill_extractor
 
-COMMON_SKILLS = [
-    "python","sql","ml","machine learning","deep learning",
-    "tensorflow","pytorch","scikit-learn","nlp","llm",
-    "data analysis","data engineering","docker","kubernetes",
-    "aws","gcp","azure","pandas","numpy"
-]
 
 def extract_skills(text: str):
-    text_lower = text.lower()
-    found = []
-    for skill in COMMON_SKILLS:
-        if skill in text_lower:
-            found.append(skill)
-    return list(set(found))
+    return get_skill_extractor().extract(text)
+
+
+def extract_skills_many(texts):
+    return get_skill_extractor().extract_many(texts)
@@ -1,19 +1,271 @@
+"""Persistent job vector index on top of FAISS.
+
+Jobs are keyed by their string id and can be upserted or deleted. Vectors are
+L2-normalized and searched by inner product, i.e. the same cosine score that
+`JDMatcher` reports. Backends:
+  - "flat": exact search (IndexFlatIP)
+  - "ivf":  inverted lists, trained on the first batch; tune `nprobe`
+  - "hnsw": graph index for large corpora; deletes are tombstoned until
+            `compact()` (or `save()`) rebuilds the graph
+`save()` / `load()` write the index plus a JSON id/metadata map, and `load`
+can memory-map the index so a restart does not re-embed anything.
+
+With ``lexical=True`` a BM25 inverted index (agents.bm25_index) is kept in
+sync, and ``search(..., hybrid=True)`` shortlists candidates lexically and
+reranks only the shortlist with the embedding model.
+"""
+import json
+import logging
+import os
+from typing import Dict, List, Optional
+
 import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
+
+from agents.bm25_index import BM25Index, hybrid_rerank
+from agents.embedding_cache import EmbeddingCache
+from agents.jd_matcher_agent import JDMatcher
+from agents.model_registry import DEFAULT_MODEL
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("flat", "ivf", "hnsw")
+
+
+def job_source(job: Dict) -> str:
+    return job.get("source") or str(job.get("id", "")).split("_", 1)[0]
+
 
 class VectorSearch:
-    def __init__(self):
-        self.model = SentenceTransformer("all-MiniLM-L6-v2")
-        self.index = faiss.IndexFlatL2(384)  # vector size for MiniLM
-        self.job_texts = []
+    def __init__(self, model_name: str = DEFAULT_MODEL, backend: str = "flat", nlist: int = 1024,
+                 nprobe: int = 16, hnsw_m: int = 32, ef_search: int = 64,
+                 cache: Optional[EmbeddingCache] = None, lexical: bool = False):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {backend!r}; expected one of {BACKENDS}")
+        self.model_name = model_name
+        self.backend = backend
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.hnsw_m = hnsw_m
+        self.ef_search = ef_search
+        self.matcher = JDMatcher(model_name, cache=cache)
+        self.lexical = BM25Index() if lexical else None
+        self.index = None              # created on first add, once the dimension is known
+        self.dim = None
+        self._ids: Dict[str, int] = {}     # job id -> faiss id
+        self._jobs: Dict[int, Dict] = {}   # faiss id -> job dict
+        self._deleted = set()              # tombstoned faiss ids (hnsw only)
+        self._next_id = 0
+        self._read_only = False
+        self._path = None
+
+    @property
+    def model(self):
+        return self.matcher.model
+
+    @property
+    def job_texts(self) -> List[Dict]:
+        """Live jobs, kept for backwards compatibility."""
+        return list(self._jobs.values())
+
+    def __len__(self):
+        return len(self._ids)
+
+    # ---- index management ----
+    def _new_index(self, dim: int):
+        if self.backend == "flat":
+            return faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+        if self.backend == "hnsw":
+            hnsw = faiss.IndexHNSWFlat(dim, self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+            hnsw.hnsw.efSearch = self.ef_search
+            return faiss.IndexIDMap2(hnsw)
+        quantizer = faiss.IndexFlatIP(dim)
+        index = faiss.IndexIVFFlat(quantizer, dim, self.nlist, faiss.METRIC_INNER_PRODUCT)
+        index.own_fields = True
+        quantizer.this.disown()
+        return index
+
+    def _ensure_index(self, vecs: np.ndarray):
+        if self.index is None:
+            self.dim = int(vecs.shape[1])
+            if self.backend == "ivf":
+                # faiss wants ~39 training points per list; shrink nlist for small first batches
+                self.nlist = max(1, min(self.nlist, len(vecs) // 39))
+            self.index = self._new_index(self.dim)
+        if self.backend == "ivf" and not self.index.is_trained:
+            self.index.train(vecs)
+        if self._read_only:
+            # an mmap'd index cannot be modified; reload it into memory first
+            self.index = faiss.read_index(os.path.join(self._path, "index.faiss"))
+            self._read_only = False
+            self._apply_ef_search()
+
+    def _apply_ef_search(self):
+        # efSearch is not stored in the index file, so set it again after every read
+        if self.backend == "hnsw":
+            faiss.downcast_index(self.index.index).hnsw.efSearch = self.ef_search
+
+    def _remove(self, fids: List[int]):
+        if not fids:
+            return
+        if self.backend == "hnsw":
+            self._deleted.update(fids)
+        else:
+            self.index.remove_ids(np.asarray(fids, dtype="int64"))
+
+    def upsert(self, jobs: List[Dict]) -> int:
+        """Insert new jobs and replace changed ones; returns how many were written."""
+        if not jobs:
+            return 0
+        # last occurrence wins within a batch
+        batch = {j["id"]: j for j in jobs}
+        jobs = list(batch.values())
+        vecs = self.matcher.embed([j["description"] for j in jobs]).astype("float32")
+        self._ensure_index(vecs)
+
+        replaced = [self._ids[j["id"]] for j in jobs if j["id"] in self._ids]
+        self._remove(replaced)
+        for fid in replaced:
+            self._jobs.pop(fid, None)
+
+        fids = np.arange(self._next_id, self._next_id + len(jobs), dtype="int64")
+        self._next_id += len(jobs)
+        self.index.add_with_ids(vecs, fids)
+        for fid, job in zip(fids.tolist(), jobs):
+            self._ids[job["id"]] = fid
+            self._jobs[fid] = job
+        if self.lexical is not None:
+            self.lexical.upsert(jobs)
+        logger.info(f"VectorSearch upserted {len(jobs)} jobs ({len(replaced)} replaced); size={len(self)}")
+        return len(jobs)
 
     def add_jobs(self, jobs):
-        embeddings = self.model.encode([j["description"] for j in jobs])
-        self.index.add(np.array(embeddings).astype("float32"))
-        self.job_texts = jobs
-
-    def search(self, query_text, top_k=5):
-        q_emb = self.model.encode([query_text]).astype("float32")
-        D, I = self.index.search(q_emb, top_k)
-        return [self.job_texts[i] for i in I[0]]
+        return self.upsert(jobs)
+
+    def delete(self, job_ids: List[str]) -> int:
+        fids = [self._ids.pop(j) for j in job_ids if j in self._ids]
+        if fids:
+            self._ensure_index(np.zeros((0, self.dim), dtype="float32"))
+            self._remove(fids)
+            for fid in fids:
+                self._jobs.pop(fid, None)
+        if self.lexical is not None:
+            self.lexical.delete(job_ids)
+        return len(fids)
+
+    def compact(self):
+        """Rebuild an HNSW graph without its tombstoned entries."""
+        if self.backend != "hnsw" or not self._deleted:
+            return
+        live = sorted(self._jobs)
+        vecs = np.vstack([self.index.reconstruct(fid) for fid in live]) if live else np.zeros((0, self.dim), "float32")
+        self.index = self._new_index(self.dim)
+        if live:
+            self.index.add_with_ids(vecs, np.asarray(live, dtype="int64"))
+        self._deleted.clear()
+        self._read_only = False
+
+    # ---- search ----
+    @staticmethod
+    def _matches(job: Dict, filters: Optional[Dict]) -> bool:
+        if not filters:
+            return True
+        for key, wanted in filters.items():
+            value = job_source(job) if key == "source" else job.get(key)
+            if isinstance(wanted, (list, tuple, set, frozenset)):
+                if value not in wanted:
+                    return False
+            elif value != wanted:
+                return False
+        return True
+
+    def search(self, query_text, top_k=5, filters: Optional[Dict] = None, hybrid: bool = False,
+               shortlist: int = 300, alpha: float = 0.7) -> List[Dict]:
+        """Top-k jobs by cosine similarity, optionally filtered on fields such as
+        ``{"source": "indeed", "company": ["Acme", "Globex"]}``.
+
+        ``hybrid=True`` (needs ``lexical=True``) reranks the BM25 top `shortlist`
+        instead; `score` is then the fusion from `agents.bm25_index.fuse_scores`.
+        """
+        if self.index is None or not self._ids or top_k <= 0:
+            return []
+        if hybrid:
+            return self._search_hybrid(query_text, top_k, filters, shortlist, alpha)
+        if self.backend == "ivf":
+            self.index.nprobe = self.nprobe
+        q = self.matcher.embed([query_text]).astype("float32")
+        total = self.index.ntotal
+        # over-fetch when filters or tombstones may discard hits, widening until satisfied
+        fetch = top_k if not (filters or self._deleted) else top_k * 4
+        while True:
+            fetch = min(fetch, total)
+            D, I = self.index.search(q, fetch)
+            out = []
+            for score, fid in zip(D[0], I[0]):
+                if fid < 0 or fid in self._deleted:
+                    continue
+                job = self._jobs.get(int(fid))
+                if job is not None and self._matches(job, filters):
+                    out.append(dict(job, score=float(score)))
+                    if len(out) == top_k:
+                        return out
+            if fetch >= total:
+                return out
+            fetch *= 4
+
+    def _search_hybrid(self, query_text, top_k, filters, shortlist, alpha) -> List[Dict]:
+        if self.lexical is None:
+            raise ValueError("hybrid search needs a VectorSearch built with lexical=True")
+        ids, scores = self.lexical.search(query_text, top_k=shortlist)
+        candidates, lexical_scores = [], []
+        for job_id, score in zip(ids, scores.tolist()):
+            job = self._jobs.get(self._ids.get(job_id, -1))
+            if job is not None and self._matches(job, filters):
+                candidates.append(job)
+                lexical_scores.append(score)
+        return hybrid_rerank(self.matcher, query_text, candidates, np.asarray(lexical_scores), alpha, top_k)
+
+    # ---- persistence ----
+    def save(self, directory: str):
+        self.compact()
+        os.makedirs(directory, exist_ok=True)
+        index_path = os.path.join(directory, "index.faiss")
+        if self.index is not None:
+            faiss.write_index(self.index, index_path + ".tmp")
+            os.replace(index_path + ".tmp", index_path)
+        meta = {
+            "model_name": self.model_name, "backend": self.backend, "dim": self.dim,
+            "nlist": self.nlist, "nprobe": self.nprobe, "hnsw_m": self.hnsw_m, "ef_search": self.ef_search,
+            "next_id": self._next_id, "lexical": self.lexical is not None,
+            "jobs": [[fid, job] for fid, job in self._jobs.items()],
+        }
+        if self.lexical is not None:
+            self.lexical.save(os.path.join(directory, "bm25.npz"))
+        meta_path = os.path.join(directory, "meta.json")
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(meta_path + ".tmp", meta_path)
+        logger.info(f"Saved VectorSearch index ({len(self)} jobs) to {directory}")
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True, cache: Optional[EmbeddingCache] = None) -> "VectorSearch":
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        vs = cls(model_name=meta["model_name"], backend=meta["backend"], nlist=meta["nlist"],
+                 nprobe=meta["nprobe"], hnsw_m=meta["hnsw_m"], ef_search=meta["ef_search"], cache=cache)
+        bm25_path = os.path.join(directory, "bm25.npz")
+        if meta.get("lexical"):
+            vs.lexical = BM25Index.load(bm25_path) if os.path.exists(bm25_path) else BM25Index()
+        vs.dim = meta["dim"]
+        vs._next_id = meta["next_id"]
+        for fid, job in meta["jobs"]:
+            vs._jobs[fid] = job
+            vs._ids[job["id"]] = fid
+        index_path = os.path.join(directory, "index.faiss")
+        if os.path.exists(index_path):
+            vs.index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP if mmap else 0)
+            vs._read_only = mmap
+            vs._path = directory
+            vs._apply_ef_search()
+        logger.info(f"Loaded VectorSearch index ({len(vs)} jobs) from {directory}")
+        return vs
@@ -0,0 +1,315 @@
+"""Headless batch recommendations for every profile in the MemoryBank.
+
+    python -m app.batch_runner --output recs.jsonl --threshold 0.3 --top-k 20
+    python -m app.batch_runner --serve --port 8765    # POST /run streams JSONL
+
+Each profile's query is its ``query`` field, falling back to its preferred
+role. Profiles are grouped by normalized query, so every query is scraped
+once, with groups fetched concurrently. Every distinct posting is embedded
+once across all groups. Resume vectors come from the bank when they were
+stored for the current model and resume pooling; the rest are encoded in
+one pass (long resumes chunked, see JDMatcher.resume_pooling) and written
+back. Scoring is sharded by resume rows across a process pool. One JSONL
+line per profile is written as soon as its shard finishes. The run report
+gives profiles/sec and seconds per stage. ``--threads`` caps torch's CPU
+threads once, at startup.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, IO, List, Optional
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.chunked_encoder import set_threads
+from agents.dedup import dedup_jobs
+from agents.jd_matcher_agent import JDMatcher, topk_similarity
+from agents.job_scraper_agent import fetch_real_jobs
+from memory.job_store import JobStore
+from memory.long_term_memory import MemoryBank, SQLiteBackend
+from memory.result_cache import normalize_query
+from observability.metrics import export_prometheus, incr, observe
+
+logger = logging.getLogger(__name__)
+
+RESULT_FIELDS = ("job_id", "title", "company", "url", "score")
+
+
+def profile_query(profile: Dict) -> Optional[str]:
+    query = profile.get("query") or (profile.get("preferences") or {}).get("role")
+    return query if isinstance(query, str) and query.strip() else None
+
+
+def _score_shard(group: str, rows: List[int], resume_vecs: np.ndarray, job_vecs: np.ndarray,
+                 top_k: int, threshold: Optional[float]):
+    indices, scores = topk_similarity(resume_vecs, job_vecs, k=top_k, threshold=threshold)
+    return group, rows, indices, scores
+
+
+class BatchRunner:
+    def __init__(self, bank: MemoryBank, matcher: Optional[JDMatcher] = None, job_store=None,
+                 processes: Optional[int] = None, shard_size: int = 256, scrape_workers: int = 4,
+                 jobs_per_query: int = 50):
+        self.bank = bank
+        self.matcher = matcher or JDMatcher()
+        self.job_store = job_store
+        self.processes = os.cpu_count() if processes is None else processes
+        self.shard_size = shard_size
+        self.scrape_workers = scrape_workers
+        self.jobs_per_query = jobs_per_query
+        self._run_lock = threading.Lock()
+
+    @contextmanager
+    def _stage(self, stages: Dict[str, float], name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            stages[name] = round(stages.get(name, 0.0) + seconds, 4)
+            observe("batch_stage_seconds", seconds, stage=name)
+
+    def busy(self) -> bool:
+        return self._run_lock.locked()
+
+    # ---- stages ----
+    def _load(self, user_ids: Optional[List[str]]):
+        """(groups: normalized query -> [user ids], resume texts, stored vectors, skipped count)."""
+        ids = list(user_ids) if user_ids is not None else self.bank.list_profiles()
+        profiles = self.bank.get_profiles(ids)
+        groups: Dict[str, List[str]] = OrderedDict()
+        texts, stored, skipped = {}, {}, 0
+        for uid in ids:
+            rec = profiles.get(uid)
+            query = profile_query(rec["profile"]) if rec else None
+            resume = self.bank.get_resume(uid) if query else None
+            if resume is None:
+                skipped += 1
+                continue
+            texts[uid] = resume["resume_text"]
+            if resume.get("model") == self.matcher.resume_model and resume.get("embedding") is not None:
+                stored[uid] = resume
+            groups.setdefault(normalize_query(query), []).append(uid)
+        return groups, texts, stored, skipped
+
+    def _scrape(self, queries: List[str]) -> Dict[str, List[Dict]]:
+        def fetch(query):
+            jobs = fetch_real_jobs(query, top_k=self.jobs_per_query, store=self.job_store)
+            return query, dedup_jobs(jobs)[0]
+
+        with ThreadPoolExecutor(max_workers=max(1, self.scrape_workers), thread_name_prefix="batch-scrape") as pool:
+            return dict(pool.map(fetch, queries))
+
+    def _embed_resumes(self, texts: Dict[str, str], stored: Dict[str, Dict]) -> Dict[str, np.ndarray]:
+        vecs = {uid: np.asarray(rec["embedding"], dtype=np.float32) for uid, rec in stored.items()}
+        missing = [uid for uid in texts if uid not in vecs]
+        if missing:
+            fresh = self.matcher.embed_resumes([texts[uid] for uid in missing])
+            for uid, vec in zip(missing, fresh):
+                vecs[uid] = vec
+                old = self.bank.get_resume(uid)
+                self.bank.save_resume(uid, texts[uid], skills=old.get("skills") if old else None,
+                                      embedding=vec, model=self.matcher.resume_model)
+        return vecs
+
+    def _shards(self, groups, job_vecs, resume_vecs, top_k, threshold):
+        for group, uids in groups.items():
+            if group not in job_vecs:
+                continue
+            for start in range(0, len(uids), self.shard_size):
+                rows = list(range(start, min(start + self.shard_size, len(uids))))
+                yield (group, rows, np.stack([resume_vecs[uids[r]] for r in rows]), job_vecs[group], top_k, threshold)
+
+    # ---- driver ----
+    def run(self, out: IO, threshold: Optional[float] = None, top_k: int = 20,
+            user_ids: Optional[List[str]] = None) -> Dict:
+        """Recommend for every profile (or `user_ids`), writing one JSON line per
+        profile to `out`. Returns the run report."""
+        with self._run_lock:
+            return self._run(out, threshold, top_k, user_ids)
+
+    def _run(self, out, threshold, top_k, user_ids) -> Dict:
+        stages: Dict[str, float] = {}
+        start = time.perf_counter()
+        with self._stage(stages, "load"):
+            groups, texts, stored, skipped = self._load(user_ids)
+        with self._stage(stages, "scrape"):
+            jobs = {g: j for g, j in self._scrape(list(groups)).items() if j}
+        with self._stage(stages, "embed_jobs"):
+            # every distinct posting once, even when several queries found it
+            unique = OrderedDict((j["id"], j) for batch in jobs.values() for j in batch)
+            vecs = self.matcher.embed([j["description"] for j in unique.values()]) if unique else None
+            row_of = {job_id: i for i, job_id in enumerate(unique)}
+            job_vecs = {g: vecs[[row_of[j["id"]] for j in batch]] for g, batch in jobs.items()}
+        with self._stage(stages, "embed_resumes"):
+            resume_vecs = self._embed_resumes(texts, stored)
+
+        written = 0
+        with self._stage(stages, "score_and_write"):
+            shards = list(self._shards(groups, job_vecs, resume_vecs, top_k, threshold))
+            if self.processes and self.processes > 1 and len(shards) > 1:
+                pool = ProcessPoolExecutor(max_workers=min(self.processes, len(shards)))
+                results = as_completed([pool.submit(_score_shard, *s) for s in shards])
+            else:
+                pool = None
+                results = (_score_shard(*s) for s in shards)
+            try:
+                for item in results:
+                    group, rows, indices, scores = item.result() if pool is not None else item
+                    batch = jobs[group]
+                    for r, row_idx, row_scores in zip(rows, indices, scores):
+                        recs = self.matcher.build_results(batch, row_idx, row_scores)
+                        out.write(json.dumps({"user_id": groups[group][r], "query": group,
+                                              "results": [{f: rec[f] for f in RESULT_FIELDS} for rec in recs]}) + "\n")
+                        written += 1
+                    out.flush()
+            finally:
+                if pool is not None:
+                    pool.shutdown()
+
+        no_jobs = sum(len(uids) for g, uids in groups.items() if g not in jobs)
+        seconds = time.perf_counter() - start
+        incr("batch_profiles_total", written)
+        report = {
+            "profiles": written,
+            "skipped": skipped,
+            "without_jobs": no_jobs,
+            "queries": len(groups),
+            "postings": len(unique),
+            "resumes_encoded": len(texts) - len(stored),
+            "seconds": round(seconds, 4),
+            "profiles_per_s": round(written / seconds, 2) if seconds else None,
+            "stages": stages,
+        }
+        logger.info(f"Batch run: {report}")
+        return report
+
+
+# ---- local HTTP API ----
+def serve(runner: BatchRunner, host: str = "127.0.0.1", port: int = 8765):
+    """POST /run (JSON body: threshold, top_k, user_ids) streams JSONL results,
+    then a final ``{"report": ...}`` line, or ``{"error": ...}`` if the run
+    failed part way; 409 while another run is in progress. GET /health and
+    GET /metrics."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, code, body, content_type="application/json"):
+            data = body.encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, json.dumps({"ok": True, "busy": runner.busy()}))
+            elif self.path == "/metrics":
+                self._send(200, export_prometheus(), "text/plain; version=0.0.4")
+            else:
+                self._send(404, json.dumps({"error": "not found"}))
+
+        def do_POST(self):
+            if self.path != "/run":
+                return self._send(404, json.dumps({"error": "not found"}))
+            try:
+                params = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                threshold = params.get("threshold")
+                threshold = None if threshold is None else float(threshold)
+                top_k = int(params.get("top_k", 20))
+            except (ValueError, TypeError, AttributeError):
+                return self._send(400, json.dumps({"error": "invalid JSON body"}))
+            # claim the runner before answering, so two requests cannot both get a 200
+            if not runner._run_lock.acquire(blocking=False):
+                return self._send(409, json.dumps({"error": "a batch run is already in progress"}))
+            try:
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.end_headers()
+                stream = _SocketWriter(self.wfile)
+                try:
+                    report = runner._run(stream, threshold, top_k, params.get("user_ids"))
+                except Exception as e:
+                    # the 200 is already out; end the stream with the error instead of just closing it
+                    logger.exception("Batch run failed: %s", e)
+                    stream.write(json.dumps({"error": str(e)}) + "\n")
+                else:
+                    stream.write(json.dumps({"report": report}) + "\n")
+                stream.flush()
+            finally:
+                runner._run_lock.release()
+
+        def log_message(self, fmt, *args):
+            logger.info("batch api: " + fmt, *args)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    logger.info(f"Batch API listening on http://{host}:{server.server_address[1]}")
+    return server
+
+
+class _SocketWriter:
+    """Text writer over the handler's binary stream (the response is closed to end it)."""
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+
+    def write(self, text: str):
+        self.wfile.write(text.encode("utf-8"))
+
+    def flush(self):
+        self.wfile.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--db", default=None, help="MemoryBank SQLite file (default: the shared cache store)")
+    parser.add_argument("--jobs-db", default=None, help="JobStore SQLite file (default: the shared cache store)")
+    parser.add_argument("--output", default="-", help="JSONL output path, '-' for stdout")
+    parser.add_argument("--threshold", type=float, default=None)
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--processes", type=int, default=None, help="scoring processes (default: CPU count)")
+    parser.add_argument("--shard-size", type=int, default=256, help="resumes per scoring task")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="torch CPU threads for this process (default: JOB_ENCODE_THREADS or torch's own)")
+    parser.add_argument("--serve", action="store_true", help="run the local HTTP API instead of one batch")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stderr)
+    set_threads(args.threads or os.environ.get("JOB_ENCODE_THREADS"))
+    runner = BatchRunner(MemoryBank(backend=SQLiteBackend(args.db)), job_store=JobStore(args.jobs_db),
+                         processes=args.processes, shard_size=args.shard_size)
+    if args.serve:
+        server = serve(runner, args.host, args.port)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        return 0
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        report = runner.run(out, threshold=args.threshold, top_k=args.top_k)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(json.dumps(report, indent=2), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
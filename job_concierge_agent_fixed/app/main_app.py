@@ -1,23 +1,64 @@
-import sys, os
+import sys, os, io
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import streamlit as st
 import logging
 from tools.cv_upload_tool import read_uploaded_file
+from tools.resume_ingest import IngestError
 from agents.resume_parser_agent import parse_resume_text
 from agents.recommendation_agent import RecommendationAgent
 from tools.google_search_tool import search_jobs
-from memory.long_term_memory import MemoryBank
+from memory.long_term_memory import MemoryBank, SQLiteBackend
+from memory.result_cache import ResultCache
+from memory.job_store import JobStore
+from agents.model_registry import warm_up
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger('ai_job_concierge')
 
+# load the shared encoder in the background; no-op once it is loaded
+warm_up()
+
 st.set_page_config(page_title='AI Job Concierge Agent', layout='centered')
 
 st.title('AI Job Concierge — Demo')
 st.markdown('Upload your resume (TXT/PDF) and search for roles. This demo uses a mocked job fetcher.')
 
-mb = MemoryBank()
+@st.cache_resource
+def get_memory_bank():
+    # one SQLite-backed bank per process, so profiles survive reruns and restarts
+    return MemoryBank(backend=SQLiteBackend())
+
+@st.cache_resource
+def get_agent():
+    # one agent (matcher, scheduler, router) per process, not one per click;
+    # scrapes are recorded in the job store so periodic refreshes work on deltas
+    return RecommendationAgent(job_store=JobStore())
+
+@st.cache_resource
+def get_result_cache():
+    # ranked results per (resume, query); refreshed in the background after 15 min
+    return ResultCache(ttl=900)
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def read_resume_upload(name, data):
+    # the uploader hands back the same file on every rerun; extract it once
+    # (a rejected file is remembered too, with the reason, rather than re-parsed)
+    buf = io.BytesIO(data)
+    buf.name = name
+    try:
+        return read_uploaded_file(buf), None
+    except IngestError as e:
+        return '', str(e)
+
+def format_age(seconds):
+    if seconds < 60:
+        return f'{int(seconds)}s'
+    return f'{int(seconds // 60)} min'
+
+mb = get_memory_bank()
+agent = get_agent()
+results = get_result_cache()
 
 with st.sidebar:
     st.header('User Profile')
@@ -32,10 +73,14 @@ resume_text = st.text_area('Or paste resume text here (quick)')
 
 resume_parsed = None
 if uploaded is not None:
-    resume_text = read_uploaded_file(uploaded)
+    resume_text, upload_error = read_resume_upload(uploaded.name, uploaded.getvalue())
+    if upload_error:
+        st.error(f'Could not read {uploaded.name}: {upload_error}')
 
 if st.button('Parse Resume') and resume_text:
     resume_parsed = parse_resume_text(resume_text)
+    if user_id:
+        mb.save_resume(user_id, resume_text, skills=resume_parsed['skills'])
     st.subheader('Parsed Resume')
     st.json(resume_parsed)
 
@@ -43,12 +88,42 @@ st.markdown('---')
 st.subheader('Job Search & Match')
 query = st.text_input('Search query (e.g., Machine Learning)', value='Machine Learning')
 threshold = st.slider('Recommendation threshold (cosine similarity)', min_value=0.0, max_value=1.0, value=0.15)
-if st.button('Fetch & Recommend'):
+col_fetch, col_refresh = st.columns(2)
+fetch = col_fetch.button('Fetch & Recommend')
+refresh = col_refresh.button('Refresh now')
+if fetch or refresh:
     if not resume_text:
         st.error('Upload or paste resume text first.')
     else:
-        rec_agent = RecommendationAgent()
-        recommended = rec_agent.recommend_once(resume_text, query, threshold)
+        st.session_state['search'] = (resume_text, query)
+        # keep this query's postings and embeddings fresh in the background (hourly)
+        agent.watch_query(query)
+        if refresh:
+            results.refresh_async(resume_text, query, agent.rank)
+        else:
+            # a click retries a failed fetch; plain reruns wait out the error backoff
+            results.get_or_refresh(resume_text, query, agent.rank, retry_failed=True)
+
+# results come from the cache on every rerun; moving the slider only re-filters them
+search = st.session_state.get('search')
+if search:
+    search_resume, search_query = search
+    entry = results.get_or_refresh(search_resume, search_query, agent.rank)
+    if entry is None:
+        with st.spinner('Fetching jobs...'):
+            entry = results.wait(search_resume, search_query, timeout=60)
+    status = results.status(search_resume, search_query)
+    if entry is None:
+        st.error(f"Fetching jobs failed: {status['error']}. Press Fetch & Recommend to retry."
+                 if status['error'] else 'Still fetching jobs; try again shortly.')
+    else:
+        note = f"Results for '{search_query}' updated {format_age(status['age'])} ago"
+        if status['refreshing']:
+            note += ' · refreshing in the background'
+        elif status['error']:
+            note += f" · last refresh failed: {status['error']}"
+        st.caption(note)
+        recommended = entry.above(threshold)
         st.write(f'Found {len(recommended)} recommended jobs (threshold={threshold})')
         for r in recommended[:20]:
             st.markdown(f"**{r['title']}** at *{r['company']}* — score: {r['score']:.3f}")
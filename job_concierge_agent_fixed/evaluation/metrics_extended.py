@@ -1,32 +1,244 @@
-"""Extended evaluation metrics: recall@k, mean average precision (MAP), nDCG"""
-from typing import List, Dict
-import math
+"""Extended evaluation metrics: recall@k, mean average precision (MAP), nDCG
+
+`bulk_evaluate` scores thousands of queries at once: predicted ids and
+judgments are turned into one (queries x depth) relevance matrix, and
+precision / recall / AP / nDCG at every requested k, plus MAP and MRR, come
+out of cumulative sums over that matrix. Graded relevance is supported
+(judgments as {id: grade}) and `bootstrap` adds percentile confidence
+intervals. The single-query functions below are thin wrappers over it.
+"""
+from typing import List, Dict, Iterable, Optional, Sequence, Union
+import numpy as np
+
+METRICS = ("precision", "recall", "ap", "ndcg", "map", "mrr")
+IDEALS = ("judged", "retrieved")
+
+Judgment = Union[Dict, Iterable]
+
+
+def _flatten_predictions(predictions, depth: Optional[int], pad):
+    """(n_queries, width, query index, position, id) for every predicted slot."""
+    if isinstance(predictions, np.ndarray) and predictions.ndim == 2:
+        ids = predictions[:, :depth] if depth else predictions
+        valid = np.ones(ids.shape, dtype=bool) if pad is None else ids != pad
+        q, pos = np.nonzero(valid)
+        return len(ids), ids.shape[1], q, pos, ids[valid]
+    lengths = np.array([len(p) if not depth else min(len(p), depth) for p in predictions], dtype=np.int64)
+    flat = [x for p, n in zip(predictions, lengths.tolist()) for x in p[:n]]
+    q = np.repeat(np.arange(len(lengths)), lengths)
+    starts = np.cumsum(lengths) - lengths
+    pos = np.arange(len(flat)) - np.repeat(starts, lengths)
+    ids = np.asarray(flat)
+    if pad is not None and len(flat):
+        keep = ids != pad
+        q, pos, ids = q[keep], pos[keep], ids[keep]
+    return len(lengths), int(lengths.max()) if len(lengths) else 0, q, pos, ids
+
+
+def _flatten_judgments(judgments: Sequence[Judgment]):
+    """(query index, id, grade) for every judged item; plain collections are binary."""
+    qs, ids, grades = [], [], []
+    for i, judged in enumerate(judgments):
+        if isinstance(judged, dict):
+            items = judged.items()
+        else:
+            items = ((x, 1.0) for x in judged)
+        for x, g in items:
+            qs.append(i)
+            ids.append(x)
+            grades.append(g)
+    return np.asarray(qs, dtype=np.int64), np.asarray(ids), np.asarray(grades, dtype=np.float64)
+
+
+def relevance_matrix(predictions, judgments: Sequence[Judgment], depth: Optional[int] = None, pad=None,
+                     min_width: int = 0):
+    """Align judgments with predictions.
+
+    `predictions` is a ragged list of id lists or a padded 2-D array (slots equal
+    to `pad` are empty); `judgments[i]` is a collection of relevant ids or an
+    {id: grade} dict for query i. Returns ``(rel, ideal, n_relevant)``: the grade
+    of every predicted slot (queries x width), each query's judged grades sorted
+    descending and truncated to the same width, and the count of relevant
+    (grade > 0) judged items per query. The width is the longest ranking, at
+    least `min_width`.
+    """
+    n, width, pq, ppos, pids = _flatten_predictions(predictions, depth, pad)
+    width = max(width, min_width)
+    jq, jids, jgrades = _flatten_judgments(judgments[:n])
+    rel = np.zeros((n, width), dtype=np.float64)
+    ideal = np.zeros((n, width), dtype=np.float64)
+    if not len(jq):
+        return rel, ideal, np.zeros(n, dtype=np.float64)
+
+    # encode (query, id) pairs as single integers and match them by binary search
+    vocab, codes = np.unique(np.concatenate([pids, jids]) if len(pids) else jids, return_inverse=True)
+    size = len(vocab)
+    jkeys, first = np.unique(jq * size + codes[len(pids):], return_index=True)
+    jq, grades = jkeys // size, jgrades[first]
+    if len(pids):
+        pkeys = pq * size + codes[:len(pids)]
+        at = np.minimum(np.searchsorted(jkeys, pkeys), len(jkeys) - 1)
+        rel[pq, ppos] = np.where(jkeys[at] == pkeys, grades[at], 0.0)
+    n_relevant = np.bincount(jq[grades > 0], minlength=n).astype(np.float64)
+
+    # ideal ranking: judged grades per query, best first
+    order = np.lexsort((-grades, jq))
+    sq, sg = jq[order], grades[order]
+    rank = np.arange(len(sq)) - np.searchsorted(sq, np.arange(n))[sq]
+    keep = (rank < width) & (sg > 0)
+    ideal[sq[keep], rank[keep]] = sg[keep]
+    return rel, ideal, n_relevant
+
+
+def _pad_to(matrix: np.ndarray, width: int) -> np.ndarray:
+    if matrix.shape[1] >= width:
+        return matrix
+    return np.pad(matrix, ((0, 0), (0, width - matrix.shape[1])))
+
+
+def evaluate_relevance(rel: np.ndarray, n_relevant: np.ndarray, ideal: Optional[np.ndarray] = None,
+                       ks: Sequence[int] = (1, 5, 10), metrics: Sequence[str] = METRICS) -> Dict[str, np.ndarray]:
+    """Per-query metric arrays from a (queries x depth) matrix of graded relevance.
+
+    `ideal` holds each query's best possible grades (see `relevance_matrix`);
+    when None the retrieved grades re-sorted within the top k are used, which
+    matches the original `ndcg_at_k`.
+    """
+    unknown = set(metrics) - set(METRICS)
+    if unknown:
+        raise ValueError(f"Unknown metrics {sorted(unknown)}; expected some of {METRICS}")
+    if any(k < 1 for k in ks):
+        raise ValueError("k must be >= 1")
+    depth = max([rel.shape[1], 1] + list(ks))
+    rel = _pad_to(np.asarray(rel, dtype=np.float64), depth)
+    n_rel = np.asarray(n_relevant, dtype=np.float64)
+    safe_n_rel = np.where(n_rel > 0, n_rel, 1.0)
+
+    hits = (rel > 0).astype(np.float64)
+    cum_hits = np.cumsum(hits, axis=1)
+    ranks = np.arange(1, depth + 1, dtype=np.float64)
+    cum_ap = np.cumsum(cum_hits / ranks * hits, axis=1)
+    discount = 1.0 / np.log2(ranks + 1)
+    cum_dcg = np.cumsum((2.0 ** rel - 1) * discount, axis=1)
+    if ideal is not None:
+        cum_idcg = np.cumsum((2.0 ** _pad_to(ideal, depth)[:, :depth] - 1) * discount, axis=1)
+
+    out = {}
+    for k in ks:
+        col = k - 1
+        if "precision" in metrics:
+            out[f"precision@{k}"] = cum_hits[:, col] / k
+        if "recall" in metrics:
+            out[f"recall@{k}"] = np.where(n_rel > 0, cum_hits[:, col] / safe_n_rel, 0.0)
+        if "ap" in metrics:
+            out[f"ap@{k}"] = np.where(n_rel > 0, cum_ap[:, col] / safe_n_rel, 0.0)
+        if "ndcg" in metrics:
+            if ideal is not None:
+                idcg = cum_idcg[:, col]
+            else:
+                best = -np.sort(-rel[:, :k], axis=1)
+                idcg = ((2.0 ** best - 1) * discount[:k]).sum(axis=1)
+            out[f"ndcg@{k}"] = np.where(idcg > 0, cum_dcg[:, col] / np.where(idcg > 0, idcg, 1.0), 0.0)
+    if "map" in metrics:
+        out["map"] = np.where(n_rel > 0, cum_ap[:, -1] / safe_n_rel, 0.0)
+    if "mrr" in metrics:
+        first = np.argmax(hits, axis=1)
+        out["mrr"] = np.where(hits.any(axis=1), 1.0 / (first + 1), 0.0)
+    return out
+
+
+def bootstrap_ci(per_query: Dict[str, np.ndarray], n_boot: int = 1000, alpha: float = 0.05,
+                 seed: int = 0) -> Dict[str, List[float]]:
+    """Percentile bootstrap intervals for the mean of every metric.
+
+    Resamples queries with replacement; each replicate is a row of per-query
+    draw counts, so all metrics are averaged with one matrix product per chunk.
+    """
+    names = list(per_query)
+    if not names:
+        return {}
+    values = np.stack([per_query[name] for name in names], axis=1)
+    n = len(values)
+    if n == 0:
+        return {name: [0.0, 0.0] for name in names}
+    rng = np.random.default_rng(seed)
+    chunk = max(1, 4_000_000 // n)
+    means = []
+    for start in range(0, n_boot, chunk):
+        size = min(chunk, n_boot - start)
+        draws = rng.integers(0, n, size=(size, n)) + (np.arange(size) * n)[:, None]
+        counts = np.bincount(draws.ravel(), minlength=size * n).reshape(size, n)
+        means.append(counts @ values / n)
+    means = np.concatenate(means)
+    low, high = np.quantile(means, [alpha / 2, 1 - alpha / 2], axis=0)
+    return {name: [float(lo), float(hi)] for name, lo, hi in zip(names, low, high)}
+
+
+def bulk_evaluate(predictions, judgments: Sequence[Judgment], ks: Sequence[int] = (1, 5, 10),
+                  metrics: Sequence[str] = METRICS, ideal: str = "judged", depth: Optional[int] = None,
+                  pad=None, bootstrap: int = 0, alpha: float = 0.05, seed: int = 0,
+                  per_query: bool = False) -> Dict:
+    """Evaluate many rankings in one vectorized pass.
+
+    Returns ``{"queries": n, "metrics": {name: mean}}`` with names like
+    ``"ndcg@10"``, ``"map"``, ``"mrr"``; plus ``"ci": {name: [low, high]}`` when
+    `bootstrap` > 0 and the per-query arrays under ``"per_query"`` if asked.
+    `ideal` is "judged" (standard nDCG, ideal ranking from all judgments) or
+    "retrieved" (ideal from the retrieved items only, as `ndcg_at_k` does).
+    Recall and AP divide by the number of distinct relevant ids; the
+    single-query wrappers below keep dividing by ``len(ground_truth)``.
+    """
+    if ideal not in IDEALS:
+        raise ValueError(f"Unknown ideal {ideal!r}; expected one of {IDEALS}")
+    rel, ideal_grades, n_relevant = relevance_matrix(predictions, judgments, depth=depth, pad=pad,
+                                                    min_width=max(ks, default=0))
+    scores = evaluate_relevance(rel, n_relevant, ideal_grades if ideal == "judged" else None, ks=ks, metrics=metrics)
+    n = len(rel)
+    report = {"queries": n, "metrics": {name: float(v.mean()) if n else 0.0 for name, v in scores.items()}}
+    if bootstrap:
+        report["ci"] = bootstrap_ci(scores, n_boot=bootstrap, alpha=alpha, seed=seed)
+    if per_query:
+        report["per_query"] = scores
+    return report
+
+
+# ---- single-query API (thin wrappers) ----
+def _ids(preds: List[Dict]) -> List:
+    return [p['job_id'] for p in preds]
+
+
+def _per_query(predictions, ground_truths, metric: str, k: Optional[int] = None) -> np.ndarray:
+    """Per-query recall / AP normalized the way the original functions did:
+    by ``len(ground_truth)``, duplicate ids included. bulk_evaluate divides by
+    the number of distinct relevant ids, so the two differ only when the
+    ground truth repeats an id."""
+    name = f"{metric}@{k}" if k else metric
+    scores = bulk_evaluate(predictions, ground_truths, ks=(k,) if k else (), metrics=(metric,),
+                           per_query=True)["per_query"][name]
+    scale = np.array([len(set(gt)) / len(gt) if len(gt) else 0.0 for gt in ground_truths])
+    return scores * scale
+
 
 def recall_at_k(preds: List[Dict], ground_truth: List[str], k: int = 10) -> float:
-    topk = [p['job_id'] for p in preds[:k]]
-    hits = sum(1 for t in topk if t in ground_truth)
-    return hits / len(ground_truth) if ground_truth else 0.0
+    return float(_per_query([_ids(preds)], [ground_truth], "recall", k)[0])
+
 
 def average_precision(preds: List[Dict], ground_truth: List[str]) -> float:
-    hits = 0
-    sum_prec = 0.0
-    for i, p in enumerate(preds, start=1):
-        if p['job_id'] in ground_truth:
-            hits += 1
-            sum_prec += hits / i
-    return sum_prec / len(ground_truth) if ground_truth else 0.0
+    return float(_per_query([_ids(preds)], [ground_truth], "map")[0])
+
 
 def mean_average_precision(list_of_preds: List[List[Dict]], list_of_gts: List[List[str]]) -> float:
-    aps = [average_precision(p, gt) for p, gt in zip(list_of_preds, list_of_gts)]
-    return sum(aps)/len(aps) if aps else 0.0
+    pairs = list(zip(list_of_preds, list_of_gts))
+    if not pairs:
+        return 0.0
+    return float(_per_query([_ids(p) for p, _ in pairs], [gt for _, gt in pairs], "map").mean())
+
 
 def dcg_at_k(relevances: List[int], k: int) -> float:
-    dcg = 0.0
-    for i, rel in enumerate(relevances[:k], start=1):
-        dcg += (2**rel - 1) / math.log2(i+1)
-    return dcg
+    rel = np.asarray(relevances[:k], dtype=np.float64)
+    return float(((2.0 ** rel - 1) / np.log2(np.arange(2, len(rel) + 2))).sum())
+
 
 def ndcg_at_k(preds: List[Dict], ground_truth: List[str], k: int = 10) -> float:
-    relevances = [1 if p['job_id'] in ground_truth else 0 for p in preds[:k]]
-    ideal = sorted(relevances, reverse=True)
-    return dcg_at_k(relevances, k) / dcg_at_k(ideal, k) if dcg_at_k(ideal, k) > 0 else 0.0
+    return bulk_evaluate([_ids(preds)], [ground_truth], ks=(k,), metrics=("ndcg",),
+                         ideal="retrieved")["metrics"][f"ndcg@{k}"]
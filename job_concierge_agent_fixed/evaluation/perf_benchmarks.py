@@ -0,0 +1,476 @@
+"""Offline performance benchmarks for the matching pipeline.
+
+Generates synthetic job corpora (or loads a recorded one from JSONL) plus a
+resume set, and times each stage on its own and end to end:
+
+  skills          extract_skills, one posting per call
+  score_cold      JDMatcher.score with an empty embedding cache (encodes the corpus)
+  score           JDMatcher.score with a warm cache
+  index           VectorSearch.add_jobs, in batches
+  search          VectorSearch.search
+  extract/<site>  agents.html_extract over the saved pages in evaluation/fixtures
+                  (also reports parse CPU ms per page)
+  scrape          fetch_real_jobs over synthetic HTML replayed from the HTTP cache
+  recommend_once  RecommendationAgent.recommend_once over the same replayed HTML
+  notify_*        tools.notification_pipeline: submit, digest delivery to a file
+                  sink and a local stub webhook, and a fully deduplicated resubmit
+
+Each stage reports throughput, p50/p95/p99 latency and the process's peak
+RSS. Everything runs on CPU without network access: unless --model names a
+locally available sentence-transformers model, a feature-hashing encoder
+stands in for it, so the numbers measure the pipeline around the model.
+
+With --quantization the largest corpus's embeddings also go through
+agents.quantization.recall_report (float16 / int8 / PQ memory and recall
+loss against float32), and --encoder-parity compares encoder inference
+backends (agents.encoder_backends) with the eager torch model. Results are
+written as JSON; --baseline compares against an earlier run and exits
+non-zero when a stage's p95 regressed by more than --tolerance.
+
+    python -m evaluation.perf_benchmarks --sizes 100,10k,100k --output bench.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+import zlib
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+from agents import model_registry
+from agents.embedding_cache import EmbeddingCache
+from agents.http_cache import configure_http_cache
+from agents.jd_matcher_agent import JDMatcher
+from agents.skill_engine import load_taxonomy
+from agents.skill_extractor import extract_skills
+from observability import metrics
+
+logger = logging.getLogger(__name__)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+HASHING_MODEL = "bench-hashing"
+_TOKEN = re.compile(r"[a-z0-9+#]+")
+
+
+class HashingEncoder:
+    """Deterministic bag-of-words encoder (signed feature hashing) with the
+    ``encode`` signature of SentenceTransformer. Texts sharing words get
+    similar vectors, which is all the pipeline needs to be exercised."""
+
+    def __init__(self, dim: int = 384, chunk: int = 1024):
+        self.dim = dim
+        self.chunk = chunk
+
+    def encode(self, texts, batch_size: int = 32, **kwargs) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for start in range(0, len(texts), self.chunk):
+            rows, hashes = [], []
+            for i, text in enumerate(texts[start:start + self.chunk], start=start):
+                for tok in _TOKEN.findall(text.lower()):
+                    rows.append(i)
+                    hashes.append(zlib.crc32(tok.encode("utf-8")))
+            if rows:
+                hashes = np.asarray(hashes, dtype=np.uint32)
+                signs = np.where(hashes & 0x80000000, 1.0, -1.0).astype(np.float32)
+                np.add.at(out, (np.asarray(rows), hashes % self.dim), signs)
+        return out
+
+
+# ---- synthetic data ----
+TITLES = ["Software Engineer", "Data Scientist", "Backend Developer", "Frontend Developer",
+          "Machine Learning Engineer", "DevOps Engineer", "Data Analyst", "Product Manager",
+          "QA Engineer", "Cloud Architect", "Mobile Developer", "Data Engineer"]
+LEVELS = ["", "Junior ", "Senior ", "Lead ", "Staff ", "Principal "]
+CITIES = ["Bangalore", "Hyderabad", "Pune", "Chennai", "Mumbai", "Delhi", "Remote"]
+SOURCE_NAMES = ("indeed", "naukri", "linkedin")
+FILLER = [
+    "You will work closely with product and design to ship reliable features.",
+    "We value ownership, clear communication and continuous learning.",
+    "The team runs services used by millions of customers every day.",
+    "Flexible hours, health insurance and a yearly learning budget are included.",
+    "You will mentor junior engineers and take part in code reviews.",
+    "Experience with agile delivery and production on-call is a plus.",
+    "Join a fast growing startup backed by leading investors.",
+    "Our hiring process has two technical rounds and one culture round.",
+]
+
+
+def _skills_vocab() -> List[str]:
+    return sorted(load_taxonomy())
+
+
+def synthetic_jobs(n: int, seed: int = 0) -> List[Dict]:
+    """`n` postings shaped like the scrapers' output."""
+    rng = random.Random(seed)
+    vocab = _skills_vocab()
+    jobs = []
+    for i in range(n):
+        source = SOURCE_NAMES[i % len(SOURCE_NAMES)]
+        title = rng.choice(LEVELS) + rng.choice(TITLES)
+        company = f"Company {rng.randrange(max(n // 20, 10))}"
+        city = rng.choice(CITIES)
+        skills = ", ".join(rng.sample(vocab, 6))
+        desc = f"{title} at {company} in {city}. Required skills: {skills}. " + " ".join(rng.sample(FILLER, 3))
+        jobs.append({
+            "id": f"{source}_{i:08x}",
+            "title": title,
+            "company": company,
+            "url": f"https://jobs.example.com/{source}/{i}",
+            "description": desc,
+            "source": source,
+            "location": city,
+        })
+    return jobs
+
+
+def synthetic_resumes(n: int, seed: int = 1) -> List[str]:
+    rng = random.Random(seed)
+    vocab = _skills_vocab()
+    return [f"{rng.choice(TITLES)} with {rng.randrange(1, 15)} years of experience in {rng.choice(CITIES)}. "
+            f"Skills: {', '.join(rng.sample(vocab, 12))}. "
+            f"Led projects end to end and worked in cross-functional teams."
+            for _ in range(n)]
+
+
+def load_corpus(path: str) -> List[Dict]:
+    """Recorded postings, one JSON object per line (e.g. dumped from the JobStore)."""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+# ---- replayed HTML ----
+# URLs and markup mirror what the scrapers in agents/job_scraper_agent.py request and select
+def _indeed_page(query: str, jobs: List[Dict]):
+    url = f"https://in.indeed.com/jobs?q={query.replace(' ', '+')}&l=India"
+    cards = "".join(
+        f'<div class="job_seen_beacon"><h2 class="jobTitle"><a href="/viewjob?jk={j["id"]}">{j["title"]}</a></h2>'
+        f'<span class="companyName">{j["company"]}</span><div class="job-snippet">{j["description"]}</div></div>'
+        for j in jobs)
+    return url, cards
+
+
+def _naukri_page(query: str, jobs: List[Dict]):
+    url = f"https://www.naukri.com/{query.replace(' ', '-')}-jobs"
+    cards = "".join(
+        f'<article class="jobTuple bgWhite"><a class="title" href="{j["url"]}">{j["title"]}</a>'
+        f'<a class="subTitle">{j["company"]}</a><div class="job-description">{j["description"]}</div></article>'
+        for j in jobs)
+    return url, cards
+
+
+def _linkedin_page(query: str, jobs: List[Dict]):
+    url = f"https://www.linkedin.com/jobs/search/?keywords={query.replace(' ', '%20')}&location=India"
+    cards = "".join(
+        f'<div class="base-card"><a class="base-card__full-link" href="{j["url"]}"></a>'
+        f'<h3 class="base-search-card__title">{j["title"]}</h3>'
+        f'<h4 class="base-search-card__subtitle">{j["company"]}</h4></div>'
+        for j in jobs)
+    return url, cards
+
+
+PAGE_BUILDERS = {"indeed": _indeed_page, "naukri": _naukri_page, "linkedin": _linkedin_page}
+_CHROME = "".join(f'<li class="nav-item"><a href="/section/{i}">Section {i}</a></li>' for i in range(60))
+
+
+def write_replay_fixtures(directory: str, queries: List[str], jobs: List[Dict], cards_per_page: int = 25):
+    """Point the process-wide HTTP cache at `directory` in replay mode and fill it
+    with one synthetic results page per (source, query)."""
+    cache = configure_http_cache(directory=directory, mode="replay")
+    for qi, query in enumerate(queries):
+        for si, (source, build) in enumerate(PAGE_BUILDERS.items()):
+            start = ((qi * len(PAGE_BUILDERS) + si) * cards_per_page) % max(len(jobs) - cards_per_page, 1)
+            url, cards = build(query, jobs[start:start + cards_per_page])
+            html = f"<html><head><title>{query} jobs</title></head><body><ul>{_CHROME}</ul>{cards}</body></html>"
+            cache.put(url, html.encode("utf-8"))
+    return cache
+
+
+# ---- measurement ----
+def peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes elsewhere
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def summarize(samples: List[float], items: int) -> Dict:
+    arr = np.asarray(samples, dtype=np.float64)
+    total = float(arr.sum())
+    p50, p95, p99 = (np.percentile(arr, [50, 95, 99]) * 1000).tolist() if len(arr) else (0.0, 0.0, 0.0)
+    return {
+        "calls": len(arr),
+        "items": items,
+        "seconds": round(total, 4),
+        "throughput": round(items / total, 2) if total else None,
+        "p50_ms": round(p50, 3),
+        "p95_ms": round(p95, 3),
+        "p99_ms": round(p99, 3),
+    }
+
+
+def run_stage(name: str, func: Callable[[int], object], calls: int, items: Optional[int] = None,
+              count: Optional[Callable[[object], int]] = None) -> Dict:
+    """Call ``func(i)`` for i in range(calls), timing each call. `items` is the
+    total work done (postings, queries) for the throughput figure; default `calls`.
+    With `count`, items are instead summed from ``count(func(i))`` per call
+    and the per-call counts are kept under "counts"."""
+    samples, counts = [], []
+    for i in range(calls):
+        start = time.perf_counter()
+        out = func(i)
+        samples.append(time.perf_counter() - start)
+        if count is not None:
+            counts.append(count(out))
+    if count is not None:
+        items = sum(counts)
+    result = summarize(samples, calls if items is None else items)
+    if count is not None:
+        result["counts"] = counts
+    result["peak_rss_mb"] = peak_rss_mb()
+    logger.info("%s: %s", name, result)
+    return result
+
+
+def bench_corpus(jobs: List[Dict], resumes: List[str], model_name: str, workdir: str,
+                 repeats: int = 20, backend: str = "flat", skill_sample: int = 2000,
+                 index_batch: int = 1000) -> Dict[str, Dict]:
+    """Stage benchmarks over one corpus size."""
+    results = {}
+    sample = jobs[:skill_sample]
+    results["skills"] = run_stage("skills", lambda i: extract_skills(sample[i]["description"]), len(sample))
+
+    cache = EmbeddingCache(os.path.join(workdir, f"embeddings-{len(jobs)}"))
+    matcher = JDMatcher(model_name, cache=cache)
+    results["score_cold"] = run_stage("score_cold", lambda i: matcher.score(resumes[0], jobs, top_k=10),
+                                      1, items=len(jobs))
+    results["score"] = run_stage("score", lambda i: matcher.score(resumes[i % len(resumes)], jobs, top_k=10),
+                                 repeats, items=repeats * len(jobs))
+
+    try:
+        from agents.vector_search import VectorSearch
+        # shares the warm embedding cache, so this measures indexing rather than encoding
+        vs = VectorSearch(model_name, backend=backend, cache=cache)
+        batches = [jobs[s:s + index_batch] for s in range(0, len(jobs), index_batch)]
+        results["index"] = run_stage("index", lambda i: vs.add_jobs(batches[i]), len(batches), items=len(jobs))
+        results["search"] = run_stage("search", lambda i: vs.search(resumes[i % len(resumes)], top_k=10), repeats)
+    except ImportError as e:
+        logger.warning("Skipping vector search stages: %s", e)
+    return results
+
+
+def bench_extraction(fixtures_dir: str = FIXTURES_DIR, repeats: int = 20) -> Dict[str, Dict]:
+    """Card extraction over saved result pages (``<site>.html``), one page per call."""
+    from agents.html_extract import SITE_SPECS, search_url, timed_extract
+
+    results = {}
+    for site in SITE_SPECS:
+        path = os.path.join(fixtures_dir, f"{site}.html")
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        url = search_url(site, "python developer")
+        cpu = []
+        result = run_stage(f"extract/{site}", lambda i: cpu.append(timed_extract(site, html, url)[1]), repeats)
+        result["cpu_ms_per_page"] = round(float(np.median(cpu)) * 1000, 3)
+        result["cards"] = len(timed_extract(site, html, url)[0])
+        results[site] = result
+    return results
+
+
+def bench_end_to_end(queries: List[str], resumes: List[str], model_name: str, workdir: str,
+                     repeats: int = 20) -> Dict[str, Dict]:
+    """fetch_real_jobs and recommend_once against replayed HTML (see write_replay_fixtures).
+    Items are the postings each call came back with; recommend_once runs with
+    a threshold of -1 so that is every deduplicated posting it fetched. A call
+    that gets no postings means the replayed pages no longer match the
+    scrapers, and fails the run instead of reporting an empty pipeline's speed."""
+    from agents.job_scraper_agent import fetch_real_jobs
+    from agents.recommendation_agent import RecommendationAgent
+
+    results = {"scrape": run_stage("scrape", lambda i: fetch_real_jobs(queries[i % len(queries)]), repeats,
+                                   count=len)}
+    agent = RecommendationAgent()
+    agent.matcher = JDMatcher(model_name, cache=EmbeddingCache(os.path.join(workdir, "embeddings-e2e")))
+    try:
+        results["recommend_once"] = run_stage(
+            "recommend_once",
+            lambda i: agent.recommend_once(resumes[i % len(resumes)], queries[i % len(queries)], threshold=-1.0),
+            repeats, count=len)
+    finally:
+        agent.scheduler.shutdown()
+        agent.router.close()
+    for stage, result in results.items():
+        if not all(result["counts"]):
+            raise RuntimeError(f"{stage}: replayed scrape returned no jobs (per-call counts {result['counts']}); "
+                               f"the pages from write_replay_fixtures no longer match agents.html_extract")
+    return results
+
+
+def bench_notifications(workdir: str, n_users: int = 500, per_user: int = 30) -> Dict[str, Dict]:
+    """Digest pipeline throughput against local stand-in sinks; items are postings."""
+    from memory.sent_store import SentStore
+    from tools.notification_pipeline import FileSink, NotificationPipeline, WebhookSink, serve_stub_webhook
+
+    server, url = serve_stub_webhook()
+    sinks = {"file": FileSink(os.path.join(workdir, "digests.jsonl")), "webhook": WebhookSink(url)}
+    pipeline = NotificationPipeline(sinks, store=SentStore(os.path.join(workdir, "notifications.db")),
+                                    window=3600, max_items=2 * per_user, rate=10_000, workers=4)
+    recs = [[{"job_id": f"job-{(u * 7 + i) % (per_user * 10)}", "title": "Engineer", "company": "Acme",
+              "url": "https://example.com", "score": 1.0 - i / per_user} for i in range(per_user)]
+            for u in range(n_users)]
+    channels = list(sinks)
+    submit = lambda i: pipeline.submit(f"user-{i // 2}", channels[i % 2], recs[i // 2])
+    results = {"notify_submit": run_stage("notify_submit", submit, 2 * n_users, items=2 * n_users * per_user)}
+    results["notify_deliver"] = run_stage("notify_deliver", lambda i: (pipeline.flush(), pipeline.wait()), 1,
+                                          items=2 * n_users * per_user)
+    results["notify_resubmit"] = run_stage("notify_resubmit", submit, 2 * n_users, items=2 * n_users * per_user)
+    results["notify_deliver"]["digests"] = pipeline.stats()["channels"]
+    pipeline.close()
+    server.shutdown()
+    return results
+
+
+def compare(baseline: Dict, current: Dict, tolerance: float = 0.2) -> List[str]:
+    """Stages whose p95 latency grew by more than `tolerance` (a fraction) over `baseline`."""
+    regressions = []
+    for group, stages in current.get("results", {}).items():
+        for stage, cur in stages.items():
+            base = baseline.get("results", {}).get(group, {}).get(stage)
+            if not base or not base.get("p95_ms"):
+                continue
+            if cur["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+                regressions.append(f"{group}/{stage}: p95 {base['p95_ms']}ms -> {cur['p95_ms']}ms")
+    return regressions
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text[:-1] if scale > 1 else text) * scale)
+
+
+def run(sizes: List[int], n_resumes: int = 20, n_queries: int = 5, repeats: int = 20, backend: str = "flat",
+        model: Optional[str] = None, corpus_path: Optional[str] = None, seed: int = 0,
+        workdir: Optional[str] = None, quantization: bool = False,
+        encoder_parity: Optional[List[str]] = None) -> Dict:
+    own_workdir = workdir is None
+    workdir = workdir or tempfile.mkdtemp(prefix="job-bench-")
+    if model is None:
+        model_registry.register_model(HASHING_MODEL, HashingEncoder())
+    model_name = model or HASHING_MODEL
+    try:
+        corpus = load_corpus(corpus_path) if corpus_path else synthetic_jobs(max(sizes), seed=seed)
+        resumes = synthetic_resumes(n_resumes, seed=seed + 1)
+        queries = [f"{t.lower()} {c.lower()}" for t, c in zip(TITLES, CITIES * 2)][:n_queries]
+
+        results = {}
+        for size in sizes:
+            if size > len(corpus):
+                logger.warning("Corpus has only %d postings; skipping size %d", len(corpus), size)
+                continue
+            logger.info("Benchmarking %d postings", size)
+            results[str(size)] = bench_corpus(corpus[:size], resumes, model_name, workdir,
+                                              repeats=repeats, backend=backend)
+
+        compression = None
+        if quantization and results:
+            from agents.quantization import recall_report
+            size = max(int(s) for s in results)
+            matcher = JDMatcher(model_name, cache=EmbeddingCache(os.path.join(workdir, f"embeddings-{size}")))
+            compression = recall_report(matcher.embed([j["description"] for j in corpus[:size]]), seed=seed)
+
+        parity = None
+        if encoder_parity:
+            from agents.encoder_backends import load_encoder, parity_check, split_name
+            base = split_name(model or model_registry.DEFAULT_MODEL)[0]
+            texts = resumes + [j["description"] for j in corpus[:200]]
+            reference = load_encoder(base)
+            parity = [parity_check(base, b, texts=texts, reference=reference) for b in encoder_parity]
+
+        results["extraction"] = bench_extraction(repeats=repeats)
+        write_replay_fixtures(os.path.join(workdir, "http"), queries, corpus)
+        metrics.REGISTRY.reset()
+        results["end_to_end"] = bench_end_to_end(queries, resumes, model_name, workdir, repeats=repeats)
+        results["notifications"] = bench_notifications(workdir)
+        spans = {k: v for k, v in metrics.snapshot()["histograms"].items() if k.startswith("span_seconds")}
+    finally:
+        if own_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "model": model_name,
+            "backend": backend,
+            "corpus": corpus_path or "synthetic",
+            "seed": seed,
+            "repeats": repeats,
+        },
+        "results": results,
+        "spans": spans,
+        "quantization": compression,
+        "encoder_parity": parity,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", default="100,1k,10k", help="comma separated corpus sizes, e.g. 100,10k,1m")
+    parser.add_argument("--resumes", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=20, help="calls per latency stage")
+    parser.add_argument("--backend", default="flat", help="VectorSearch backend: flat, ivf or hnsw")
+    parser.add_argument("--model", default=None, help="sentence-transformers model (default: hashing encoder)")
+    parser.add_argument("--corpus", default=None, help="recorded postings as JSONL instead of synthetic ones")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--quantization", action="store_true", help="report compressed-embedding recall and size")
+    parser.add_argument("--encoder-parity", default=None,
+                        help="comma separated encoder backends to check against torch, e.g. onnx,onnx-int8")
+    parser.add_argument("--output", default="perf_results.json")
+    parser.add_argument("--baseline", default=None, help="earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 growth vs baseline")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    for noisy in ("agents", "memory"):
+        logging.getLogger(noisy).setLevel(logging.WARNING)
+
+    report = run([parse_size(s) for s in args.sizes.split(",")], n_resumes=args.resumes, n_queries=args.queries,
+                 repeats=args.repeats, backend=args.backend, model=args.model, corpus_path=args.corpus,
+                 seed=args.seed, quantization=args.quantization,
+                 encoder_parity=args.encoder_parity.split(",") if args.encoder_parity else None)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(json.load(f), report, args.tolerance)
+        for line in regressions:
+            print("REGRESSION", line)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
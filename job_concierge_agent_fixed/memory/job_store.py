@@ -0,0 +1,149 @@
+"""Persistent job store (SQLite, WAL mode).
+
+Postings are keyed by the stable ids the scrapers emit. For each posting the
+store keeps a content hash, first/last seen times and the embedding version
+it was last indexed with, so periodic runs can work on deltas: `sync()` says
+which postings are new or changed, `pending_embedding()` which still need
+(re-)embedding, and `expire()` ages out postings no longer listed.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+from agents.cache_paths import cache_dir
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    source TEXT,
+    content_hash TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    embedding_version TEXT,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_last_seen ON jobs(last_seen);
+CREATE INDEX IF NOT EXISTS idx_jobs_embedding ON jobs(embedding_version);
+"""
+
+
+def content_hash(job: Dict) -> str:
+    key = "\x1f".join(str(job.get(f, "")) for f in ("title", "company", "url", "description"))
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+class JobStore:
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(cache_dir("store"), "jobs.db")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def sync(self, jobs: List[Dict], now: Optional[float] = None) -> Dict[str, List[Dict]]:
+        """Record a scrape. Returns ``{"new": [...], "changed": [...], "unchanged": [...]}``.
+
+        Changed postings get their embedding version cleared so they are
+        re-embedded; every posting's last_seen is bumped.
+        """
+        now = now or time.time()
+        delta = {"new": [], "changed": [], "unchanged": []}
+        if not jobs:
+            return delta
+        with self._lock, self._conn:
+            ids = [j["id"] for j in jobs]
+            known = {}
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT job_id, content_hash FROM jobs WHERE job_id IN ({','.join('?' * len(chunk))})", chunk)
+                known.update(rows.fetchall())
+            for job in jobs:
+                h = content_hash(job)
+                old = known.get(job["id"])
+                payload = json.dumps(job)
+                if old is None:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO jobs (job_id, source, content_hash, first_seen, last_seen, payload) "
+                        "VALUES (?, ?, ?, ?, ?, ?)", (job["id"], job.get("source"), h, now, now, payload))
+                    delta["new"].append(job)
+                elif old != h:
+                    self._conn.execute(
+                        "UPDATE jobs SET content_hash=?, last_seen=?, embedding_version=NULL, payload=? WHERE job_id=?",
+                        (h, now, payload, job["id"]))
+                    delta["changed"].append(job)
+                else:
+                    self._conn.execute("UPDATE jobs SET last_seen=? WHERE job_id=?", (now, job["id"]))
+                    delta["unchanged"].append(job)
+                known[job["id"]] = h
+        logger.info("JobStore sync: %d new, %d changed, %d unchanged",
+                    len(delta["new"]), len(delta["changed"]), len(delta["unchanged"]))
+        return delta
+
+    def mark_embedded(self, job_ids: List[str], version: str):
+        with self._lock, self._conn:
+            self._conn.executemany("UPDATE jobs SET embedding_version=? WHERE job_id=?",
+                                   [(version, j) for j in job_ids])
+
+    def pending_embedding(self, version: str, limit: Optional[int] = None) -> List[Dict]:
+        """Postings never embedded with `version` (new, changed, or from an older model)."""
+        sql = "SELECT payload FROM jobs WHERE embedding_version IS NULL OR embedding_version != ?"
+        params = [version]
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            return [json.loads(p) for (p,) in self._conn.execute(sql, params)]
+
+    def expire(self, max_age: float, now: Optional[float] = None) -> List[str]:
+        """Delete postings not seen for `max_age` seconds; returns their ids."""
+        cutoff = (now or time.time()) - max_age
+        with self._lock, self._conn:
+            ids = [r[0] for r in self._conn.execute("SELECT job_id FROM jobs WHERE last_seen < ?", (cutoff,))]
+            self._conn.execute("DELETE FROM jobs WHERE last_seen < ?", (cutoff,))
+        if ids:
+            logger.info(f"JobStore expired {len(ids)} postings")
+        return ids
+
+    def get(self, job_ids: List[str]) -> List[Dict]:
+        out = []
+        with self._lock:
+            for start in range(0, len(job_ids), 500):
+                chunk = job_ids[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT payload FROM jobs WHERE job_id IN ({','.join('?' * len(chunk))})", chunk)
+                out.extend(json.loads(p) for (p,) in rows)
+        return out
+
+    def all_jobs(self, seen_since: Optional[float] = None) -> List[Dict]:
+        sql, params = "SELECT payload FROM jobs", []
+        if seen_since is not None:
+            sql += " WHERE last_seen >= ?"
+            params.append(seen_since)
+        with self._lock:
+            return [json.loads(p) for (p,) in self._conn.execute(sql, params)]
+
+    def info(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT first_seen, last_seen, embedding_version, content_hash FROM jobs WHERE job_id=?",
+                (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {"first_seen": row[0], "last_seen": row[1], "embedding_version": row[2], "content_hash": row[3]}
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
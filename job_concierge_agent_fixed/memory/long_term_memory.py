@@ -1,23 +1,287 @@
-"""Simple in-memory Long Term Memory (Memory Bank)
-Production systems should use a DB or vector DB. This demo keeps memory in RAM.
+"""Long Term Memory (Memory Bank) with pluggable storage.
+
+`InMemoryBackend` keeps the original RAM-only behaviour; `SQLiteBackend`
+persists profiles across reruns and restarts, with indexes on the preferred
+role and location. `MemoryBank` puts an LRU read cache and optional TTL
+expiry in front of either backend, and also stores each user's parsed
+resume (skills + embedding) keyed by a hash of the resume text so periodic
+runs can skip re-parsing and re-encoding unchanged resumes.
 """
-from typing import Dict, Any
-import uuid, logging, time
+from typing import Dict, Any, List, Optional, Iterable
+from collections import OrderedDict
+import hashlib, json, os, sqlite3, threading, uuid, logging, time
+
+import numpy as np
+
+from agents.cache_paths import cache_dir
 
 logger = logging.getLogger(__name__)
 
-class MemoryBank:
+
+def resume_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _pref(profile: Dict[str, Any], key: str) -> Optional[str]:
+    value = (profile.get('preferences') or {}).get(key)
+    return value.strip().lower() if isinstance(value, str) and value.strip() else None
+
+
+class InMemoryBackend:
     def __init__(self):
-        self._store = {}
+        self._profiles = {}
+        self._resumes = {}
+        self._lock = threading.Lock()
+
+    def put_many(self, records: Dict[str, Dict]):
+        with self._lock:
+            self._profiles.update(records)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict]:
+        with self._lock:
+            return {k: self._profiles[k] for k in keys if k in self._profiles}
+
+    def delete_many(self, keys: Iterable[str]):
+        with self._lock:
+            for k in keys:
+                self._profiles.pop(k, None)
+                self._resumes.pop(k, None)
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            return list(self._profiles)
+
+    def find(self, role: Optional[str] = None, location: Optional[str] = None) -> List[str]:
+        with self._lock:
+            return [k for k, r in self._profiles.items()
+                    if (role is None or _pref(r['profile'], 'role') == role)
+                    and (location is None or _pref(r['profile'], 'location') == location)]
+
+    def expired(self, now: float) -> List[str]:
+        with self._lock:
+            return [k for k, r in self._profiles.items() if r.get('expires_at') and r['expires_at'] <= now]
+
+    def put_resume(self, user_id: str, record: Dict):
+        with self._lock:
+            self._resumes[user_id] = record
+
+    def get_resume(self, user_id: str) -> Optional[Dict]:
+        with self._lock:
+            return self._resumes.get(user_id)
+
+
+class SQLiteBackend:
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS profiles (
+        user_id TEXT PRIMARY KEY,
+        profile TEXT NOT NULL,
+        ts REAL NOT NULL,
+        expires_at REAL,
+        role TEXT,
+        location TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_profiles_role ON profiles(role);
+    CREATE INDEX IF NOT EXISTS idx_profiles_location ON profiles(location);
+    CREATE INDEX IF NOT EXISTS idx_profiles_expires ON profiles(expires_at);
+    CREATE TABLE IF NOT EXISTS resumes (
+        user_id TEXT PRIMARY KEY,
+        text_hash TEXT NOT NULL,
+        resume_text TEXT NOT NULL,
+        skills TEXT,
+        model TEXT,
+        embedding BLOB,
+        ts REAL NOT NULL
+    );
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(cache_dir("store"), "memory.db")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+
+    def put_many(self, records: Dict[str, Dict]):
+        rows = [(k, json.dumps(r['profile']), r['ts'], r.get('expires_at'),
+                 _pref(r['profile'], 'role'), _pref(r['profile'], 'location')) for k, r in records.items()]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO profiles (user_id, profile, ts, expires_at, role, location) "
+                "VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict]:
+        keys = list(keys)
+        out = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT user_id, profile, ts, expires_at FROM profiles WHERE user_id IN ({','.join('?' * len(chunk))})",
+                    chunk)
+                for user_id, profile, ts, expires_at in rows:
+                    out[user_id] = {'profile': json.loads(profile), 'ts': ts, 'expires_at': expires_at}
+        return out
 
+    def delete_many(self, keys: Iterable[str]):
+        keys = [(k,) for k in keys]
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM profiles WHERE user_id=?", keys)
+            self._conn.executemany("DELETE FROM resumes WHERE user_id=?", keys)
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            return [r[0] for r in self._conn.execute("SELECT user_id FROM profiles")]
+
+    def find(self, role: Optional[str] = None, location: Optional[str] = None) -> List[str]:
+        clauses, params = [], []
+        if role is not None:
+            clauses.append("role = ?")
+            params.append(role)
+        if location is not None:
+            clauses.append("location = ?")
+            params.append(location)
+        sql = "SELECT user_id FROM profiles" + (" WHERE " + " AND ".join(clauses) if clauses else "")
+        with self._lock:
+            return [r[0] for r in self._conn.execute(sql, params)]
+
+    def expired(self, now: float) -> List[str]:
+        with self._lock:
+            return [r[0] for r in self._conn.execute(
+                "SELECT user_id FROM profiles WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))]
+
+    def put_resume(self, user_id: str, record: Dict):
+        emb = record.get('embedding')
+        blob = None if emb is None else np.asarray(emb, dtype=np.float32).tobytes()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO resumes (user_id, text_hash, resume_text, skills, model, embedding, ts) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (user_id, record['text_hash'], record['resume_text'], json.dumps(record.get('skills')),
+                 record.get('model'), blob, record['ts']))
+
+    def get_resume(self, user_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text_hash, resume_text, skills, model, embedding, ts FROM resumes WHERE user_id=?",
+                (user_id,)).fetchone()
+        if row is None:
+            return None
+        text_hash, resume_text, skills, model, blob, ts = row
+        return {'text_hash': text_hash, 'resume_text': resume_text, 'skills': json.loads(skills) if skills else None,
+                'model': model, 'embedding': None if blob is None else np.frombuffer(blob, dtype=np.float32),
+                'ts': ts}
+
+
+class MemoryBank:
+    def __init__(self, backend=None, cache_size: int = 1024, ttl: Optional[float] = None):
+        self.backend = backend if backend is not None else InMemoryBackend()
+        self.ttl = ttl
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # user_id -> record, LRU
+        self._lock = threading.Lock()
+
+    # ---- LRU front cache ----
+    def _cache_get(self, key):
+        with self._lock:
+            rec = self._cache.get(key)
+            if rec is not None:
+                self._cache.move_to_end(key)
+            return rec
+
+    def _cache_put(self, key, rec):
+        with self._lock:
+            self._cache[key] = rec
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _cache_drop(self, keys):
+        with self._lock:
+            for k in keys:
+                self._cache.pop(k, None)
+
+    @staticmethod
+    def _live(rec, now):
+        return rec is not None and not (rec.get('expires_at') and rec['expires_at'] <= now)
+
+    # ---- profiles ----
     def save_profile(self, user_id: str, profile: Dict[str, Any]) -> str:
         key = user_id or str(uuid.uuid4())
-        self._store[key] = {'profile': profile, 'ts': time.time()}
+        self.save_profiles({key: profile})
         logger.info(f"Saved profile for user_id={key}")
         return key
 
+    def save_profiles(self, profiles: Dict[str, Dict[str, Any]]):
+        """Bulk upsert {user_id: profile}."""
+        now = time.time()
+        records = {k: {'profile': p, 'ts': now, 'expires_at': now + self.ttl if self.ttl else None}
+                   for k, p in profiles.items()}
+        self.backend.put_many(records)
+        for k, rec in records.items():
+            self._cache_put(k, rec)
+
     def get_profile(self, user_id: str):
-        return self._store.get(user_id)
+        return self.get_profiles([user_id]).get(user_id)
+
+    def get_profiles(self, user_ids: Iterable[str]) -> Dict[str, Dict]:
+        """Bulk read; returns {user_id: {'profile', 'ts'}} for live profiles only."""
+        now = time.time()
+        out, missing = {}, []
+        for k in user_ids:
+            rec = self._cache_get(k)
+            if rec is None:
+                missing.append(k)
+            elif self._live(rec, now):
+                out[k] = rec
+        if missing:
+            for k, rec in self.backend.get_many(missing).items():
+                if self._live(rec, now):
+                    self._cache_put(k, rec)
+                    out[k] = rec
+        return {k: {'profile': r['profile'], 'ts': r['ts']} for k, r in out.items()}
+
+    def _drop_expired(self, keys: List[str]) -> List[str]:
+        # expired rows stay in the backend until purge_expired(); callers never see them
+        expired = set(self.backend.expired(time.time())) if keys else set()
+        return [k for k in keys if k not in expired]
+
+    def list_profiles(self) -> List[str]:
+        """Ids of all live (unexpired) profiles."""
+        return self._drop_expired(self.backend.keys())
+
+    def find_profiles(self, role: Optional[str] = None, location: Optional[str] = None) -> List[str]:
+        """Live user ids whose preferences match `role` / `location` (case-insensitive, indexed)."""
+        role = role.strip().lower() if role else None
+        location = location.strip().lower() if location else None
+        return self._drop_expired(self.backend.find(role=role, location=location))
+
+    def delete_profiles(self, user_ids: Iterable[str]):
+        user_ids = list(user_ids)
+        self.backend.delete_many(user_ids)
+        self._cache_drop(user_ids)
+
+    def purge_expired(self) -> int:
+        expired = self.backend.expired(time.time())
+        if expired:
+            self.delete_profiles(expired)
+            logger.info(f"Purged {len(expired)} expired profiles")
+        return len(expired)
+
+    # ---- parsed resume features ----
+    def save_resume(self, user_id: str, resume_text: str, skills: Optional[List[str]] = None,
+                    embedding=None, model: Optional[str] = None):
+        self.backend.put_resume(user_id, {'text_hash': resume_hash(resume_text), 'resume_text': resume_text,
+                                          'skills': skills, 'embedding': embedding, 'model': model,
+                                          'ts': time.time()})
 
-    def list_profiles(self):
-        return list(self._store.keys())
+    def get_resume(self, user_id: str, resume_text: Optional[str] = None, model: Optional[str] = None) -> Optional[Dict]:
+        """Stored resume features, or None if absent or stale for `resume_text` / `model`."""
+        rec = self.backend.get_resume(user_id)
+        if rec is None:
+            return None
+        if resume_text is not None and rec['text_hash'] != resume_hash(resume_text):
+            return None
+        if model is not None and rec.get('model') != model:
+            return None
+        return rec
@@ -0,0 +1,167 @@
+"""Cache of ranked recommendations keyed by (resume hash, normalized query).
+
+The Streamlit UI reruns its whole script on every interaction. Keeping the
+full ranked list per (resume, query) turns a threshold change into a bisect
+over cached scores instead of a re-scrape, and refreshes run on a small
+background pool while the previous results stay on screen with their age.
+After a refresh fails, `get_or_refresh` leaves that key alone for
+`error_backoff` seconds, so reruns do not start a new scrape each time; an
+explicit `refresh_async` (or ``retry_failed=True``) retries right away.
+"""
+import bisect
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Callable, Dict, List, Optional, Tuple
+
+from memory.long_term_memory import resume_hash
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def result_key(resume_text: str, query: str) -> Tuple[str, str]:
+    return resume_hash(resume_text), normalize_query(query)
+
+
+class CachedResult:
+    """A ranked list (descending score) with the time it was computed."""
+
+    def __init__(self, ranked: List[Dict], updated_at: Optional[float] = None):
+        self.ranked = ranked
+        self.updated_at = updated_at or time.time()
+        self._neg_scores = [-r['score'] for r in ranked]  # ascending, for bisect
+
+    def age(self) -> float:
+        return time.time() - self.updated_at
+
+    def above(self, threshold: float) -> List[Dict]:
+        """Results scoring >= `threshold`."""
+        return self.ranked[:bisect.bisect_right(self._neg_scores, -threshold)]
+
+
+class ResultCache:
+    def __init__(self, ttl: float = 900.0, max_entries: int = 256, max_workers: int = 2,
+                 error_backoff: float = 300.0):
+        self.ttl = ttl
+        self.error_backoff = error_backoff
+        self.max_entries = max_entries
+        self._entries = OrderedDict()             # key -> CachedResult, LRU
+        self._pending: Dict[Tuple, Future] = {}   # key -> running refresh
+        self._errors: Dict[Tuple, Tuple[str, float]] = {}   # key -> (message, failed at)
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="result-refresh")
+
+    def get(self, resume_text: str, query: str) -> Optional[CachedResult]:
+        key = result_key(resume_text, query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, resume_text: str, query: str, ranked: List[Dict]) -> CachedResult:
+        return self._store(result_key(resume_text, query), ranked)
+
+    def _store(self, key, ranked) -> CachedResult:
+        entry = CachedResult(ranked)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def is_stale(self, entry: Optional[CachedResult]) -> bool:
+        return entry is None or entry.age() > self.ttl
+
+    # ---- background refresh ----
+    def refresh_async(self, resume_text: str, query: str,
+                      compute: Callable[[str, str], List[Dict]]) -> Future:
+        """Recompute in the background with ``compute(resume_text, query)``; a
+        refresh already running for the same key is reused."""
+        key = result_key(resume_text, query)
+        with self._lock:
+            future = self._pending.get(key)
+            if future is None:
+                future = self._pool.submit(self._refresh, key, resume_text, query, compute)
+                self._pending[key] = future
+        return future
+
+    def _refresh(self, key, resume_text, query, compute):
+        start = time.perf_counter()
+        try:
+            entry = self._store(key, compute(resume_text, query))
+            with self._lock:
+                self._errors.pop(key, None)
+            logger.info(f"Refreshed results for query={query!r} in {time.perf_counter() - start:.2f}s")
+            return entry
+        except Exception as e:
+            logger.exception('Result refresh failed: %s', e)
+            with self._lock:
+                self._errors[key] = (str(e), time.time())
+            raise
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def _retry_in(self, key) -> float:
+        """Seconds until a failed key may be refreshed automatically again (0 if it may now)."""
+        with self._lock:
+            error = self._errors.get(key)
+        if error is None:
+            return 0.0
+        return max(0.0, error[1] + self.error_backoff - time.time())
+
+    def get_or_refresh(self, resume_text: str, query: str, compute: Callable[[str, str], List[Dict]],
+                       retry_failed: bool = False) -> Optional[CachedResult]:
+        """Cached entry (possibly stale, None if never computed); starts a
+        background refresh when it is missing or older than `ttl`, unless the
+        last refresh failed less than `error_backoff` seconds ago and
+        `retry_failed` is not set."""
+        entry = self.get(resume_text, query)
+        if self.is_stale(entry) and (retry_failed or not self._retry_in(result_key(resume_text, query))):
+            self.refresh_async(resume_text, query, compute)
+        return entry
+
+    def wait(self, resume_text: str, query: str, timeout: Optional[float] = None) -> Optional[CachedResult]:
+        """Block until a running refresh for the key finishes; returns the entry."""
+        with self._lock:
+            future = self._pending.get(result_key(resume_text, query))
+        if future is not None:
+            try:
+                future.result(timeout=timeout)
+            except FutureTimeout:
+                pass
+            except Exception:
+                pass  # recorded in status()["error"]
+        return self.get(resume_text, query)
+
+    def status(self, resume_text: str, query: str) -> Dict:
+        key = result_key(resume_text, query)
+        with self._lock:
+            entry = self._entries.get(key)
+            refreshing = key in self._pending
+            error = self._errors.get(key)
+        return {
+            "cached": entry is not None,
+            "age": entry.age() if entry is not None else None,
+            "stale": self.is_stale(entry),
+            "refreshing": refreshing,
+            "error": error[0] if error else None,
+            "retry_in": self._retry_in(key),
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._errors.clear()
+
+    def shutdown(self, wait: bool = False):
+        self._pool.shutdown(wait=wait)
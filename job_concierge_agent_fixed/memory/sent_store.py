@@ -0,0 +1,74 @@
+"""Persistent record of which postings each user was already notified about.
+
+One row per (user, channel, job id) in SQLite (WAL mode), so periodic runs
+only ever send postings that are new to that user's inbox. Rows older than
+`max_age` can be expired to let a posting that keeps being listed resurface.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+
+from agents.cache_paths import cache_dir
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sent (
+    user TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    job_id TEXT NOT NULL,
+    sent_at REAL NOT NULL,
+    PRIMARY KEY (user, channel, job_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_sent_at ON sent(sent_at);
+"""
+
+
+class SentStore:
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(cache_dir("store"), "notifications.db")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def unsent(self, user: str, channel: str, job_ids: List[str]) -> List[str]:
+        """The ids in `job_ids` not yet sent to (user, channel), in order."""
+        sent = set()
+        with self._lock:
+            for start in range(0, len(job_ids), 500):
+                chunk = job_ids[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT job_id FROM sent WHERE user=? AND channel=? AND job_id IN ({','.join('?' * len(chunk))})",
+                    [user, channel] + chunk)
+                sent.update(r[0] for r in rows)
+        return [j for j in job_ids if j not in sent]
+
+    def mark_sent(self, user: str, channel: str, job_ids: List[str], now: Optional[float] = None):
+        now = now or time.time()
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO sent (user, channel, job_id, sent_at) VALUES (?, ?, ?, ?)",
+                                   [(user, channel, j, now) for j in job_ids])
+
+    def expire(self, max_age: float, now: Optional[float] = None) -> int:
+        """Forget notifications older than `max_age` seconds; returns how many."""
+        cutoff = (now or time.time()) - max_age
+        with self._lock, self._conn:
+            removed = self._conn.execute("DELETE FROM sent WHERE sent_at < ?", (cutoff,)).rowcount
+        if removed:
+            logger.info(f"SentStore expired {removed} notifications")
+        return removed
+
+    def count(self, user: Optional[str] = None) -> int:
+        with self._lock:
+            if user is None:
+                return self._conn.execute("SELECT COUNT(*) FROM sent").fetchone()[0]
+            return self._conn.execute("SELECT COUNT(*) FROM sent WHERE user=?", (user,)).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
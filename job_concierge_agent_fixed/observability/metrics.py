@@ -1,20 +1,286 @@
-"""Simple observability helpers. If prometheus_client is available, expose counters.
-Otherwise, fallback to incrementing in-memory counters logged periodically.
+"""Observability helpers: a module-level registry of counters, gauges and
+histograms, timing helpers and span-style tracing.
+
+    incr("jobs_scraped", 5, source="indeed")
+    with timer("embed_seconds"): ...
+    with span("recommend_once", query=q):
+        with span("scrape"): ...
+
+`export_prometheus()` renders the Prometheus text exposition format and
+`snapshot()` a JSON-serializable dict (including recent traces). Set
+JOB_METRICS=0 (or call `set_enabled(False)`) to turn every helper into a
+no-op.
 """
+import contextvars
+import functools
 import logging
-try:
-    from prometheus_client import Counter, generate_latest, CollectorRegistry
-    PROM_AVAILABLE = True
-except Exception:
-    PROM_AVAILABLE = False
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional, Tuple
 
 logger = logging.getLogger(__name__)
-_counters = {}
-
-def incr(metric_name: str, amount: int = 1):
-    if PROM_AVAILABLE:
-        # in a full app you would register counters in a module-level registry
-        Counter(metric_name, 'auto').inc(amount)
-    else:
-        _counters[metric_name] = _counters.get(metric_name, 0) + amount
-        logger.info(f"Metric {metric_name} -> {_counters[metric_name]}")
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_enabled = os.environ.get("JOB_METRICS", "1") not in ("0", "false", "no")
+
+
+def set_enabled(enabled: bool):
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def _key(labels: Dict) -> Tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        i = 0
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Quantile estimated by linear interpolation inside the bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for bound, n in zip(self.buckets + (float("inf"),), self.counts):
+            if seen + n >= rank and n:
+                if bound == float("inf"):
+                    return lower
+                return lower + (bound - lower) * (rank - seen) / n
+            seen += n
+            lower = bound
+        return lower
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Tuple, float]] = {}
+        self._gauges: Dict[str, Dict[Tuple, float]] = {}
+        self._hists: Dict[str, Dict[Tuple, _Histogram]] = {}
+        self._help: Dict[str, str] = {}
+        self.traces = deque(maxlen=100)
+
+    def describe(self, name: str, help_text: str):
+        self._help[name] = help_text
+
+    def incr(self, name: str, amount: float = 1, **labels):
+        key = _key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def set_gauge(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges.setdefault(name, {})[_key(labels)] = value
+
+    def observe(self, name: str, value: float, buckets=DEFAULT_BUCKETS, **labels):
+        key = _key(labels)
+        with self._lock:
+            series = self._hists.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = _Histogram(tuple(buckets))
+            hist.observe(value)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._hists.clear()
+            self.traces.clear()
+
+    # ---- export ----
+    @staticmethod
+    def _fmt_labels(key: Tuple, extra: Optional[Tuple] = None) -> str:
+        items = list(key) + (list(extra) if extra else [])
+        if not items:
+            return ""
+        body = ",".join('{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in items)
+        return "{" + body + "}"
+
+    def export_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            for kind, table in (("counter", self._counters), ("gauge", self._gauges)):
+                for name, series in sorted(table.items()):
+                    lines.append(f"# HELP {name} {self._help.get(name, name)}")
+                    lines.append(f"# TYPE {name} {kind}")
+                    for key, value in series.items():
+                        lines.append(f"{name}{self._fmt_labels(key)} {value}")
+            for name, series in sorted(self._hists.items()):
+                lines.append(f"# HELP {name} {self._help.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, hist in series.items():
+                    cumulative = 0
+                    for bound, n in zip(hist.buckets + (float("inf"),), hist.counts):
+                        cumulative += n
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f"{name}_bucket{self._fmt_labels(key, (('le', le),))} {cumulative}")
+                    lines.append(f"{name}_sum{self._fmt_labels(key)} {hist.sum}")
+                    lines.append(f"{name}_count{self._fmt_labels(key)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict:
+        def series_name(name, key):
+            return name + self._fmt_labels(key)
+
+        with self._lock:
+            return {
+                "counters": {series_name(n, k): v for n, s in self._counters.items() for k, v in s.items()},
+                "gauges": {series_name(n, k): v for n, s in self._gauges.items() for k, v in s.items()},
+                "histograms": {
+                    series_name(n, k): {"count": h.count, "sum": round(h.sum, 6),
+                                        "p50": round(h.quantile(0.5), 6), "p95": round(h.quantile(0.95), 6),
+                                        "p99": round(h.quantile(0.99), 6)}
+                    for n, s in self._hists.items() for k, h in s.items()
+                },
+                "traces": list(self.traces),
+            }
+
+
+REGISTRY = Registry()
+
+
+# ---- module-level helpers ----
+def incr(metric_name: str, amount: int = 1, **labels):
+    if _enabled:
+        REGISTRY.incr(metric_name, amount, **labels)
+
+
+def set_gauge(metric_name: str, value: float, **labels):
+    if _enabled:
+        REGISTRY.set_gauge(metric_name, value, **labels)
+
+
+def observe(metric_name: str, value: float, **labels):
+    if _enabled:
+        REGISTRY.observe(metric_name, value, **labels)
+
+
+class _Noop:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP = _Noop()
+
+
+class _Timer:
+    __slots__ = ("name", "labels", "start")
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        REGISTRY.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+def timer(metric_name: str, **labels):
+    """Context manager observing elapsed seconds into histogram `metric_name`."""
+    return _Timer(metric_name, labels) if _enabled else _NOOP
+
+
+def timed(metric_name: str, **labels):
+    """Decorator form of `timer`."""
+    def wrap(func):
+        @functools.wraps(func)
+        def inner(*args, **kwargs):
+            with timer(metric_name, **labels):
+                return func(*args, **kwargs)
+        return inner
+    return wrap
+
+
+# ---- tracing ----
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class _Span:
+    __slots__ = ("name", "attrs", "start", "duration", "children", "parent", "token", "error")
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.children = []
+        self.error = None
+
+    def set(self, **attrs):
+        """Attach attributes (e.g. counts) to the span while it is open."""
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self.parent = _current_span.get()
+        self.token = _current_span.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        _current_span.reset(self.token)
+        if exc_type is not None:
+            self.error = exc_type.__name__
+        REGISTRY.observe("span_seconds", self.duration, span=self.name)
+        if self.parent is not None:
+            self.parent.children.append(self)
+        else:
+            REGISTRY.traces.append(self.to_dict())
+        return False
+
+    def to_dict(self) -> Dict:
+        out = {"name": self.name, "seconds": round(self.duration, 6), "attrs": self.attrs,
+               "children": [c.to_dict() for c in self.children]}
+        if self.error:
+            out["error"] = self.error
+        return out
+
+
+def span(name: str, **attrs):
+    """Trace a stage. Nested spans form a tree; finished root spans are kept in
+    ``snapshot()["traces"]`` and every span feeds the ``span_seconds`` histogram."""
+    return _Span(name, attrs) if _enabled else _NOOP
+
+
+def export_prometheus() -> str:
+    return REGISTRY.export_prometheus()
+
+
+def snapshot() -> Dict:
+    return REGISTRY.snapshot()
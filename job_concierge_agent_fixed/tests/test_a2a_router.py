@@ -0,0 +1,69 @@
+import time
+
+from agents.a2a_router import A2ARouter
+from agents.recommendation_agent import RecommendationAgent
+
+
+class _Collector:
+    def __init__(self):
+        self.received = []
+
+    def handle_recommendations(self, recommendations):
+        self.received.append(recommendations)
+
+
+def test_listener_with_batches_gets_each_payload():
+    agent = RecommendationAgent()
+    listener = _Collector()
+    name = agent.add_listener(listener, batch_size=4, batch_timeout=0.2)
+    payloads = [[{"job_id": f"j{i}"}] for i in range(10)]
+    for payload in payloads:
+        assert agent.router.post(name, {"from": "test", "to": name, "type": "recs", "payload": payload})
+    assert agent.flush_listeners(timeout=5)
+    assert sorted(listener.received, key=lambda p: p[0]["job_id"]) == sorted(payloads, key=lambda p: p[0]["job_id"])
+    assert agent.router.dead_letters == []
+    agent.router.close()
+
+
+def test_retry_backoff_does_not_stall_the_queue():
+    router = A2ARouter()
+    delivered, failed_once = [], set()
+
+    def handler(msg):
+        if msg["payload"] == "flaky" and "flaky" not in failed_once:
+            failed_once.add("flaky")
+            raise RuntimeError("transient")
+        delivered.append((msg["payload"], time.perf_counter()))
+
+    router.register("agent", handler, retry_backoff=1.0)
+    start = time.perf_counter()
+    router.post("agent", {"payload": "flaky"})
+    for i in range(5):
+        router.post("agent", {"payload": i})
+    assert router.flush(timeout=5)
+    times = dict(delivered)
+    # the other messages go out while "flaky" waits out its one-second backoff
+    assert all(times[i] - start < 0.5 for i in range(5))
+    assert times["flaky"] - start >= 1.0
+    assert router.metrics()["agent"]["retried"] == 1
+    router.close()
+
+
+def test_flush_waits_for_redelivery():
+    router = A2ARouter()
+    delivered, attempts = [], {}
+
+    def handler(msg):
+        attempts[msg["payload"]] = attempts.get(msg["payload"], 0) + 1
+        if attempts[msg["payload"]] == 1:
+            raise RuntimeError("transient")
+        delivered.append(msg["payload"])
+
+    router.register("agent", handler, retry_backoff=0.005)
+    for i in range(50):
+        router.post("agent", {"payload": i})
+        assert router.flush(timeout=5)
+        # flush may only return once the failed first attempt has been redelivered
+        assert delivered[-1] == i
+    assert router.dead_letters == []
+    router.close()
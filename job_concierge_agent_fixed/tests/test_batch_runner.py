@@ -0,0 +1,96 @@
+import io
+import json
+import threading
+import time
+
+import requests
+
+import app.batch_runner as batch_runner
+from agents.embedding_cache import EmbeddingCache
+from agents.jd_matcher_agent import JDMatcher
+from agents.model_registry import register_model, unload_model
+from app.batch_runner import BatchRunner, serve
+from evaluation.perf_benchmarks import HashingEncoder
+from memory.long_term_memory import MemoryBank
+
+
+class _FakeRunner(BatchRunner):
+    """Skips the real pipeline: writes one line, then sleeps or fails."""
+
+    def __init__(self, fail=False):
+        super().__init__(bank=None, matcher=object(), processes=1)
+        self.fail = fail
+
+    def _run(self, out, threshold, top_k, user_ids):
+        out.write(json.dumps({"user_id": "u1", "results": []}) + "\n")
+        out.flush()
+        time.sleep(0.5)
+        if self.fail:
+            raise RuntimeError("scoring pool crashed")
+        return {"profiles": 1}
+
+
+def _serve(runner):
+    server = serve(runner, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def test_concurrent_runs_get_one_200_and_one_409():
+    server, url = _serve(_FakeRunner())
+    codes = []
+    threads = [threading.Thread(target=lambda: codes.append(requests.post(url + "/run", json={}).status_code))
+               for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(codes) == [200, 409]
+    assert requests.get(url + "/health").json() == {"ok": True, "busy": False}
+    server.shutdown()
+    server.server_close()
+
+
+def test_failed_run_ends_the_stream_with_an_error_line():
+    server, url = _serve(_FakeRunner(fail=True))
+    lines = requests.post(url + "/run", json={"top_k": 5}).text.splitlines()
+    assert json.loads(lines[0])["user_id"] == "u1"
+    assert json.loads(lines[-1]) == {"error": "scoring pool crashed"}
+    assert requests.post(url + "/run", data="[1]").status_code == 400
+    server.shutdown()
+    server.server_close()
+
+
+def test_real_run_writes_one_line_per_profile_and_reuses_resume_vectors(tmp_path, monkeypatch):
+    register_model("batch-hashing", HashingEncoder(dim=64))
+    scraped = []
+
+    def fake_fetch(query, top_k=10, store=None):
+        scraped.append(query)
+        return [{"id": f"{query}-{i}", "title": f"{query} {i}", "company": "Acme", "url": f"https://x/{i}",
+                 "description": f"{query} role number {i} with python and sql", "source": "indeed"}
+                for i in range(8)]
+
+    monkeypatch.setattr(batch_runner, "fetch_real_jobs", fake_fetch)
+    bank = MemoryBank()
+    for uid, role in (("u1", "Data Engineer"), ("u2", "data  engineer"), ("u3", "Backend Developer")):
+        bank.save_profile(uid, {"preferences": {"role": role}})
+        bank.save_resume(uid, f"{role} with python, sql and five years of experience")
+    bank.save_profile("no-resume", {"preferences": {"role": "Data Engineer"}})
+    runner = BatchRunner(bank, matcher=JDMatcher("batch-hashing", cache=EmbeddingCache(str(tmp_path))),
+                         processes=1)
+    try:
+        out = io.StringIO()
+        report = runner.run(out, top_k=3)
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert sorted(line["user_id"] for line in lines) == ["u1", "u2", "u3"]
+        assert all(len(line["results"]) == 3 for line in lines)
+        assert sorted(scraped) == ["backend developer", "data engineer"]  # one scrape per normalized query
+        assert (report["profiles"], report["skipped"], report["queries"]) == (3, 1, 2)
+        assert report["resumes_encoded"] == 3
+
+        again = runner.run(io.StringIO(), top_k=3)
+        assert again["resumes_encoded"] == 0
+        assert again["profiles"] == 3 and again["skipped"] == 1
+    finally:
+        unload_model("batch-hashing")
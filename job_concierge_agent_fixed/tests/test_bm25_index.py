@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from agents.bm25_index import BM25Index, fuse_scores
+
+
+def _job(job_id, title, description):
+    return {"id": job_id, "title": title, "description": description}
+
+
+JOBS = [
+    _job("a", "Python Developer", "Build APIs in python and django."),
+    _job("b", "Data Scientist", "Statistics, python and machine learning models."),
+    _job("c", "Frontend Engineer", "React and typescript user interfaces."),
+    _job("d", "DevOps Engineer", "Kubernetes, docker and terraform pipelines."),
+]
+
+
+def _index(**kwargs):
+    index = BM25Index(min_merge=0, merge_ratio=1e9, **kwargs)
+    index.upsert(JOBS[:2])
+    index.merge()
+    index.upsert(JOBS[2:])     # stays in the delta segment
+    return index
+
+
+def test_base_and_delta_segments_are_searched_together():
+    index = _index()
+    assert len(index._docs) and index._delta
+    assert index.search("python")[0] == ["a", "b"]    # title terms count double
+    assert index.search("kubernetes docker")[0] == ["d"]
+    assert index.search("cobol")[0] == []
+    before = {q: index.search(q) for q in ("python", "engineer", "react")}
+    index.merge()
+    assert not index._delta
+    for q, (ids, scores) in before.items():
+        got_ids, got_scores = index.search(q)
+        assert got_ids == ids
+        np.testing.assert_allclose(got_scores, scores, rtol=1e-6)
+
+
+def test_deletes_and_updates_are_tombstoned_until_merge():
+    index = _index()
+    assert index.delete(["a", "missing"]) == 1
+    index.upsert([_job("c", "Frontend Engineer", "Vue and python tooling.")])
+    assert "a" not in index and len(index) == 3
+    assert sorted(index.search("python")[0]) == ["b", "c"]
+    assert index.search("react")[0] == []
+    postings = len(index._docs) + index._delta_postings
+    index.merge()
+    assert len(index._docs) < postings
+    assert len(index._doc_ids) == 3
+    assert sorted(index.search("python")[0]) == ["b", "c"]
+
+
+def test_save_load_round_trip(tmp_path):
+    index = _index(k1=1.5, b=0.5, title_weight=3.0)
+    index.delete(["d"])
+    path = str(tmp_path / "bm25.npz")
+    index.save(path)
+    loaded = BM25Index.load(path)
+    assert (loaded.k1, loaded.b, loaded.title_weight) == (1.5, 0.5, 3.0)
+    assert len(loaded) == 3 and "d" not in loaded
+    for q in ("python", "engineer", "react typescript"):
+        ids, scores = index.search(q)
+        got_ids, got_scores = loaded.search(q)
+        assert got_ids == ids
+        np.testing.assert_allclose(got_scores, scores, rtol=1e-6)
+    loaded.upsert([_job("e", "Python Engineer", "Python services.")])
+    assert loaded.search("python")[0][0] == "e"
+
+
+def test_fuse_scores_weighting():
+    lexical = np.array([4.0, 2.0, 0.0])
+    semantic = np.array([0.1, 0.5, 0.9])
+    np.testing.assert_allclose(fuse_scores(lexical, semantic, alpha=1.0), semantic)
+    np.testing.assert_allclose(fuse_scores(lexical, semantic, alpha=0.0), [1.0, 0.5, 0.0])
+    np.testing.assert_allclose(fuse_scores(lexical, semantic, alpha=0.5), [0.55, 0.5, 0.45])
+    # no lexical signal at all leaves the semantic part alone
+    np.testing.assert_allclose(fuse_scores(np.zeros(3), semantic, alpha=0.7), 0.7 * semantic)
+    assert fuse_scores(np.zeros(0), np.zeros(0)).shape == (0,)
@@ -0,0 +1,75 @@
+import glob
+import os
+
+import numpy as np
+
+from agents.embedding_cache import EmbeddingCache
+
+
+class _Model:
+    def __init__(self, dim=8):
+        self.dim = dim
+        self.calls = 0
+
+    def encode(self, texts, **kwargs):
+        self.calls += 1
+        return np.stack([np.random.default_rng(abs(hash(t)) % 2**32).standard_normal(self.dim) for t in texts])
+
+
+def _segments(directory):
+    return sorted(glob.glob(os.path.join(directory, "*", "seg-*.npy")))
+
+
+def test_saves_append_segments_without_rewriting(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), dtype="float32")
+    model = _Model()
+    first = cache.encode(model, "m", ["a", "b"])
+    cache.save()
+    [seg] = _segments(str(tmp_path))
+    before = os.stat(seg).st_mtime_ns
+    cache.encode(model, "m", ["c"])
+    cache.save()
+    assert len(_segments(str(tmp_path))) == 2
+    assert os.stat(seg).st_mtime_ns == before
+
+    reloaded = EmbeddingCache(str(tmp_path), dtype="float32")
+    loader_calls = []
+    vecs = reloaded.encode(lambda: loader_calls.append(1) or model, "m", ["a", "b", "c"])
+    assert loader_calls == []   # all hits: the model is never loaded
+    np.testing.assert_allclose(vecs[:2], first)
+
+
+def test_processes_sharing_a_directory_keep_each_others_vectors(tmp_path):
+    one = EmbeddingCache(str(tmp_path))
+    two = EmbeddingCache(str(tmp_path))
+    one.encode(_Model(), "m", ["from one"])
+    two.encode(_Model(), "m", ["from two"])
+    one.save()
+    two.save()
+    model = _Model()
+    EmbeddingCache(str(tmp_path)).encode(model, "m", ["from one", "from two"])
+    assert model.calls == 0
+
+
+def test_saves_on_dirty_threshold(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), save_every=3)
+    model = _Model()
+    cache.encode(model, "m", ["a", "b"])
+    assert _segments(str(tmp_path)) == []
+    cache.encode(model, "m", ["c"])
+    assert len(_segments(str(tmp_path))) == 1
+    assert cache.stats()["unsaved"] == 0
+
+
+def test_compaction_merges_segments(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), max_segments=3, dtype="float32")
+    model = _Model()
+    expected = {}
+    for i in range(5):
+        expected[str(i)] = cache.encode(model, "m", [str(i)])[0]
+        cache.save()
+    assert len(_segments(str(tmp_path))) <= 3
+    reloaded = EmbeddingCache(str(tmp_path), dtype="float32")
+    got = reloaded.encode(model, "m", list(expected))
+    np.testing.assert_allclose(got, np.stack(list(expected.values())))
+    assert model.calls == 5
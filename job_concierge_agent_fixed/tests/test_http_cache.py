@@ -0,0 +1,100 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import agents.http_cache as http_cache
+import agents.job_scraper_agent as scraper
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "evaluation", "fixtures")
+
+
+@pytest.fixture
+def site(monkeypatch):
+    """Stub indeed search page that honours If-None-Match and counts requests."""
+    with open(os.path.join(FIXTURES, "indeed.html"), "rb") as f:
+        body = f.read()
+    seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            conditional = self.headers.get("If-None-Match") == '"v1"'
+            seen.append("304" if conditional else "200")
+            self.send_response(304 if conditional else 200)
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Length", "0" if conditional else str(len(body)))
+            self.end_headers()
+            if not conditional:
+                self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    monkeypatch.setattr(scraper, "search_url", lambda site, query, location="India": f"{base}/{site}?q={query}")
+    yield seen
+    server.shutdown()
+    server.server_close()
+
+
+def _use(monkeypatch, cache):
+    monkeypatch.setattr(http_cache, "_cache", cache)
+    return cache
+
+
+def test_fresh_entry_is_served_without_network(site, tmp_path, monkeypatch):
+    cache = _use(monkeypatch, http_cache.HTTPCache(directory=str(tmp_path), ttl=60))
+    assert len(scraper.scrape_site("indeed", "python", limit=5)) == 5
+    assert len(scraper.scrape_site("indeed", "python", limit=5)) == 5
+    assert site == ["200"]
+    assert cache.stats["hits"] == 1
+
+
+def test_stale_entry_is_revalidated(site, tmp_path, monkeypatch):
+    cache = _use(monkeypatch, http_cache.HTTPCache(directory=str(tmp_path), ttl=0))
+    scraper.scrape_site("indeed", "python", limit=5)
+    jobs = scraper.scrape_site("indeed", "python", limit=5)
+    assert site == ["200", "304"]
+    assert cache.stats["revalidated"] == 1
+    assert len(jobs) == 5
+
+
+def test_expired_entry_without_validators_is_refetched(site, tmp_path, monkeypatch):
+    cache = _use(monkeypatch, http_cache.HTTPCache(directory=str(tmp_path), ttl=0))
+    with open(os.path.join(FIXTURES, "indeed.html"), "rb") as f:
+        cache.put(scraper.search_url("indeed", "python"), f.read(), pinned=False)
+    assert len(scraper.scrape_site("indeed", "python", limit=5)) == 5
+    assert site == ["200"]
+    assert cache.stats["misses"] == 1
+
+
+def test_replay_miss_raises(site, tmp_path, monkeypatch):
+    _use(monkeypatch, http_cache.HTTPCache(directory=str(tmp_path), mode="replay"))
+    with pytest.raises(http_cache.CacheMiss):
+        scraper.scrape_site("indeed", "never recorded")
+    assert site == []
+
+
+def test_record_then_replay_offline(site, tmp_path, monkeypatch):
+    _use(monkeypatch, http_cache.HTTPCache(directory=str(tmp_path), mode="record"))
+    recorded = scraper.scrape_site("indeed", "python", limit=5)
+    _use(monkeypatch, http_cache.HTTPCache(directory=str(tmp_path), mode="replay"))
+    assert scraper.scrape_site("indeed", "python", limit=5) == recorded
+    assert site == ["200"]
+
+
+def test_eviction_skips_pinned_entries(site, tmp_path, monkeypatch):
+    cache = _use(monkeypatch, http_cache.HTTPCache(directory=str(tmp_path), max_bytes=1000))
+    cache.put("http://fixture/pinned", b"x" * 600)
+    cache.put("http://fixture/old", b"y" * 300, pinned=False)
+    # the scraped page pushes the cache over budget
+    assert len(scraper.scrape_site("indeed", "python", limit=5)) == 5
+    index = cache._load_index()
+    assert cache._key("http://fixture/pinned") in index
+    assert cache._key("http://fixture/old") not in index
+    assert cache.stats["evictions"] >= 1
+    assert not [n for n in os.listdir(tmp_path) if n.endswith(".tmp")]
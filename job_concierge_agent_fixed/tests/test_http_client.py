@@ -0,0 +1,154 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+import tools.openapi_tool as openapi_tool
+from tools.http_client import CircuitBreaker, CircuitOpenError, HttpClient
+from tools.rate_limit import TokenBucket
+
+
+@pytest.fixture
+def stub():
+    """Local server: /ok -> 200, /fail -> 503, /busy -> 429, /flaky?n=2 -> 503 for the
+    first n hits then 200, /echo?i=..&delay=.. -> 200 with the body ``i``."""
+    hits = {}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def _handle(self):
+            parts = urlsplit(self.path)
+            query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            with lock:
+                hits[parts.path] = count = hits.get(parts.path, 0) + 1
+            body = b""
+            if parts.path == "/ok":
+                status = 200
+            elif parts.path == "/fail":
+                status = 503
+            elif parts.path == "/busy":
+                status = 429
+            elif parts.path == "/flaky":
+                status = 503 if count <= int(query.get("n", 1)) else 200
+            elif parts.path == "/echo":
+                time.sleep(float(query.get("delay", 0)))
+                status, body = 200, query["i"].encode()
+            else:
+                status = 404
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        do_GET = do_POST = _handle
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    server.hits = hits
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _client(**kwargs):
+    kwargs.setdefault("backoff", 0.0)
+    return HttpClient(**kwargs)
+
+
+def test_get_is_retried_until_it_succeeds(stub):
+    client = _client(max_retries=3)
+    assert client.get(stub.url + "/flaky?n=2").status_code == 200
+    assert stub.hits["/flaky"] == 3
+    assert client.stats()["127.0.0.1:%d" % stub.server_address[1]]["retries"] == 2
+
+
+def test_post_is_not_retried_on_server_errors(stub):
+    client = _client(max_retries=3)
+    assert client.post(stub.url + "/fail").status_code == 503
+    assert stub.hits["/fail"] == 1
+
+
+def test_post_is_retried_on_429_and_when_opted_in(stub):
+    client = _client(max_retries=2, failure_threshold=100)
+    assert client.post(stub.url + "/busy").status_code == 429
+    assert stub.hits["/busy"] == 3
+    client.post(stub.url + "/fail", headers={"Idempotency-Key": "abc"})
+    assert stub.hits["/fail"] == 3
+    client.request("POST", stub.url + "/fail", retry_methods=["POST"])
+    assert stub.hits["/fail"] == 6
+
+
+def test_post_is_retried_when_the_connection_is_refused():
+    client = _client(max_retries=2, failure_threshold=100)
+    probe = ThreadingHTTPServer(("127.0.0.1", 0), BaseHTTPRequestHandler)
+    port = probe.server_address[1]
+    probe.server_close()   # nothing listens there any more
+    with pytest.raises(Exception):
+        client.post(f"http://127.0.0.1:{port}/")
+    assert client.stats()[f"127.0.0.1:{port}"]["requests"] == 3
+
+
+def test_breaker_trip_returns_the_real_response(stub):
+    client = _client(max_retries=3, failure_threshold=2, reset_timeout=0.2)
+    # the second failure opens the breaker: stop retrying, but hand back the 503
+    assert client.get(stub.url + "/fail").status_code == 503
+    assert stub.hits["/fail"] == 2
+    with pytest.raises(CircuitOpenError):
+        client.get(stub.url + "/ok")
+    assert "/ok" not in stub.hits
+    time.sleep(0.25)
+    assert client.get(stub.url + "/ok").status_code == 200   # the trial closes it again
+    assert client.stats()["127.0.0.1:%d" % stub.server_address[1]]["circuit"] == CircuitBreaker.CLOSED
+
+
+def test_call_openapi_reports_status_until_the_circuit_opens(stub, monkeypatch):
+    client = _client(max_retries=3, failure_threshold=5)
+    monkeypatch.setattr(openapi_tool, "get_http_client", lambda: client)
+    assert openapi_tool.call_openapi(stub.url + "/fail")["status_code"] == 503
+    assert openapi_tool.call_openapi(stub.url + "/fail")["status_code"] == 503
+    assert "Circuit open" in openapi_tool.call_openapi(stub.url + "/fail")["error"]
+
+
+def test_trial_slot_is_released_when_the_request_raises_locally(stub):
+    client = _client(max_retries=0, failure_threshold=1, reset_timeout=0.1)
+    client.get(stub.url + "/fail")
+    time.sleep(0.15)
+    with pytest.raises(TypeError):
+        client.get(stub.url + "/ok", not_a_requests_kwarg=True)
+    # the breaker is not stuck half-open: the next call gets to be the trial
+    assert client.get(stub.url + "/ok").status_code == 200
+
+
+def test_rate_limit_spaces_requests(stub):
+    client = _client(rate=20, burst=1)
+    start = time.perf_counter()
+    for _ in range(6):
+        client.get(stub.url + "/ok")
+    assert time.perf_counter() - start >= 0.24
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=10, burst=2)
+    assert bucket.try_acquire() and bucket.try_acquire()
+    assert not bucket.try_acquire()
+    assert not bucket.acquire(timeout=0.01)
+    assert bucket.acquire(timeout=0.5)
+    with pytest.raises(ValueError):
+        bucket.acquire(tokens=3)
+
+
+def test_batch_keeps_order(stub):
+    client = _client(max_retries=0)
+    calls = [{"method": "GET", "url": f"{stub.url}/echo?i={i}&delay={0.05 * (i % 3)}"} for i in range(12)]
+    calls.insert(5, {"method": "GET", "url": "http://127.0.0.1:1/"})
+    results = client.batch(calls, concurrency=4)
+    assert isinstance(results[5], Exception)
+    assert [r.text for i, r in enumerate(results) if i != 5] == [str(i) for i in range(12)]
@@ -0,0 +1,41 @@
+import zlib
+
+import numpy as np
+
+from agents.embedding_cache import EmbeddingCache
+from agents.jd_matcher_agent import JDMatcher
+from agents.model_registry import register_model, unload_model
+
+
+class _BagOfWords:
+    """Deterministic stand-in encoder: hashed word counts."""
+
+    def encode(self, texts, **kwargs):
+        out = np.zeros((len(texts), 64), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in text.split():
+                out[i, zlib.crc32(word.encode()) % 64] += 1
+        return out
+
+
+def _matcher(tmp_path, **kwargs):
+    register_model("bag-of-words", _BagOfWords())
+    return JDMatcher("bag-of-words", cache=EmbeddingCache(str(tmp_path)), **kwargs)
+
+
+def test_long_resumes_are_chunked_short_ones_unchanged(tmp_path):
+    matcher = _matcher(tmp_path, max_words=20, overlap=5)
+    assert matcher.resume_pooling == "mean" and matcher.resume_model == "bag-of-words#mean"
+    short = "python developer with docker"
+    np.testing.assert_allclose(matcher.embed_resumes([short]), matcher.embed([short]), atol=1e-6)
+    long_resume = " ".join(f"word{i}" for i in range(100))
+    assert not np.allclose(matcher.embed_resumes([long_resume]), matcher.embed([long_resume]))
+    unload_model("bag-of-words")
+
+
+def test_resume_pooling_can_be_turned_off(tmp_path):
+    matcher = _matcher(tmp_path, resume_pooling="none")
+    assert matcher.chunker is None and matcher.resume_model == "bag-of-words"
+    jobs = [{"id": "j1", "title": "t", "company": "c", "url": "u", "description": "python developer"}]
+    assert matcher.score("python developer", jobs)[0]["job_id"] == "j1"
+    unload_model("bag-of-words")
@@ -0,0 +1,94 @@
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import agents.http_cache as http_cache
+import agents.job_scraper_agent as scraper
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "evaluation", "fixtures")
+
+
+@pytest.fixture
+def sites(tmp_path, monkeypatch):
+    """Stub search pages: indeed serves its fixture, naukri answers 503 and
+    linkedin takes two seconds."""
+    with open(os.path.join(FIXTURES, "indeed.html"), "rb") as f:
+        indeed = f.read()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            site = self.path.strip("/").split("?")[0]
+            if site == "linkedin":
+                time.sleep(2)
+            status, body = (200, indeed) if site == "indeed" else (503, b"") if site == "naukri" else (200, b"<html></html>")
+            try:
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            except OSError:
+                pass
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    monkeypatch.setattr(scraper, "search_url", lambda site, query, location="India": f"{base}/{site}?q={query}")
+    monkeypatch.setattr(http_cache, "_cache", http_cache.HTTPCache(directory=str(tmp_path), mode="off"))
+    yield base
+    server.shutdown()
+    server.server_close()
+
+
+def test_scrape_site_raises_on_error_status(sites):
+    with pytest.raises(requests.HTTPError):
+        scraper.scrape_site("naukri", "python developer")
+    assert len(scraper.scrape_site("indeed", "python developer", limit=5)) == 5
+
+
+def test_fan_out_reports_ok_error_and_timeout(sites):
+    start = time.perf_counter()
+    result = scraper.fetch_from_sources_parallel("python developer", limit=5, source_timeout=0.5,
+                                                 overall_timeout=5.0)
+    elapsed = time.perf_counter() - start
+    statuses = {name: r["status"] for name, r in result["sources"].items()}
+    assert statuses == {"indeed": "ok", "naukri": "error", "linkedin": "timeout"}
+    assert len(result["jobs"]) == 5
+    # the slow source is cut off at its own deadline, not the overall one
+    assert elapsed < 1.5
+
+
+def test_overall_deadline_still_applies(sites):
+    result = scraper.fetch_from_sources_parallel("python developer", sources=["linkedin"],
+                                                 source_timeout=5.0, overall_timeout=0.3)
+    assert result["sources"]["linkedin"]["status"] == "timeout"
+    assert result["seconds"] < 1.0
+
+
+def test_scrape_site_through_warm_cache(sites, tmp_path, monkeypatch):
+    cache = http_cache.HTTPCache(directory=str(tmp_path / "warm"), mode="normal")
+    monkeypatch.setattr(http_cache, "_cache", cache)
+    first = scraper.scrape_site("indeed", "python developer", limit=5)
+    second = scraper.scrape_site("indeed", "python developer", limit=5)
+    assert cache.stats["hits"] == 1
+    assert len(second) == 5
+    assert [j["id"] for j in second] == [j["id"] for j in first]
+
+
+def test_scrape_site_in_replay_mode(tmp_path, monkeypatch):
+    cache = http_cache.HTTPCache(directory=str(tmp_path), mode="replay")
+    monkeypatch.setattr(http_cache, "_cache", cache)
+    url = scraper.search_url("indeed", "python developer")
+    with open(os.path.join(FIXTURES, "indeed.html"), "rb") as f:
+        cache.put(url, f.read())
+    cache.put(scraper.search_url("naukri", "python developer"), b"", status=503)
+    assert len(scraper.scrape_site("indeed", "python developer", limit=5)) == 5
+    with pytest.raises(requests.HTTPError):
+        scraper.scrape_site("naukri", "python developer")
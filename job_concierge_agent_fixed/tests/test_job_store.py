@@ -0,0 +1,98 @@
+import os
+import time
+
+import pytest
+
+import agents.http_cache as http_cache
+import agents.job_scraper_agent as scraper
+import agents.recommendation_agent as recommendation_agent
+from agents.embedding_cache import EmbeddingCache
+from agents.jd_matcher_agent import JDMatcher
+from agents.model_registry import register_model, unload_model
+from evaluation.perf_benchmarks import HashingEncoder
+from memory.job_store import JobStore
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "evaluation", "fixtures")
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = JobStore(str(tmp_path / "jobs.db"))
+    yield s
+    s.close()
+
+
+def _job(i, description="python developer"):
+    return {"id": f"indeed_{i}", "title": f"Engineer {i}", "company": "Acme", "url": f"https://x/{i}",
+            "description": description, "source": "indeed"}
+
+
+def test_rescrape_keeps_ids_stable(store, tmp_path, monkeypatch):
+    cache = http_cache.HTTPCache(directory=str(tmp_path / "http"), mode="replay")
+    monkeypatch.setattr(http_cache, "_cache", cache)
+    with open(os.path.join(FIXTURES, "indeed.html"), "rb") as f:
+        cache.put(scraper.search_url("indeed", "python developer"), f.read())
+    first = store.sync(scraper.scrape_site("indeed", "python developer", limit=10))
+    second = store.sync(scraper.scrape_site("indeed", "python developer", limit=10))
+    assert len(first["new"]) == 10
+    assert (len(second["new"]), len(second["changed"]), len(second["unchanged"])) == (0, 0, 10)
+    assert store.count() == 10
+
+
+def test_changed_content_is_detected_and_reembedded(store):
+    store.sync([_job(1), _job(2)], now=100.0)
+    store.mark_embedded(["indeed_1", "indeed_2"], "model-a")
+    delta = store.sync([_job(1, "python developer, remote"), _job(2)], now=200.0)
+    assert [j["id"] for j in delta["changed"]] == ["indeed_1"]
+    assert [j["id"] for j in delta["unchanged"]] == ["indeed_2"]
+    info = store.info("indeed_1")
+    assert info["embedding_version"] is None
+    assert (info["first_seen"], info["last_seen"]) == (100.0, 200.0)
+    assert store.get(["indeed_1"])[0]["description"] == "python developer, remote"
+
+
+def test_pending_embedding_is_per_model_version(store):
+    store.sync([_job(i) for i in range(3)])
+    assert len(store.pending_embedding("model-a")) == 3
+    store.mark_embedded(["indeed_0", "indeed_1"], "model-a")
+    assert [j["id"] for j in store.pending_embedding("model-a")] == ["indeed_2"]
+    # a new model version needs everything again
+    assert len(store.pending_embedding("model-b")) == 3
+    assert len(store.pending_embedding("model-b", limit=2)) == 2
+
+
+def test_expire_drops_postings_not_seen_recently(store):
+    store.sync([_job(1), _job(2)], now=100.0)
+    store.sync([_job(2)], now=1000.0)
+    assert store.expire(max_age=500, now=1000.0) == ["indeed_1"]
+    assert [j["id"] for j in store.all_jobs()] == ["indeed_2"]
+    assert store.expire(max_age=500, now=1000.0) == []
+
+
+def test_watched_query_refreshes_the_store(store, tmp_path, monkeypatch):
+    scrapes = []
+
+    def fake_fetch(query, top_k=10, store=None):
+        scrapes.append(query)
+        jobs = [_job(i) for i in range(3)]
+        store.sync(jobs)
+        return jobs
+
+    monkeypatch.setattr(recommendation_agent, "fetch_real_jobs", fake_fetch)
+    register_model("hashing-test", HashingEncoder(dim=32))
+    agent = recommendation_agent.RecommendationAgent(job_store=store)
+    agent.matcher = JDMatcher("hashing-test", cache=EmbeddingCache(str(tmp_path / "emb")))
+    try:
+        assert agent.watch_query("Python Developer", seconds=0.1)
+        assert not agent.watch_query("python  developer")
+        deadline = time.time() + 3
+        while len(scrapes) < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        assert len(scrapes) >= 2
+        # the first refresh embedded everything; later ones find nothing pending
+        assert store.pending_embedding("hashing-test") == []
+        assert agent.unwatch_query("python developer")
+    finally:
+        agent.scheduler.shutdown()
+        agent.router.close()
+        unload_model("hashing-test")
@@ -0,0 +1,75 @@
+import time
+
+import numpy as np
+import pytest
+
+from memory.long_term_memory import InMemoryBackend, MemoryBank, SQLiteBackend
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    return InMemoryBackend() if request.param == "memory" else SQLiteBackend(str(tmp_path / "memory.db"))
+
+
+def _profile(role, location="India"):
+    return {"name": role, "preferences": {"role": role, "location": location}}
+
+
+def test_expired_profiles_are_hidden_then_purged(backend):
+    bank = MemoryBank(backend=backend, ttl=0.2)
+    bank.save_profile("old", _profile("Data Engineer"))
+    time.sleep(0.3)
+    bank.save_profile("new", _profile("Data Engineer"))
+    assert bank.list_profiles() == ["new"]
+    assert bank.find_profiles(role="data engineer") == ["new"]
+    assert bank.get_profile("old") is None
+    assert bank.get_profile("new")["profile"]["name"] == "Data Engineer"
+    assert bank.purge_expired() == 1
+    assert backend.keys() == ["new"]
+
+
+def test_without_ttl_nothing_expires(backend):
+    bank = MemoryBank(backend=backend)
+    bank.save_profiles({f"u{i}": _profile("QA Engineer") for i in range(3)})
+    assert sorted(bank.list_profiles()) == ["u0", "u1", "u2"]
+    assert bank.purge_expired() == 0
+
+
+def test_lru_front_cache(backend):
+    bank = MemoryBank(backend=backend, cache_size=2)
+    for uid in ("a", "b", "c"):
+        bank.save_profile(uid, _profile(uid))
+    assert list(bank._cache) == ["b", "c"]
+    # a miss is read from the backend and becomes most recent, evicting the LRU entry
+    assert bank.get_profile("a")["profile"]["name"] == "a"
+    assert list(bank._cache) == ["c", "a"]
+    bank.get_profile("c")
+    assert list(bank._cache) == ["a", "c"]
+    bank.delete_profiles(["c"])
+    assert bank.get_profile("c") is None and "c" not in bank._cache
+
+
+def test_find_profiles_by_role_and_location(backend):
+    bank = MemoryBank(backend=backend)
+    bank.save_profiles({"u1": _profile("ML Engineer", "Pune"), "u2": _profile("ml engineer ", "Remote"),
+                        "u3": _profile("Data Analyst", "Pune"), "u4": {"name": "no preferences"}})
+    assert sorted(bank.find_profiles(role="ML Engineer")) == ["u1", "u2"]
+    assert bank.find_profiles(role="ml engineer", location="PUNE") == ["u1"]
+    assert sorted(bank.find_profiles(location="pune")) == ["u1", "u3"]
+    assert bank.find_profiles(role="designer") == []
+
+
+def test_resume_embedding_round_trip(backend):
+    bank = MemoryBank(backend=backend)
+    vec = np.linspace(-1, 1, 16, dtype=np.float32)
+    bank.save_resume("u1", "python and sql", skills=["python", "sql"], embedding=vec, model="m1")
+    rec = bank.get_resume("u1")
+    assert rec["skills"] == ["python", "sql"] and rec["model"] == "m1"
+    np.testing.assert_array_equal(np.asarray(rec["embedding"], dtype=np.float32), vec)
+    assert bank.get_resume("u1", resume_text="python and sql", model="m1") is not None
+    # stale for a different resume text or model
+    assert bank.get_resume("u1", resume_text="java") is None
+    assert bank.get_resume("u1", model="m2") is None
+    bank.save_resume("u2", "no vector yet")
+    assert bank.get_resume("u2")["embedding"] is None
+    assert bank.get_resume("missing") is None
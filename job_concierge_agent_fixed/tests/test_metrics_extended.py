@@ -0,0 +1,55 @@
+import math
+import random
+
+import pytest
+
+from evaluation.metrics_extended import (average_precision, bulk_evaluate, mean_average_precision, ndcg_at_k,
+                                         recall_at_k)
+
+
+# the original per-query implementations, kept as the reference
+def _recall(preds, gt, k):
+    hits = sum(1 for p in preds[:k] if p["job_id"] in gt)
+    return hits / len(gt) if gt else 0.0
+
+
+def _ap(preds, gt):
+    hits, total = 0, 0.0
+    for i, p in enumerate(preds, start=1):
+        if p["job_id"] in gt:
+            hits += 1
+            total += hits / i
+    return total / len(gt) if gt else 0.0
+
+
+def _ndcg(preds, gt, k):
+    rel = [1 if p["job_id"] in gt else 0 for p in preds[:k]]
+    dcg = lambda r: sum((2 ** x - 1) / math.log2(i + 1) for i, x in enumerate(r, start=1))
+    ideal = dcg(sorted(rel, reverse=True))
+    return dcg(rel) / ideal if ideal > 0 else 0.0
+
+
+def _cases(n=200, seed=0):
+    rng = random.Random(seed)
+    for _ in range(n):
+        preds = [{"job_id": f"j{rng.randrange(30)}"} for _ in range(rng.randrange(0, 15))]
+        # ground truth may repeat ids or be empty
+        gt = [f"j{rng.randrange(30)}" for _ in range(rng.randrange(0, 8))]
+        yield preds, gt
+
+
+def test_wrappers_match_the_original_definitions():
+    cases = list(_cases())
+    for preds, gt in cases:
+        assert recall_at_k(preds, gt, k=5) == pytest.approx(_recall(preds, gt, 5))
+        assert average_precision(preds, gt) == pytest.approx(_ap(preds, gt))
+        assert ndcg_at_k(preds, gt, k=10) == pytest.approx(_ndcg(preds, gt, 10))
+    assert mean_average_precision([p for p, _ in cases], [g for _, g in cases]) == pytest.approx(
+        sum(_ap(p, g) for p, g in cases) / len(cases))
+
+
+def test_duplicate_ground_truth_keeps_the_raw_denominator():
+    preds = [{"job_id": "a"}, {"job_id": "b"}]
+    assert recall_at_k(preds, ["a", "a", "b"], k=2) == pytest.approx(2 / 3)
+    # bulk_evaluate counts distinct relevant ids
+    assert bulk_evaluate([["a", "b"]], [["a", "a", "b"]], ks=(2,))["metrics"]["recall@2"] == pytest.approx(1.0)
@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+from memory.sent_store import SentStore
+from tools.notification_pipeline import NotificationPipeline, WebhookSink, serve_stub_webhook
+
+
+@pytest.fixture
+def webhook():
+    # 30% of the posts get a 503; seeded so the run is repeatable
+    random.seed(7)
+    server, url = serve_stub_webhook(fail_rate=0.3)
+    yield server, url
+    server.shutdown()
+    server.server_close()
+
+
+def _pipeline(tmp_path, url, **kwargs):
+    options = dict(window=3600, max_items=6, rate=1000, workers=4, retry_backoff=0.001)
+    options.update(kwargs)
+    return NotificationPipeline({"webhook": WebhookSink(url)}, store=SentStore(str(tmp_path / "sent.db")), **options)
+
+
+def _recs(n, offset=0):
+    return [{"job_id": f"job-{i}", "title": f"Engineer {i}", "company": "Acme", "url": f"https://x/{i}",
+             "score": 1.0 - i / 100} for i in range(offset, offset + n)]
+
+
+def test_digests_are_deduplicated_split_and_retried(tmp_path, webhook):
+    server, url = webhook
+    pipeline = _pipeline(tmp_path, url, max_retries=10)
+    users = [f"user-{u}" for u in range(20)]
+    for user in users:
+        # ten postings, two of them listed twice
+        assert pipeline.submit(user, "webhook", _recs(10) + _recs(2)) == 10
+        # the same postings again: each is waiting, in flight or already sent
+        assert pipeline.submit(user, "webhook", _recs(10)) == 0
+    # max_items went out at once; the other four opened a follow-up window
+    stats = pipeline.stats()
+    assert stats["open_digests"] == 20 and stats["waiting_items"] == 80
+    assert stats["duplicates"] == 200
+    assert pipeline.flush() == 20
+    assert pipeline.wait(timeout=10)
+
+    stats = pipeline.stats()["channels"]["webhook"]
+    assert stats["sent"] == 40 and stats["failed"] == 0
+    assert stats["retried"] > 0
+    assert pipeline.dead_letters == []
+    for user in users:
+        digests = [d for d in server.received if d["user"] == user]
+        assert sorted(len(d["items"]) for d in digests) == [4, 6]
+        assert {i["job_id"] for d in digests for i in d["items"]} == {f"job-{i}" for i in range(10)}
+        first = next(d for d in digests if d["items"][0]["job_id"] == "job-0")
+        assert [i["job_id"] for i in first["items"]] == [f"job-{i}" for i in range(6)]
+
+    # everything was marked sent, so a resubmit (plus one new posting) only queues the new one
+    received = len(server.received)
+    assert pipeline.submit("user-0", "webhook", _recs(11)) == 1
+    assert pipeline.flush() == 1
+    assert pipeline.wait(timeout=10)
+    assert len(server.received) == received + 1
+    assert [i["job_id"] for i in server.received[-1]["items"]] == ["job-10"]
+    pipeline.close()
+
+
+def test_failed_digests_are_dead_lettered_and_not_marked_sent(tmp_path, webhook):
+    server, url = webhook
+    pipeline = _pipeline(tmp_path, url, max_retries=0)
+    for u in range(30):
+        pipeline.submit(f"user-{u}", "webhook", _recs(3))
+    assert pipeline.flush() == 30
+    assert pipeline.wait(timeout=10)
+
+    stats = pipeline.stats()
+    assert stats["dead_letters"] == stats["channels"]["webhook"]["failed"] > 0
+    assert stats["channels"]["webhook"]["sent"] == len(server.received) > 0
+    for digest in pipeline.dead_letters:
+        ids = [i["job_id"] for i in digest["items"]]
+        assert pipeline.store.unsent(digest["user"], "webhook", ids) == ids
+    for digest in server.received:
+        assert pipeline.store.unsent(digest["user"], "webhook", ["job-0", "job-1", "job-2"]) == []
+    # a dead-lettered digest's postings can be submitted again
+    dead = pipeline.dead_letters[0]["user"]
+    assert pipeline.submit(dead, "webhook", _recs(3)) == 3
+    pipeline.close(flush=False)
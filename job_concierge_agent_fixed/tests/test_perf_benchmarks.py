@@ -0,0 +1,31 @@
+import pytest
+
+import agents.http_cache as http_cache
+from agents import model_registry
+from evaluation import perf_benchmarks as bench
+
+
+@pytest.fixture
+def hashing_model():
+    model_registry.register_model(bench.HASHING_MODEL, bench.HashingEncoder(dim=64))
+    yield bench.HASHING_MODEL
+    model_registry.unload_model(bench.HASHING_MODEL)
+
+
+def test_end_to_end_smoke(tmp_path, monkeypatch, hashing_model):
+    monkeypatch.setattr(http_cache, "_cache", None)
+    queries = ["software engineer bangalore"]
+    bench.write_replay_fixtures(str(tmp_path / "http"), queries, bench.synthetic_jobs(100))
+    results = bench.bench_end_to_end(queries, bench.synthetic_resumes(2), hashing_model, str(tmp_path), repeats=2)
+    for stage in ("scrape", "recommend_once"):
+        assert results[stage]["calls"] == 2
+        assert all(results[stage]["counts"])
+        assert results[stage]["items"] == sum(results[stage]["counts"])
+
+
+def test_end_to_end_fails_when_replay_yields_nothing(tmp_path, monkeypatch, hashing_model):
+    monkeypatch.setattr(http_cache, "_cache", None)
+    queries = ["software engineer bangalore"]
+    bench.write_replay_fixtures(str(tmp_path / "http"), queries, [])
+    with pytest.raises(RuntimeError, match="no jobs"):
+        bench.bench_end_to_end(queries, bench.synthetic_resumes(2), hashing_model, str(tmp_path), repeats=1)
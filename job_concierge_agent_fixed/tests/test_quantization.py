@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+
+from agents.embedding_cache import l2_normalize
+from agents.quantization import QuantizedIndex
+
+
+@pytest.mark.parametrize("codec", ["float16", "int8"])
+def test_save_and_mmap_load_round_trip(tmp_path, codec):
+    rng = np.random.default_rng(0)
+    vecs = l2_normalize(rng.standard_normal((500, 32)).astype(np.float32))
+    index = QuantizedIndex(codec)
+    index.add(vecs)
+    path = str(tmp_path / "index.npz")
+    index.save(path)
+
+    loaded = QuantizedIndex.load(path, mmap=True)
+    assert isinstance(loaded.codes, np.memmap)
+    assert loaded.dim == 32
+    expected = index.search(vecs[:5], k=5)
+    got = loaded.search(vecs[:5], k=5)
+    np.testing.assert_array_equal(got[0], expected[0])
+    assert (got[0][:, 0] == np.arange(5)).all()
@@ -0,0 +1,47 @@
+import time
+
+from memory.result_cache import ResultCache
+
+
+class _Compute:
+    def __init__(self, fail=True):
+        self.calls = 0
+        self.fail = fail
+
+    def __call__(self, resume_text, query):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("scrape failed")
+        return [{"job_id": "j1", "score": 0.9}]
+
+
+def test_failed_refresh_backs_off_until_retried():
+    cache = ResultCache(error_backoff=60)
+    compute = _Compute()
+    assert cache.get_or_refresh("resume", "ml", compute) is None
+    cache.wait("resume", "ml", timeout=5)
+    for _ in range(5):   # reruns of the UI script
+        cache.get_or_refresh("resume", "ml", compute)
+        cache.wait("resume", "ml", timeout=5)
+    assert compute.calls == 1
+    status = cache.status("resume", "ml")
+    assert status["error"] == "scrape failed" and status["retry_in"] > 0
+
+    compute.fail = False
+    cache.get_or_refresh("resume", "ml", compute, retry_failed=True)
+    entry = cache.wait("resume", "ml", timeout=5)
+    assert compute.calls == 2 and entry.above(0.5)
+    assert cache.status("resume", "ml")["error"] is None
+    cache.shutdown()
+
+
+def test_automatic_refresh_resumes_after_the_backoff():
+    cache = ResultCache(error_backoff=0.2)
+    compute = _Compute()
+    cache.get_or_refresh("resume", "ml", compute)
+    cache.wait("resume", "ml", timeout=5)
+    time.sleep(0.3)
+    cache.get_or_refresh("resume", "ml", compute)
+    cache.wait("resume", "ml", timeout=5)
+    assert compute.calls == 2
+    cache.shutdown()
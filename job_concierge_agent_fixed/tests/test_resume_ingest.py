@@ -0,0 +1,56 @@
+import io
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+import tools.resume_ingest as resume_ingest
+from tools.cv_upload_tool import read_uploaded_file
+from tools.resume_ingest import IngestError, extract_text
+
+
+def _slow_or_fast(path, kind, max_pages, max_chars):
+    if "slow" in path:
+        time.sleep(10)
+    return "parsed " + path
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork",
+                    reason="the patched parser only reaches forked children")
+def test_timeout_kills_only_the_stuck_parse(tmp_path, monkeypatch):
+    monkeypatch.setattr(resume_ingest, "_extract_path", _slow_or_fast)
+    slow, fast = tmp_path / "slow.pdf", tmp_path / "fast.pdf"
+    slow.write_bytes(b"%PDF-1.4")
+    fast.write_bytes(b"%PDF-1.4")
+    outcome = {}
+
+    def run(path, timeout):
+        try:
+            outcome[path.name] = extract_text(str(path), timeout=timeout)
+        except IngestError as e:
+            outcome[path.name] = e
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=run, args=(slow, 0.5)),
+               threading.Thread(target=run, args=(fast, 5.0))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert isinstance(outcome["slow.pdf"], IngestError) and "timed out" in str(outcome["slow.pdf"])
+    assert outcome["fast.pdf"] == "parsed " + str(fast)
+    assert time.perf_counter() - start < 3
+
+
+def test_upload_errors_reach_the_caller():
+    upload = io.BytesIO(b"%PDF-1.4 not really a pdf")
+    upload.name = "resume.pdf"
+    with pytest.raises(IngestError, match="resume.pdf"):
+        read_uploaded_file(upload)
+
+
+def test_text_uploads_are_read_in_process():
+    upload = io.BytesIO("Python developer, 5 years".encode())
+    upload.name = "resume.txt"
+    assert read_uploaded_file(upload) == "Python developer, 5 years"
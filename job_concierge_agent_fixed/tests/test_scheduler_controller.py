@@ -0,0 +1,100 @@
+import threading
+import time
+
+import pytest
+
+import agents.scheduler_controller as scheduler_controller
+from agents.scheduler_controller import SchedulerController
+
+
+@pytest.fixture
+def controller():
+    made = []
+
+    def make(**kwargs):
+        made.append(SchedulerController(**kwargs))
+        return made[-1]
+
+    yield make
+    for c in made:
+        c.shutdown()
+
+
+def _wait_for(predicate, timeout=3.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_jitter_does_not_accumulate(controller, monkeypatch):
+    # always the largest jitter: if it were carried into the next slot the
+    # period would stretch to seconds + jitter
+    monkeypatch.setattr(scheduler_controller.random, "uniform", lambda a, b: b)
+    sched = controller(jitter=0.05)
+    calls = []
+    sched.add_job("tick", lambda: calls.append(time.time()), seconds=0.1)
+    start = sched._jobs["tick"].nominal
+    assert _wait_for(lambda: len(calls) >= 5)
+    job = sched._jobs["tick"]
+    slots = (job.nominal - start) / 0.1
+    assert abs(slots - round(slots)) < 1e-3
+    assert job.next_run - job.nominal == pytest.approx(0.05)
+    for k, t in enumerate(calls[:5]):
+        assert t - (start + k * 0.1) == pytest.approx(0.05, abs=0.04)
+
+
+def test_overlapping_ticks_are_skipped(controller):
+    sched = controller()
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def slow():
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.25)
+        with lock:
+            active[0] -= 1
+
+    sched.add_job("slow", slow, seconds=0.05)
+    assert _wait_for(lambda: sched.stats()["per_job"]["slow"]["runs"] >= 2)
+    stats = sched.stats()["per_job"]["slow"]
+    assert peak[0] == 1
+    assert stats["skipped"] > 0
+
+
+def test_group_members_share_one_run(controller):
+    sched = controller()
+    calls = []
+    sched.add_group("python developer", lambda members: calls.append(sorted(members)))
+    assert sched.add_job("alice", seconds=0.1, group="python developer")
+    assert sched.add_job("bob", seconds=0.1, group="python developer")
+    assert not sched.add_job("bob", seconds=0.1, group="python developer")
+    assert _wait_for(lambda: len(calls) >= 2)
+    assert calls[-1] == ["alice", "bob"]
+    assert sorted(sched.jobs()) == ["alice", "bob"]
+    assert sched.stats()["jobs"] == 1
+
+
+def test_concurrency_cap(controller):
+    sched = controller(max_workers=2)
+    active, peak, done = [0], [0], []
+    lock = threading.Lock()
+
+    def work(name):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.2)
+        with lock:
+            active[0] -= 1
+            done.append(name)
+
+    for i in range(5):
+        sched.add_job(f"job-{i}", lambda i=i: work(i), seconds=60)
+    assert _wait_for(lambda: sched.stats()["queue_depth"] > 0, timeout=1.0)
+    assert _wait_for(lambda: len(done) == 5)
+    assert peak[0] == 2
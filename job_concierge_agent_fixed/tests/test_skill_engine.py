@@ -0,0 +1,13 @@
+from agents.skill_engine import SkillExtractor
+from agents.skill_extractor import extract_skills
+
+
+def test_aliases_resolve_to_canonical_names_in_mention_order():
+    assert extract_skills("ML engineer with sklearn and k8s; ML again") == ["machine learning", "scikit-learn",
+                                                                             "kubernetes"]
+
+
+def test_matches_respect_token_boundaries():
+    extractor = SkillExtractor({"ml": [], "react": [], "c++": ["cpp"]})
+    assert extractor.extract("html, reactive programming") == []
+    assert extractor.extract("React and C++ (cpp)") == ["react", "c++"]
@@ -0,0 +1,41 @@
+import faiss
+import pytest
+
+from agents.model_registry import register_model, unload_model
+from agents.vector_search import VectorSearch
+from evaluation.perf_benchmarks import HashingEncoder, synthetic_jobs
+
+
+@pytest.fixture
+def model():
+    register_model("vs-hashing", HashingEncoder(dim=32))
+    yield "vs-hashing"
+    unload_model("vs-hashing")
+
+
+def _ef_search(vs):
+    return faiss.downcast_index(vs.index.index).hnsw.efSearch
+
+
+def test_non_positive_top_k_returns_nothing(model):
+    vs = VectorSearch(model, lexical=True)
+    vs.upsert(synthetic_jobs(20))
+    assert vs.search("data engineer", top_k=0) == []
+    assert vs.search("data engineer", top_k=-1, hybrid=True) == []
+    assert len(vs.search("data engineer", top_k=3)) == 3
+
+
+def test_hnsw_reload_keeps_ef_search(model, tmp_path):
+    jobs = synthetic_jobs(60)
+    vs = VectorSearch(model, backend="hnsw", ef_search=99)
+    vs.upsert(jobs[:50])
+    vs.save(str(tmp_path))
+
+    loaded = VectorSearch.load(str(tmp_path), mmap=True)
+    assert loaded._read_only and _ef_search(loaded) == 99
+    expected = [j["id"] for j in loaded.search(jobs[0]["description"], top_k=5)]
+    # writing to an mmap'd index reloads it into memory first
+    loaded.upsert(jobs[50:])
+    assert not loaded._read_only and _ef_search(loaded) == 99
+    assert len(loaded) == 60
+    assert [j["id"] for j in loaded.search(jobs[0]["description"], top_k=5)][:1] == expected[:1]
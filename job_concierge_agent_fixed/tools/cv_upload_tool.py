@@ -1,13 +1,17 @@
-"""Simple CV upload helper (for Streamlit demo). Handles plain text uploads.
+"""Simple CV upload helper (for Streamlit demo). Handles TXT, PDF and DOCX uploads
+through the streaming ingestion pipeline in `tools.resume_ingest`.
 """
-import io
+import logging
+from tools.resume_ingest import ingest_upload, IngestError
+
+logger = logging.getLogger(__name__)
 
 def read_uploaded_file(uploaded_file) -> str:
-    # Streamlit's uploaded_file has read() method. We try to decode as utf-8.
-    data = uploaded_file.read()
+    """Text of an upload. Raises IngestError (with a message fit for the user)
+    when the file is too large, unreadable, or takes too long to parse."""
+    # Streamlit's uploaded_file has read() and name; text is extracted page by page.
     try:
-        text = data.decode('utf-8')
-    except Exception:
-        # Binary / PDF - in demo we fallback to a naive replacement
-        text = str(data)
-    return text
+        return ingest_upload(uploaded_file)
+    except IngestError as e:
+        logger.warning("Resume upload rejected: %s", e)
+        raise
@@ -0,0 +1,295 @@
+"""Pooled, resilient HTTP client for outbound integrations (ATS, HR APIs).
+
+Every host gets its own keep-alive `requests.Session` (connection pool of
+`pool_size`), an optional token bucket (`rate` requests per second, or a
+per-host override in `host_limits`) and a circuit breaker. Idempotent
+methods (`retry_methods`) are retried on connection errors and on
+`retry_statuses` with jittered exponential backoff, honouring
+``Retry-After``. Other methods (POST, PATCH) are only retried when the
+request never reached the server (connect errors) or got a 429, unless the
+call opts in with ``retry_methods=`` or sends an ``Idempotency-Key`` header.
+After `failure_threshold` consecutive failures the breaker opens and calls to
+that host fail fast with `CircuitOpenError` for `reset_timeout` seconds.
+After that, a single trial request decides whether the breaker closes again.
+The breaker is checked once per call; a call that trips it stops retrying and
+returns its last response.
+
+`request` blocks. `submit` returns a Future and `arequest` is awaitable;
+both run on a shared thread pool. `batch` fans out many calls with bounded
+concurrency and returns their results in order. Latency, status, retry and
+breaker metrics go to observability.metrics; `stats()` summarizes them per
+host.
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from observability.metrics import incr, observe
+from tools.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+RETRY_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE", "TRACE")
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+
+class CircuitOpenError(requests.RequestException):
+    """The host's circuit breaker is open; the request was not sent."""
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial = False
+            if self.state == self.HALF_OPEN and not self._trial:
+                self._trial = True   # exactly one request probes the host
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial = False
+
+    def release(self):
+        """Give up a trial slot without a verdict (the request was never sent)."""
+        with self._lock:
+            self._trial = False
+
+    def record_failure(self) -> bool:
+        """Count a failure; True when this one opened the circuit."""
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._trial = False
+                self.trips += 1
+                return True
+            return False
+
+
+class _Host:
+    def __init__(self, name, pool_size, rate, burst, failure_threshold, reset_timeout, headers):
+        self.name = name
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update(headers)
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.rejected = 0
+        self.latencies = deque(maxlen=1024)
+
+
+class HttpClient:
+    def __init__(self, pool_size: int = 16, timeout: float = 10.0, rate: Optional[float] = None,
+                 burst: Optional[float] = None, host_limits: Optional[Dict[str, Tuple[float, float]]] = None,
+                 max_retries: int = 3, backoff: float = 0.2, max_backoff: float = 10.0,
+                 retry_statuses: Sequence[int] = RETRY_STATUSES, retry_methods: Sequence[str] = RETRY_METHODS,
+                 failure_threshold: int = 5,
+                 reset_timeout: float = 30.0, max_workers: int = 32, headers: Optional[Dict] = None):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.rate = rate
+        self.burst = burst
+        self.host_limits = dict(host_limits or {})
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_statuses = frozenset(retry_statuses)
+        self.retry_methods = frozenset(m.upper() for m in retry_methods)
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.headers = dict(headers or {})
+        self._hosts: Dict[str, _Host] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="http-client")
+
+    def _host(self, url: str) -> _Host:
+        name = urlsplit(url).netloc.lower()
+        host = self._hosts.get(name)
+        if host is None:
+            with self._lock:
+                host = self._hosts.get(name)
+                if host is None:
+                    rate, burst = self.host_limits.get(name, (self.rate, self.burst))
+                    host = _Host(name, self.pool_size, rate, burst, self.failure_threshold, self.reset_timeout,
+                                 self.headers)
+                    self._hosts[name] = host
+        return host
+
+    def _delay(self, attempt: int, response: Optional[requests.Response]) -> float:
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.max_backoff)
+        # "full jitter": uniform over the exponential window
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+    # ---- blocking API ----
+    def request(self, method: str, url: str, retries: Optional[int] = None, timeout: Optional[float] = None,
+                retry_methods: Optional[Sequence[str]] = None, **kwargs) -> requests.Response:
+        """Send one request (``kwargs`` go to ``Session.request``). Returns the
+        last response, whatever its status; raises the last exception when
+        every attempt failed to connect, or `CircuitOpenError`.
+        `retry_methods` overrides the client's set of fully retried methods."""
+        host = self._host(url)
+        retries = self.max_retries if retries is None else retries
+        timeout = self.timeout if timeout is None else timeout
+        method = method.upper()
+        methods = self.retry_methods if retry_methods is None else frozenset(m.upper() for m in retry_methods)
+        idempotent = method in methods or IDEMPOTENCY_HEADER in (kwargs.get("headers") or {})
+        if not host.breaker.allow():
+            with host.lock:
+                host.rejected += 1
+            incr("http_client_rejected_total", host=host.name)
+            raise CircuitOpenError(f"Circuit open for {host.name}")
+        for attempt in range(retries + 1):
+            if host.bucket is not None:
+                host.bucket.acquire()
+            start = time.perf_counter()
+            response, error = None, None
+            try:
+                response = host.session.request(method, url, timeout=timeout, **kwargs)
+            except requests.RequestException as e:
+                error = e
+            except BaseException:
+                host.breaker.release()   # a caller error says nothing about the host
+                raise
+            seconds = time.perf_counter() - start
+            failed = error is not None or response.status_code >= 500 or response.status_code == 429
+            with host.lock:
+                host.requests += 1
+                host.latencies.append(seconds)
+                if failed:
+                    host.errors += 1
+            observe("http_client_seconds", seconds, host=host.name, method=method)
+            incr("http_client_requests_total", host=host.name,
+                 status=str(response.status_code) if response is not None else type(error).__name__)
+            if failed:
+                if host.breaker.record_failure():
+                    incr("http_client_circuit_open_total", host=host.name)
+                    logger.warning(f"Circuit opened for {host.name} after {host.breaker.failures} failures")
+            else:
+                host.breaker.record_success()
+
+            if idempotent:
+                retryable = error is not None or response.status_code in self.retry_statuses
+            else:
+                # the server may have acted on it; only resend what it cannot have seen or refused outright
+                retryable = isinstance(error, requests.ConnectionError) or (
+                    response is not None and response.status_code == 429)
+            if not retryable or attempt == retries or host.breaker.state != CircuitBreaker.CLOSED:
+                if error is not None:
+                    raise error
+                return response
+            with host.lock:
+                host.retries += 1
+            incr("http_client_retries_total", host=host.name)
+            time.sleep(self._delay(attempt, response))
+        raise AssertionError("unreachable")
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    # ---- concurrent API ----
+    def submit(self, method: str, url: str, **kwargs) -> Future:
+        return self._pool.submit(self.request, method, url, **kwargs)
+
+    async def arequest(self, method: str, url: str, **kwargs) -> requests.Response:
+        return await asyncio.wrap_future(self.submit(method, url, **kwargs))
+
+    def batch(self, calls: List[Dict], concurrency: int = 16, return_exceptions: bool = True) -> List:
+        """Run many requests, at most `concurrency` at a time. Each call is a dict
+        with ``method``, ``url`` and any `request` keyword arguments. Results come
+        back in order; failures are returned as exceptions unless `return_exceptions`
+        is False, in which case the first one is raised."""
+        gate = threading.BoundedSemaphore(concurrency)
+        futures = []
+        for call in calls:
+            call = dict(call)
+            gate.acquire()
+            fut = self.submit(call.pop("method", "GET"), call.pop("url"), **call)
+            fut.add_done_callback(lambda _: gate.release())
+            futures.append(fut)
+        results = []
+        for fut in futures:
+            try:
+                results.append(fut.result())
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                results.append(e)
+        return results
+
+    def stats(self) -> Dict[str, Dict]:
+        out = {}
+        for name, host in list(self._hosts.items()):
+            with host.lock:
+                lat = sorted(host.latencies)
+                out[name] = {
+                    "requests": host.requests,
+                    "errors": host.errors,
+                    "retries": host.retries,
+                    "rejected": host.rejected,
+                    "circuit": host.breaker.state,
+                    "trips": host.breaker.trips,
+                    "latency_p50": lat[len(lat) // 2] if lat else 0.0,
+                    "latency_p95": lat[min(len(lat) - 1, int(0.95 * len(lat)))] if lat else 0.0,
+                }
+        return out
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+        for host in self._hosts.values():
+            host.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    """Process-wide client shared by the tool wrappers."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient()
+    return _client
@@ -0,0 +1,309 @@
+"""Batched, deduplicated notification digests on top of `mcp_send`.
+
+Recommendations are collected per (user, channel). Postings the user was
+already sent (a persistent `memory.sent_store.SentStore`), or that are
+already waiting in the open digest, are dropped on arrival. The first new
+posting opens a window; when it closes (`window` seconds, or as soon as
+`max_items` postings are waiting) the best-scoring postings go out as one
+digest message. Each channel delivers through its own small thread pool
+behind a token bucket (`rate` messages per second), retrying failures with
+jittered exponential backoff before dead-lettering them. A digest counts as
+sent only once its sink accepted it.
+
+Sinks are plain objects with ``send(digest)`` that raise on failure:
+`McpSink` (the mcp_send stub), `FileSink` (JSON lines) and `WebhookSink`
+(HTTP POST). `serve_stub_webhook` runs a local endpoint for throughput
+runs. `DigestListener` plugs a pipeline into
+``RecommendationAgent.add_listener``.
+"""
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+from memory.sent_store import SentStore
+from observability.metrics import incr, observe
+from tools.mcp_tool import mcp_send
+from tools.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW = float(os.environ.get("JOB_DIGEST_WINDOW", 3600))
+
+
+def render_digest(items: List[Dict]) -> str:
+    lines = [f"{len(items)} new job match{'es' if len(items) != 1 else ''}:"]
+    for item in items:
+        lines.append(f"- {item.get('title')} at {item.get('company')} ({item.get('score', 0.0):.2f}) {item.get('url')}")
+    return "\n".join(lines)
+
+
+# ---- sinks ----
+class McpSink:
+    """Delivers the digest text through `tools.mcp_tool.mcp_send`."""
+
+    def send(self, digest: Dict):
+        if not mcp_send(digest["channel"], digest["text"]):
+            raise RuntimeError(f"mcp_send to {digest['channel']} failed")
+
+
+class FileSink:
+    """Appends each digest as one JSON line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send(self, digest: Dict):
+        line = json.dumps(digest)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+class WebhookSink:
+    """POSTs each digest as JSON; non-2xx responses count as failures."""
+
+    def __init__(self, url: str, timeout: float = 5.0, session: Optional[requests.Session] = None):
+        self.url = url
+        self.timeout = timeout
+        self.session = session or requests.Session()
+
+    def send(self, digest: Dict):
+        self.session.post(self.url, json=digest, timeout=self.timeout).raise_for_status()
+
+
+def serve_stub_webhook(port: int = 0, latency: float = 0.0, fail_rate: float = 0.0):
+    """Local stand-in webhook on a daemon thread. Returns ``(server, url)``;
+    ``server.received`` holds the posted digests. `fail_rate` of requests get a 503."""
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if latency:
+                time.sleep(latency)
+            if fail_rate and random.random() < fail_rate:
+                self.send_response(503)
+            else:
+                received.append(json.loads(body))
+                self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    server.received = received
+    threading.Thread(target=server.serve_forever, name="stub-webhook", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+# ---- pipeline ----
+class _Channel:
+    def __init__(self, name, sink, rate, burst, workers):
+        self.name = name
+        self.sink = sink
+        self.bucket = TokenBucket(rate, burst)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"notify-{name}")
+        self.lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.pending = 0
+
+
+class NotificationPipeline:
+    def __init__(self, sinks: Dict[str, object], store: Optional[SentStore] = None, window: float = DEFAULT_WINDOW,
+                 max_items: int = 20, rate: float = 5.0, burst: Optional[float] = None, workers: int = 2,
+                 max_retries: int = 3, retry_backoff: float = 0.5, tick: float = 1.0):
+        self.store = store if store is not None else SentStore()
+        self.window = window
+        self.max_items = max_items
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.tick = tick
+        self._channels = {name: _Channel(name, sink, rate, burst, workers) for name, sink in sinks.items()}
+        self._pending: Dict[Tuple[str, str], Dict[str, Dict]] = {}   # (user, channel) -> job id -> item
+        self._opened: Dict[Tuple[str, str], float] = {}              # when each open digest's window started
+        self._inflight: Dict[Tuple[str, str], set] = {}              # ids in digests not yet delivered
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._thread = None
+        self.duplicates = 0
+        self.dead_letters: List[Dict] = []
+
+    # ---- intake ----
+    def submit(self, user: str, channel: str, recommendations: List[Dict]) -> int:
+        """Queue `recommendations` for (user, channel); returns how many were new."""
+        if channel not in self._channels:
+            raise ValueError(f"Unknown channel {channel!r}; expected one of {sorted(self._channels)}")
+        key = (user, channel)
+        by_id = {}
+        for rec in recommendations:
+            job_id = rec.get("job_id") or rec.get("id")
+            if job_id is not None and (job_id not in by_id or rec.get("score", 0) > by_id[job_id].get("score", 0)):
+                by_id[job_id] = rec
+        with self._lock:
+            waiting = self._pending.get(key, {})
+            inflight = self._inflight.get(key, ())
+            fresh = [j for j in by_id if j not in waiting and j not in inflight]
+        unsent = self.store.unsent(user, channel, fresh) if fresh else []
+        added = 0
+        with self._lock:
+            waiting = self._pending.setdefault(key, {})
+            inflight = self._inflight.get(key, ())
+            for job_id in unsent:
+                if job_id in waiting or job_id in inflight:
+                    continue  # queued by a concurrent submit
+                rec = by_id[job_id]
+                waiting[job_id] = {"job_id": job_id, "title": rec.get("title"), "company": rec.get("company"),
+                                   "url": rec.get("url"), "score": float(rec.get("score", 0.0))}
+                added += 1
+            if waiting:
+                self._opened.setdefault(key, time.time())
+            else:
+                self._pending.pop(key, None)
+            ready = len(waiting) >= self.max_items
+            self.duplicates += len(by_id) - added
+        incr("notification_items_total", added, channel=channel)
+        incr("notification_duplicates_total", len(by_id) - added, channel=channel)
+        self._ensure_timer()
+        if ready:
+            self._dispatch([key])
+        return added
+
+    # ---- windows ----
+    def _ensure_timer(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._timer_loop, name="digest-timer", daemon=True)
+                self._thread.start()
+
+    def _timer_loop(self):
+        while not self._closed.wait(self.tick):
+            self.flush_due()
+
+    def flush_due(self, now: Optional[float] = None) -> int:
+        """Send every digest whose window has closed; returns how many."""
+        now = now or time.time()
+        with self._lock:
+            due = [k for k, opened in self._opened.items() if now - opened >= self.window]
+        return self._dispatch(due)
+
+    def flush(self) -> int:
+        """Send every open digest now, regardless of its window."""
+        with self._lock:
+            keys = list(self._opened)
+        return self._dispatch(keys)
+
+    def _dispatch(self, keys) -> int:
+        digests = []
+        with self._lock:
+            for key in keys:
+                waiting = self._pending.pop(key, None)
+                self._opened.pop(key, None)
+                if not waiting:
+                    continue
+                items = sorted(waiting.values(), key=lambda r: -r["score"])
+                # the best `max_items` go now; the rest open the next window
+                items, rest = items[:self.max_items], items[self.max_items:]
+                if rest:
+                    self._pending[key] = {r["job_id"]: r for r in rest}
+                    self._opened[key] = time.time()
+                self._inflight.setdefault(key, set()).update(r["job_id"] for r in items)
+                user, channel = key
+                digests.append({"user": user, "channel": channel, "created_at": time.time(),
+                                "items": items, "text": render_digest(items)})
+        for digest in digests:
+            ch = self._channels[digest["channel"]]
+            with ch.lock:
+                ch.pending += 1
+            ch.pool.submit(self._deliver, ch, digest)
+        return len(digests)
+
+    # ---- delivery ----
+    def _deliver(self, ch: _Channel, digest: Dict):
+        key = (digest["user"], digest["channel"])
+        ids = [r["job_id"] for r in digest["items"]]
+        try:
+            for attempt in range(self.max_retries + 1):
+                ch.bucket.acquire()
+                start = time.perf_counter()
+                try:
+                    ch.sink.send(digest)
+                except Exception as e:
+                    logger.warning("Digest to %s/%s failed (attempt %d): %s", key[0], key[1], attempt + 1, e)
+                    incr("notification_failures_total", channel=ch.name)
+                    if attempt < self.max_retries:
+                        with ch.lock:
+                            ch.retried += 1
+                        time.sleep(self.retry_backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
+                    continue
+                observe("notification_send_seconds", time.perf_counter() - start, channel=ch.name)
+                incr("notifications_sent_total", channel=ch.name)
+                self.store.mark_sent(key[0], key[1], ids)
+                with ch.lock:
+                    ch.sent += 1
+                return
+            with ch.lock:
+                ch.failed += 1
+            self.dead_letters.append(digest)
+        finally:
+            with self._lock:
+                inflight = self._inflight.get(key)
+                if inflight is not None:
+                    inflight.difference_update(ids)
+                    if not inflight:
+                        self._inflight.pop(key, None)
+            with ch.lock:
+                ch.pending -= 1
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until every dispatched digest was delivered or dead-lettered."""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while any(ch.pending for ch in self._channels.values()):
+            if deadline is not None and time.perf_counter() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stats(self) -> Dict:
+        with self._lock:
+            waiting = sum(len(v) for v in self._pending.values())
+            open_digests = len(self._opened)
+        channels = {}
+        for name, ch in self._channels.items():
+            with ch.lock:
+                channels[name] = {"sent": ch.sent, "failed": ch.failed, "retried": ch.retried, "pending": ch.pending}
+        return {"open_digests": open_digests, "waiting_items": waiting, "duplicates": self.duplicates,
+                "dead_letters": len(self.dead_letters), "channels": channels}
+
+    def close(self, flush: bool = True, timeout: Optional[float] = None):
+        """Stop the window timer; by default send what is still waiting first."""
+        if flush:
+            self.flush()
+            self.wait(timeout)
+        self._closed.set()
+        for ch in self._channels.values():
+            ch.pool.shutdown(wait=flush)
+
+
+class DigestListener:
+    """A2A listener that feeds one user's recommendations into a pipeline."""
+
+    def __init__(self, pipeline: NotificationPipeline, user: str, channel: str):
+        self.pipeline = pipeline
+        self.user = user
+        self.channel = channel
+
+    def handle_recommendations(self, recommendations: List[Dict]):
+        self.pipeline.submit(self.user, self.channel, recommendations)
@@ -1,11 +1,31 @@
 """OpenAPI tool stub for calling external REST endpoints (e.g., ATS, HR APIs).
 Replace 'requests' calls with proper API keys and schemas in production.
+
+Calls go through the shared `tools.http_client` client (pooled keep-alive
+connections, retries, per-host rate limits and circuit breaking); use
+`call_openapi_batch` to push many records concurrently.
 """
-import requests
+from typing import Dict, List
+
+from tools.http_client import get_http_client
+
+
+def _result(resp) -> Dict:
+    return {'status_code': resp.status_code, 'body': resp.text}
+
 
 def call_openapi(url: str, method: str = 'GET', json_data: dict = None, headers: dict = None):
     try:
-        resp = requests.request(method, url, json=json_data, headers=headers, timeout=10)
-        return {'status_code': resp.status_code, 'body': resp.text}
+        resp = get_http_client().request(method, url, json=json_data, headers=headers, timeout=10)
+        return _result(resp)
     except Exception as e:
         return {'error': str(e)}
+
+
+def call_openapi_batch(calls: List[Dict], concurrency: int = 16) -> List[Dict]:
+    """`call_openapi` for many ``{"url", "method", "json_data", "headers"}`` dicts
+    at once; results (same shape) come back in order."""
+    requests_ = [{"method": c.get("method", "GET"), "url": c["url"], "json": c.get("json_data"),
+                  "headers": c.get("headers"), "timeout": 10} for c in calls]
+    results = get_http_client().batch(requests_, concurrency=concurrency)
+    return [{'error': str(r)} if isinstance(r, Exception) else _result(r) for r in results]
@@ -0,0 +1,207 @@
+"""Resume ingestion: PDF / DOCX / TXT to plain text.
+
+Uploads are spooled to a temporary file in fixed-size chunks (never held in
+memory as a whole) and rejected past `MAX_BYTES`. PDF and DOCX text is
+extracted page by page / paragraph by paragraph up to `MAX_PAGES` and
+`MAX_CHARS` in a short-lived child process per file (at most `POOL_WORKERS`
+at a time), so one malformed file that hangs the parser is killed after
+`PARSE_TIMEOUT` seconds without stalling the app or failing anyone else's
+parse. `ingest_directory` runs the same pipeline over a folder of resumes.
+"""
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MAX_BYTES = 10 * 1024 * 1024
+MAX_PAGES = 30
+MAX_CHARS = 200_000
+PARSE_TIMEOUT = 30.0
+CHUNK_SIZE = 64 * 1024
+SUPPORTED = (".pdf", ".docx", ".txt")
+
+
+class IngestError(Exception):
+    """Raised when a resume is too large, unsupported, or cannot be parsed in time."""
+
+
+def detect_kind(path: str, filename: Optional[str] = None) -> str:
+    ext = os.path.splitext(filename or path)[1].lower()
+    if ext in SUPPORTED:
+        return ext[1:]
+    with open(path, "rb") as f:
+        head = f.read(8)
+    if head.startswith(b"%PDF"):
+        return "pdf"
+    if head.startswith(b"PK\x03\x04"):
+        return "docx"
+    return "txt"
+
+
+# ---- extraction (runs in worker processes) ----
+def _extract_pdf(path: str, max_pages: int, max_chars: int) -> str:
+    from pypdf import PdfReader
+    reader = PdfReader(path)
+    parts, total = [], 0
+    for i, page in enumerate(reader.pages):
+        if i >= max_pages:
+            break
+        text = page.extract_text() or ""
+        parts.append(text)
+        total += len(text)
+        if total >= max_chars:
+            break
+    return "\n".join(parts)
+
+
+def _extract_docx(path: str, max_chars: int) -> str:
+    import docx
+    document = docx.Document(path)
+    parts, total = [], 0
+    for para in document.paragraphs:
+        parts.append(para.text)
+        total += len(para.text)
+        if total >= max_chars:
+            return "\n".join(parts)
+    for table in document.tables:
+        for row in table.rows:
+            line = " | ".join(cell.text for cell in row.cells)
+            parts.append(line)
+            total += len(line)
+            if total >= max_chars:
+                return "\n".join(parts)
+    return "\n".join(parts)
+
+
+def _extract_txt(path: str, max_chars: int) -> str:
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return f.read(max_chars)
+
+
+def _extract_path(path: str, kind: str, max_pages: int = MAX_PAGES, max_chars: int = MAX_CHARS) -> str:
+    if kind == "pdf":
+        text = _extract_pdf(path, max_pages, max_chars)
+    elif kind == "docx":
+        text = _extract_docx(path, max_chars)
+    else:
+        text = _extract_txt(path, max_chars)
+    return text[:max_chars]
+
+
+# ---- one process per parse ----
+POOL_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+_slots = threading.BoundedSemaphore(POOL_WORKERS)
+
+
+def _parse_worker(conn, path: str, kind: str, max_pages: int, max_chars: int):
+    try:
+        conn.send((True, _extract_path(path, kind, max_pages, max_chars)))
+    except BaseException as e:
+        conn.send((False, f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+
+def _parse_isolated(path: str, kind: str, timeout: float, max_pages: int, max_chars: int) -> str:
+    """Run `_extract_path` in its own process; only that process is killed on timeout."""
+    if not _slots.acquire(timeout=timeout):
+        raise TimeoutError(f"no parse slot free within {timeout}s")
+    try:
+        recv, send = multiprocessing.Pipe(duplex=False)
+        proc = multiprocessing.Process(target=_parse_worker, args=(send, path, kind, max_pages, max_chars),
+                                       name="resume-parse", daemon=True)
+        proc.start()
+        send.close()
+        try:
+            if not recv.poll(timeout):
+                raise TimeoutError(f"parsing exceeded {timeout}s")
+            ok, value = recv.recv()
+        except EOFError:
+            raise RuntimeError(f"parser process died (exit code {proc.exitcode})")
+        finally:
+            recv.close()
+            if proc.is_alive():
+                proc.terminate()
+            proc.join()
+    finally:
+        _slots.release()
+    if not ok:
+        raise RuntimeError(value)
+    return value
+
+
+def extract_text(path: str, filename: Optional[str] = None, timeout: float = PARSE_TIMEOUT,
+                 max_pages: int = MAX_PAGES, max_chars: int = MAX_CHARS) -> str:
+    """Extract text from a resume on disk, enforcing size, page and time limits."""
+    size = os.path.getsize(path)
+    if size > MAX_BYTES:
+        raise IngestError(f"{filename or path} is {size} bytes; limit is {MAX_BYTES}")
+    kind = detect_kind(path, filename)
+    if kind == "txt":
+        return _extract_txt(path, max_chars)
+    try:
+        return _parse_isolated(path, kind, timeout, max_pages, max_chars)
+    except TimeoutError as e:
+        raise IngestError(f"Parsing {filename or path} timed out: {e}") from e
+    except Exception as e:
+        raise IngestError(f"Could not parse {filename or path}: {e}") from e
+
+
+def spool_upload(fileobj, suffix: str = "", max_bytes: int = MAX_BYTES) -> str:
+    """Copy a file-like upload to a temp file chunk by chunk; returns its path."""
+    fd, path = tempfile.mkstemp(suffix=suffix, prefix="resume-")
+    written = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = fileobj.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_bytes:
+                    raise IngestError(f"Upload exceeds {max_bytes} bytes")
+                out.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+def ingest_upload(fileobj, filename: Optional[str] = None, **kwargs) -> str:
+    """Spool an upload (e.g. a Streamlit UploadedFile) and extract its text."""
+    filename = filename or getattr(fileobj, "name", None)
+    suffix = os.path.splitext(filename or "")[1]
+    path = spool_upload(fileobj, suffix=suffix)
+    try:
+        return extract_text(path, filename=filename, **kwargs)
+    finally:
+        os.remove(path)
+
+
+def ingest_directory(directory: str, timeout: float = PARSE_TIMEOUT, max_pages: int = MAX_PAGES,
+                     max_chars: int = MAX_CHARS) -> Iterator[Dict]:
+    """Yield ``{"path", "text", "error"}`` for every supported resume in `directory`.
+
+    Files are parsed `POOL_WORKERS` at a time, each in its own process; a
+    file that exceeds `timeout` is reported as an error without affecting
+    the others.
+    """
+    paths: List[str] = sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if os.path.splitext(name)[1].lower() in SUPPORTED
+    )
+
+    def parse(path):
+        try:
+            return {"path": path, "text": extract_text(path, timeout=timeout, max_pages=max_pages,
+                                                      max_chars=max_chars), "error": None}
+        except IngestError as e:
+            return {"path": path, "text": None, "error": str(e)}
+
+    with ThreadPoolExecutor(max_workers=POOL_WORKERS, thread_name_prefix="resume-ingest") as threads:
+        yield from threads.map(parse, paths)